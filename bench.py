@@ -0,0 +1,611 @@
+"""Load-test harness: drives the real slash command callbacks against a fake Discord and a fake Docker daemon
+
+    python bench.py
+    python bench.py --commands deploy,list --instances 10,1000 --concurrency 1,100 --ops 500
+
+Every command runs once per (stored instances, concurrent users) cell; the report lists
+p50/p99 latency and completed commands per second for each cell.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from aiohttp import web
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+WORK_DIR = None  # Scratch directory the benchmark runs in, set by setup_workdir()
+vb = None  # bot.py, imported by setup_workdir()
+
+def setup_workdir(path=None):
+    """Move into a scratch directory and import bot.py from there; returns the bot module.
+
+    bot.py opens its database and metrics files in the working directory on import,
+    so this has to run before anything here uses `vb`.
+    """
+    global WORK_DIR, vb
+    if vb is None:
+        WORK_DIR = path or tempfile.mkdtemp(prefix="vantanodes-bench-")
+        os.chdir(WORK_DIR)
+        sys.path.insert(0, REPO_DIR)
+        import bot
+        vb = bot
+    return vb
+
+COMMANDS = ["deploy", "list", "list-all", "start", "stop", "restart", "remove"]
+NODE_SIZE = {"memory": "256g", "cpus": 64}  # Each fake daemon's size; all of them run on this machine
+
+# ==================== FAKE DOCKER ====================
+
+def frame(stream, data):
+    """One chunk of Docker's multiplexed exec stream"""
+    return bytes([stream, 0, 0, 0]) + len(data).to_bytes(4, 'big') + data
+
+class FakeDocker:
+    """Minimal Engine API on a unix socket, with seeded per-request latency; runs on its own thread and loop"""
+
+    def __init__(self, path, latency, tmate_latency, seed, pull_latency=0.0):
+        self.path = path
+        self.latency = latency
+        self.tmate_latency = tmate_latency
+        self.pull_latency = pull_latency
+        self.rng = random.Random(seed)
+        self.containers = {}  # id -> {'State', 'Labels'}
+        self.execs = {}  # id -> cmd
+        # Stand-in registry: every OS image can be pulled, none is present until it is
+        self.registry = {
+            os_data['image']: {'Size': 200 * 1024 ** 2 + i, 'Digest': f"sha256:{i:064x}"}
+            for i, os_data in enumerate(vb.OS_OPTIONS.values())
+        }
+        self.images = {}  # name -> {'Id', 'RepoDigests', 'Size'}
+        self.subscribers = []
+        self.loop = None
+        self.runner = None
+        self.ready = threading.Event()
+
+    async def delay(self, base=None):
+        base = self.latency if base is None else base
+        if base:
+            # Uniform in [0.5, 1.5] x base; seeded so every run sees the same sequence
+            await asyncio.sleep(base * (0.5 + self.rng.random()))
+
+    def emit(self, container_id, action):
+        event = {'Type': 'container', 'Action': action, 'Actor': {'ID': container_id}, 'time': int(time.time())}
+        for queue in self.subscribers:
+            queue.put_nowait(event)
+
+    def seed(self, container_ids, status='running'):
+        for container_id in container_ids:
+            self.containers[container_id] = {'State': {'Status': status}, 'Labels': {}}
+
+    def reset(self):
+        self.containers.clear()
+        self.execs.clear()
+
+    def _get(self, request):
+        container = self.containers.get(request.match_info['id'])
+        if container is None:
+            raise web.HTTPNotFound(text=json.dumps({'message': 'No such container'}), content_type='application/json')
+        return container
+
+    def _set_status(self, request, status, action):
+        self._get(request)['State']['Status'] = status
+        self.emit(request.match_info['id'], action)
+
+    async def create(self, request):
+        await self.delay()
+        body = await request.json()
+        if body['Image'] not in self.images:
+            return web.json_response({'message': f"No such image: {body['Image']}"}, status=404)
+        container_id = os.urandom(32).hex()
+        self.containers[container_id] = {
+            'State': {'Status': 'created'}, 'Labels': body.get('Labels') or {}, 'HostConfig': body.get('HostConfig') or {},
+            'Image': self.images[body['Image']]['Id']
+        }
+        self.emit(container_id, 'create')
+        return web.json_response({'Id': container_id}, status=201)
+
+    async def start(self, request):
+        await self.delay()
+        self._set_status(request, 'running', 'start')
+        return web.Response(status=204)
+
+    async def stop(self, request):
+        await self.delay()
+        self._set_status(request, 'exited', 'die')
+        return web.Response(status=204)
+
+    async def restart(self, request):
+        await self.delay()
+        self._set_status(request, 'running', 'start')
+        return web.Response(status=204)
+
+    async def update(self, request):
+        await self.delay()
+        self._get(request).setdefault('HostConfig', {}).update(await request.json())
+        return web.json_response({'Warnings': []})
+
+    async def remove(self, request):
+        await self.delay()
+        self._get(request)
+        del self.containers[request.match_info['id']]
+        self.emit(request.match_info['id'], 'destroy')
+        return web.Response(status=204)
+
+    async def inspect(self, request):
+        await self.delay()
+        container = self._get(request)
+        return web.json_response({'Id': request.match_info['id'], **container})
+
+    async def list(self, request):
+        await self.delay()
+        wanted = None
+        if 'filters' in request.query:
+            wanted = set(json.loads(request.query['filters']).get('id', [])) or None
+        return web.json_response([
+            {'Id': container_id, 'State': container['State']['Status'], 'Labels': container['Labels']}
+            for container_id, container in self.containers.items()
+            if wanted is None or container_id in wanted
+        ])
+
+    async def stats(self, request):
+        await self.delay()
+        self._get(request)
+        return web.json_response({
+            'cpu_stats': {'cpu_usage': {'total_usage': 200}, 'system_cpu_usage': 1000, 'online_cpus': 2},
+            'precpu_stats': {'cpu_usage': {'total_usage': 100}, 'system_cpu_usage': 500},
+            'memory_stats': {'usage': 256 * 1024 ** 2, 'limit': 2 * 1024 ** 3, 'stats': {}}
+        })
+
+    async def exec_create(self, request):
+        await self.delay()
+        self._get(request)
+        exec_id = os.urandom(16).hex()
+        self.execs[exec_id] = (await request.json())['Cmd']
+        return web.json_response({'Id': exec_id}, status=201)
+
+    async def exec_start(self, request):
+        cmd = self.execs.get(request.match_info['id'], [])
+        response = web.StreamResponse(headers={'Content-Type': 'application/vnd.docker.multiplexed-stream'})
+        await response.prepare(request)
+        if cmd[:1] == ["tmate"] and cmd[-1] == "-F":
+            await self.delay(self.tmate_latency)
+            try:
+                await response.write(frame(1, b"ssh session: ssh bench" + os.urandom(6).hex().encode() + b"@nyc1.tmate.io\n"))
+            except ConnectionResetError:
+                return response
+            # tmate keeps running in the foreground; hold the stream open until the client goes away
+            await asyncio.sleep(3600)
+            return response
+        await self.delay()
+        if cmd == vb.TMATE_CLIENTS_CMD:
+            await response.write(frame(1, b"0\n"))
+        return response
+
+    async def pull(self, request):
+        name = request.query['fromImage']
+        response = web.StreamResponse(headers={'Content-Type': 'application/json'})
+        await response.prepare(request)
+        published = self.registry.get(name)
+        if published is None:
+            await response.write(json.dumps({'error': f"pull access denied for {name}"}).encode() + b"\n")
+            return response
+        current = self.images.get(name)
+        if current and current['RepoDigests'] == [f"{name}@{published['Digest']}"]:
+            await self.delay()
+            await response.write(json.dumps({'status': f"Image is up to date for {name}:latest"}).encode() + b"\n")
+            return response
+        if current:
+            # The old version stays behind as a dangling image
+            self.images[f"<none>{current['Id']}"] = {**current, 'RepoDigests': []}
+        await self.delay(self.pull_latency)
+        self.images[name] = {
+            'Id': "sha256:" + os.urandom(32).hex(), 'RepoDigests': [f"{name}@{published['Digest']}"], 'Size': published['Size']
+        }
+        await response.write(json.dumps({'status': f"Downloaded newer image for {name}:latest"}).encode() + b"\n")
+        return response
+
+    def _image(self, name):
+        """Names of the image called (or with ID) name, and the image itself"""
+        image = self.images.get(name) or next((i for i in self.images.values() if i['Id'] == name), None)
+        if image is None:
+            raise web.HTTPNotFound(text=json.dumps({'message': f"No such image: {name}"}), content_type='application/json')
+        return [key for key, i in self.images.items() if i['Id'] == image['Id']], image
+
+    async def image_inspect(self, request):
+        await self.delay()
+        return web.json_response(self._image(request.match_info['name'])[1])
+
+    async def image_tag(self, request):
+        await self.delay()
+        names, image = self._image(request.match_info['name'])
+        name = f"{request.query['repo']}:{request.query['tag']}"
+        replaced = self.images.get(name)
+        self.images.pop(f"<none>{image['Id']}", None)
+        self.images[name] = image
+        if replaced and replaced['Id'] != image['Id'] and not [i for i in self.images.values() if i['Id'] == replaced['Id']]:
+            self.images[f"<none>{replaced['Id']}"] = replaced
+        return web.Response(status=201)
+
+    async def image_remove(self, request):
+        await self.delay()
+        name = request.match_info['name']
+        names, image = self._image(name)
+        # By name only that tag goes, by ID every one
+        for key in ([name] if name in self.images else names):
+            del self.images[key]
+        return web.json_response([{'Untagged': key} for key in names])
+
+    async def commit(self, request):
+        await self.delay()
+        container = self.containers.get(request.query['container'])
+        if container is None:
+            return web.json_response({'message': 'No such container'}, status=404)
+        base = self._image(container['Image'])[1]
+        image_id = "sha256:" + os.urandom(32).hex()
+        name = f"{request.query['repo']}:{request.query.get('tag', 'latest')}" if 'repo' in request.query else f"<none>{image_id}"
+        # Whatever the user installed since the container was created
+        self.images[name] = {'Id': image_id, 'RepoDigests': [], 'Size': base['Size'] + self.rng.randint(1, 64) * 1024 ** 2}
+        return web.json_response({'Id': image_id}, status=201)
+
+    async def changes(self, request):
+        await self.delay()
+        self._get(request)
+        return web.json_response([{'Path': '/root', 'Kind': 0}])
+
+    async def image_prune(self, request):
+        await self.delay()
+        dangling = [name for name in self.images if name.startswith("<none>")]
+        reclaimed = sum(self.images.pop(name)['Size'] for name in dangling)
+        return web.json_response({'ImagesDeleted': [{'Deleted': name[6:]} for name in dangling], 'SpaceReclaimed': reclaimed})
+
+    async def exec_inspect(self, request):
+        return web.json_response({'ExitCode': 0})
+
+    async def events(self, request):
+        queue = asyncio.Queue()
+        self.subscribers.append(queue)
+        response = web.StreamResponse(headers={'Content-Type': 'application/json'})
+        await response.prepare(request)
+        try:
+            while True:
+                await response.write((json.dumps(await queue.get()) + "\n").encode())
+        except ConnectionResetError:
+            return response
+        finally:
+            self.subscribers.remove(queue)
+
+    def app(self):
+        app = web.Application()
+        prefix = f"/{vb.DOCKER_API_VERSION}"
+        app.router.add_post(f"{prefix}/containers/create", self.create)
+        app.router.add_get(f"{prefix}/containers/json", self.list)
+        app.router.add_post(f"{prefix}/containers/{{id}}/start", self.start)
+        app.router.add_post(f"{prefix}/containers/{{id}}/stop", self.stop)
+        app.router.add_post(f"{prefix}/containers/{{id}}/kill", self.stop)
+        app.router.add_post(f"{prefix}/containers/{{id}}/restart", self.restart)
+        app.router.add_post(f"{prefix}/containers/{{id}}/update", self.update)
+        app.router.add_delete(f"{prefix}/containers/{{id}}", self.remove)
+        app.router.add_get(f"{prefix}/containers/{{id}}/json", self.inspect)
+        app.router.add_get(f"{prefix}/containers/{{id}}/stats", self.stats)
+        app.router.add_post(f"{prefix}/containers/{{id}}/exec", self.exec_create)
+        app.router.add_post(f"{prefix}/exec/{{id}}/start", self.exec_start)
+        app.router.add_get(f"{prefix}/exec/{{id}}/json", self.exec_inspect)
+        app.router.add_get(f"{prefix}/events", self.events)
+        app.router.add_post(f"{prefix}/images/create", self.pull)
+        app.router.add_post(f"{prefix}/images/prune", self.image_prune)
+        app.router.add_get(f"{prefix}/images/{{name:.+}}/json", self.image_inspect)
+        app.router.add_post(f"{prefix}/images/{{name:.+}}/tag", self.image_tag)
+        app.router.add_delete(f"{prefix}/images/{{name:.+}}", self.image_remove)
+        app.router.add_post(f"{prefix}/commit", self.commit)
+        app.router.add_get(f"{prefix}/containers/{{id}}/changes", self.changes)
+        return app
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+
+        async def serve():
+            self.runner = web.AppRunner(self.app(), handle_signals=False)
+            await self.runner.setup()
+            await web.UnixSite(self.runner, self.path).start()
+            self.ready.set()
+
+        self.loop.run_until_complete(serve())
+        self.loop.run_forever()
+
+    def launch(self):
+        threading.Thread(target=self.run, name="fake-docker", daemon=True).start()
+        self.ready.wait()
+
+    def call(self, func, *args):
+        """Run func on the fake daemon's loop and wait for it"""
+        done = threading.Event()
+
+        def wrapper():
+            func(*args)
+            done.set()
+
+        self.loop.call_soon_threadsafe(wrapper)
+        done.wait()
+
+# ==================== FAKE DISCORD ====================
+
+class FakeDiscord:
+    """Seeded latency shared by every fake Discord REST call"""
+
+    def __init__(self, latency, seed):
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    async def delay(self):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * (0.5 + self.rng.random()))
+
+class FakeMessage:
+    def __init__(self, discord_api):
+        self.discord_api = discord_api
+
+    async def edit(self, **kwargs):
+        await self.discord_api.delay()
+        return self
+
+class FakeUser:
+    def __init__(self, discord_api, user_id, name):
+        self.discord_api = discord_api
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+
+    def __str__(self):
+        return self.name
+
+    async def send(self, *args, **kwargs):
+        await self.discord_api.delay()
+        return FakeMessage(self.discord_api)
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self.done = False
+
+    def is_done(self):
+        return self.done
+
+    async def send_message(self, content=None, *, embed=None, view=None, ephemeral=False, **kwargs):
+        await self.interaction.discord_api.delay()
+        self.done = True
+        if view is not None and view.children:
+            # Press the first button (Confirm) straight away
+            await view.children[0].callback(FakeInteraction(self.interaction.discord_api, self.interaction.user))
+
+    async def defer(self, **kwargs):
+        await self.interaction.discord_api.delay()
+        self.done = True
+
+    async def edit_message(self, **kwargs):
+        await self.interaction.discord_api.delay()
+        self.done = True
+
+class FakeFollowup:
+    def __init__(self, discord_api):
+        self.discord_api = discord_api
+
+    async def send(self, content=None, *, embed=None, wait=False, **kwargs):
+        await self.discord_api.delay()
+        return FakeMessage(self.discord_api)
+
+class FakeInteraction:
+    def __init__(self, discord_api, user):
+        self.discord_api = discord_api
+        self.user = user
+        self.guild = None
+        self.data = {}
+        self.command_failed = False
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(discord_api)
+
+    async def original_response(self):
+        await self.discord_api.delay()
+        return FakeMessage(self.discord_api)
+
+# ==================== SCENARIOS ====================
+
+def seed_instances(dockers, container_ids, owners, by_owner, name):
+    """Create running containers round-robin over the fake nodes and register them"""
+    for n, docker in enumerate(dockers):
+        docker.call(docker.seed, container_ids[n::len(dockers)])
+    for i, container_id in enumerate(container_ids):
+        owner = f"user{i % owners}"
+        vb.bot.registry.add(owner, container_id, f"ssh {name}{i}@nyc1.tmate.io", "ubuntu", f"node{i % len(dockers)}")
+        by_owner.setdefault(owner, []).append(container_id)
+
+def reset_bot(dockers, instances, owners, lifecycle_limit):
+    """Fresh store, registry and container services with `instances` running containers spread over `owners` users"""
+    old = vb.bot
+    store = vb.InstanceStore(os.path.join(WORK_DIR, f"instances-{time.monotonic_ns()}.db"))
+    registry = vb.InstanceRegistry(store)
+    nodes = vb.NodePool({f"node{n}": {"socket": docker.path, **NODE_SIZE} for n, docker in enumerate(dockers)}, registry)
+    for node in nodes.nodes.values():
+        # Stand-ins for separate hosts: this machine's memory and CPUs say nothing about them
+        node.host_memory = node.host_cpus = None
+    state_cache = vb.ContainerStateCache(nodes, registry)
+    lifecycle = vb.LifecycleScheduler(lifecycle_limit)
+    old.store = store
+    old.registry = registry
+    old.user_plans = store.user_plans()
+    old.nodes = nodes
+    old.state_cache = state_cache
+    old.lifecycle = lifecycle
+    old.reaper = vb.IdleReaper(nodes, registry, state_cache, lifecycle)
+    old.warm_pool = vb.WarmPool(nodes, registry, state_cache)
+    old.tmate_streams = {}
+    old.cleanups = set()
+    old.admission = vb.AdmissionController(nodes, registry, state_cache, old.host_sampler)
+    old.images = vb.ImageManager(nodes)
+    old.snapshots = vb.SnapshotManager(nodes, store)
+    old.metrics = vb.ContainerMetrics(os.path.join(WORK_DIR, f"metrics-{time.monotonic_ns()}.bin"))
+
+    for docker in dockers:
+        docker.call(docker.reset)
+    by_owner = {}
+    seed_instances(dockers, [f"{i:08x}" + os.urandom(28).hex() for i in range(instances)], owners, by_owner, "seed")
+    return by_owner
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+async def run_cell(command, instances, concurrency, ops, dockers, discord_api, lifecycle_limit, seed, prefetch=True):
+    """Run `ops` invocations of one command from `concurrency` users; returns the cell's results"""
+    owners = max(1, min(concurrency, instances)) if instances else 1
+    by_owner = reset_bot(dockers, instances, owners, lifecycle_limit)
+    if command == "remove":
+        # Every removal needs its own instance; these are not counted as stored instances
+        seed_instances(dockers, [os.urandom(32).hex() for _ in range(ops)], owners, by_owner, "extra")
+    if prefetch:
+        # What the bot does at startup; fast once the fake daemons have every image
+        await vb.bot.images.refresh()
+
+    vb.bot.state_cache.start()
+    for _ in range(200):
+        if vb.bot.state_cache.live:
+            break
+        await asyncio.sleep(0.01)
+
+    callbacks = {
+        "deploy": vb.deploy.callback,
+        "list": vb.list_servers.callback,
+        "list-all": vb.list_all_servers.callback,
+        "start": vb.start_server.callback,
+        "stop": vb.stop_server.callback,
+        "restart": vb.restart_server.callback,
+        "remove": vb.remove_server.callback
+    }
+    callback = callbacks[command]
+    rng = random.Random(seed)
+    admin = FakeUser(discord_api, vb.MAIN_ADMIN_ID, "admin")
+    latencies = []
+    errors = 0
+    next_op = 0
+
+    async def worker(number):
+        nonlocal next_op, errors
+        owner = f"user{number % owners}"
+        user = FakeUser(discord_api, 10 ** 17 + number, owner)
+        while next_op < ops:
+            op = next_op
+            next_op += 1
+            if command == "deploy":
+                args = (FakeInteraction(discord_api, admin), FakeUser(discord_api, 10 ** 18 + op, f"deploy{op}"), "ubuntu")
+            elif command == "list-all":
+                args = (FakeInteraction(discord_api, admin),)
+            elif command == "list":
+                args = (FakeInteraction(discord_api, user),)
+            else:
+                owned = by_owner.get(owner)
+                if not owned:
+                    continue
+                container_id = owned.pop() if command == "remove" else rng.choice(owned)
+                args = (FakeInteraction(discord_api, user), container_id[:12])
+            started = time.perf_counter()
+            try:
+                await callback(*args)
+            except Exception as e:
+                errors += 1
+                print(f"⚠️ {command} failed: {e}")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(number) for number in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    vb.bot.state_cache.stop()
+    for exec_stream in list(vb.bot.tmate_streams.values()):
+        exec_stream.close()
+    await vb.bot.nodes.close()
+
+    return {
+        'command': command,
+        'instances': instances,
+        'concurrency': concurrency,
+        'ops': len(latencies),
+        'errors': errors,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'cmds_per_sec': len(latencies) / elapsed if elapsed else 0.0
+    }
+
+def parse_list(value, cast=int):
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+async def main(args):
+    dockers = [
+        FakeDocker(os.path.join(WORK_DIR, f"docker{n}.sock"), args.docker_latency / 1000, args.tmate_latency / 1000, args.seed + n,
+                   args.pull_latency / 1000)
+        for n in range(args.nodes)
+    ]
+    for docker in dockers:
+        docker.launch()
+    discord_api = FakeDiscord(args.discord_latency / 1000, args.seed)
+    vb.PLACEMENT_STRATEGY = args.placement
+    NODE_SIZE.update(memory=args.node_memory, cpus=args.node_cpus)
+
+    # Keep the bot's own chatter out of the numbers
+    vb.WARM_POOL_SIZES.clear()
+    vb.bot.log_sink.write = lambda message: None
+
+    results = []
+    print(f"{'command':<10} {'instances':>9} {'users':>6} {'ops':>6} {'errors':>6} {'p50 ms':>9} {'p99 ms':>9} {'cmds/s':>9}")
+    for command in args.commands:
+        for instances in args.instances:
+            for concurrency in args.concurrency:
+                ops = max(args.ops, concurrency)
+                result = await run_cell(
+                    command, instances, concurrency, ops, dockers, discord_api, args.lifecycle_limit, args.seed,
+                    prefetch=not args.no_prefetch
+                )
+                results.append(result)
+                print(
+                    f"{command:<10} {instances:>9} {concurrency:>6} {result['ops']:>6} {result['errors']:>6} "
+                    f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['cmds_per_sec']:>9.1f}",
+                    flush=True
+                )
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'settings': vars(args), 'results': results}, f, indent=4)
+
+if __name__ == "__main__":
+    setup_workdir()
+    parser = argparse.ArgumentParser(description="Benchmark VantaNodes slash commands against fake Discord and Docker")
+    parser.add_argument("--commands", type=lambda v: parse_list(v, str), default=COMMANDS, help=f"Comma-separated, from {','.join(COMMANDS)}")
+    parser.add_argument("--instances", type=parse_list, default=[10, 100, 1000, 10000], help="Stored instance counts")
+    parser.add_argument("--concurrency", type=parse_list, default=[1, 10, 100, 1000], help="Concurrent user counts")
+    parser.add_argument("--ops", type=int, default=200, help="Commands per cell (at least one per user)")
+    parser.add_argument("--docker-latency", type=float, default=2.0, help="Mean fake Docker API latency in ms")
+    parser.add_argument("--pull-latency", type=float, default=3000.0, help="Mean time to pull an image that isn't present in ms")
+    parser.add_argument("--no-prefetch", action="store_true", help="Skip the startup image refresh, so the first deploys pull")
+    parser.add_argument("--tmate-latency", type=float, default=50.0, help="Mean time for tmate to print its session in ms")
+    parser.add_argument("--discord-latency", type=float, default=30.0, help="Mean fake Discord REST latency in ms")
+    parser.add_argument("--lifecycle-limit", type=int, default=vb.LIFECYCLE_CONCURRENCY, help="Container operations allowed at once")
+    parser.add_argument("--nodes", type=int, default=1, help="Fake Docker daemons to place instances on")
+    parser.add_argument("--node-memory", default=NODE_SIZE["memory"], help="Memory each fake node offers, e.g. 16g")
+    parser.add_argument("--node-cpus", type=float, default=NODE_SIZE["cpus"], help="CPUs each fake node offers")
+    parser.add_argument("--placement", choices=["least-loaded", "bin-pack"], default=vb.PLACEMENT_STRATEGY, help="Node placement strategy")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for latencies and workload choices")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+    unknown = set(args.commands) - set(COMMANDS)
+    if unknown:
+        parser.error(f"unknown commands: {', '.join(sorted(unknown))}")
+    asyncio.run(main(args))
@@ -1,18 +1,33 @@
 import discord
+import aiohttp
+from aiohttp import web
 from discord.ext import commands, tasks
 from discord import app_commands
 import asyncio
-import subprocess
 import json
 import os
 import time
 import random
 import re
 import psutil
+import sqlite3
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict
 import signal
+import ssl
+import logging
 import sys
+import threading
+import traceback
+import heapq
+import contextvars
+import struct
+import hashlib
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_left, insort
+from array import array
 
 # ==================== CONFIGURATION ====================
 TOKEN = "YOUR_BOT_TOKEN_HERE"  # Replace with your bot token
@@ -22,8 +37,84 @@ BOT_NAME = "VantaNodes"
 RAM_LIMIT = "2g"
 SERVER_LIMIT = 12
 LOGS_CHANNEL_ID = 123456789  # CHANGE THIS TO YOUR LOGS CHANNEL ID
+DOCKER_SOCKET = '/var/run/docker.sock'
+DOCKER_API_VERSION = 'v1.41'
+DOCKER_TIMEOUT = 60  # Seconds a Docker API call may take; event and tmate streams have no limit
+DOCKER_SLOW_TIMEOUT = 600  # Seconds for calls that copy or delete whole filesystems (commit, image prune)
+DOCKER_PULL_STALL_TIMEOUT = 120  # Seconds an image pull may go without progress before it counts as failed
+STATUS_FILTER_MAX_IDS = 500  # Above this, bulk status lookups list every container instead of filtering by ID
+REGISTRY_FLUSH_INTERVAL = 5  # Seconds between write-behind flushes of the instance registry
+STATS_SAMPLE_INTERVAL = 30  # Seconds between background `docker stats` samples
+STATS_CONCURRENCY = 16  # Parallel stats requests per sample
+INACTIVITY_TIMEOUT = 4 * 3600  # Idle instances are deleted after this many seconds
+REAPER_INTERVAL = 60  # Seconds between idle reaper ticks
+REAPER_CPU_THRESHOLD = 5.0  # CPU % above which an instance counts as active
+REAPER_NET_THRESHOLD = 64 * 1024  # Network bytes between samples above which an instance counts as active
+REAPER_DRY_RUN = False  # Only log what would be deleted
+WARM_POOL_SIZES = {}  # Pre-started containers with tmate ready, per OS; off when empty, e.g. {"ubuntu": 2, "debian": 1} turns it on
+WARM_POOL_MEMORY_BUDGET = "8g"  # Total memory the warm pool may reserve (its OS plan's memory per container)
+WARM_POOL_REFILL_INTERVAL = 30  # Seconds between warm pool top-ups
+WARM_POOL_CONCURRENCY = 2  # Containers the pool starts at once
+LIFECYCLE_CONCURRENCY = max(2, (os.cpu_count() or 2) // 2)  # Container operations (run, start, tmate...) running at once
+BULK_DEPLOY_CONCURRENCY = 10  # Instances /deploy-bulk provisions at once
+BULK_PROGRESS_INTERVAL = 3  # Minimum seconds between /deploy-bulk progress edits
+PROGRESS_EDIT_INTERVAL = 1.5  # Minimum seconds between edits of one progress message
+QUEUE_UPDATE_INTERVAL = 3  # Seconds between queue position refreshes in progress embeds
+TMATE_TIMEOUT = 60  # Seconds to wait for tmate to print its SSH session
+TMATE_SOCKET_PREFIX = "/tmp/vantanodes-tmate-"  # Every session the bot starts gets its own socket, <prefix><id>.sock
+TMATE_CLIENTS_CMD = [
+    "sh", "-c",
+    f"for s in {TMATE_SOCKET_PREFIX}*.sock; do tmate -S \"$s\" display -p '#{{tmate_num_clients}}' 2>/dev/null; done; true"
+]  # Prints the number of attached clients of each of the bot's tmate sessions
+HOST_SAMPLE_INTERVAL = 10  # Seconds between host resource samples
+HOST_HISTORY_SECONDS = 24 * 3600  # Host resource history kept in memory
+METRICS_RESOLUTIONS = {60: 6 * 3600, 600: 3 * 86400, 3600: 30 * 86400}  # Bucket seconds -> retention seconds for container metrics
+METRICS_COMPACT_INTERVAL = 3600  # Seconds between rewrites of the container metrics file
+EXPORTER_HOST = '0.0.0.0'
+EXPORTER_PORT = None  # Set (e.g. 9101) to serve Prometheus metrics on http://host:port/metrics
+LOOP_LAG_INTERVAL = 0.5  # Seconds between event loop lag probes
+LOOP_STALL_THRESHOLD = 0.25  # Lag in seconds that counts as the loop being blocked
+LOOP_STALL_REPORTS = 20  # Blocking reports kept for /diag
+LIST_PAGE_SIZE = 10  # Instances per /list-all page
+TRACE_SAMPLE_RATE = 1.0  # Fraction of slash commands traced; untraced commands pay one context lookup per span
+TRACE_BUFFER = 50  # Finished traces kept for /trace
+TRACE_MAX_SPANS = 200  # Spans recorded per trace; the rest are only counted
+STATUS_CHECK_INTERVAL = 5  # Seconds between checks of the instance count shown in the presence
+STATUS_ROTATE_INTERVAL = 60  # Seconds before the presence text rotates even if the count is unchanged
+LOG_FLUSH_INTERVAL = 2  # Seconds between batched messages to the logs channel
+LOG_QUEUE_SIZE = 1000  # Log lines kept in memory before the oldest are dropped
+NODES = {  # Docker hosts instances are placed on; use "url" (e.g. "https://10.0.0.2:2376") instead of "socket" for TCP.
+    # Remote daemons must use TLS with client certificates (dockerd --tlsverify): give "ca", "cert" and "key" file paths.
+    # Never expose a plain http :2375 daemon; anyone who reaches it has root on the host.
+    # "memory" and "cpus" default to the host's own: this machine's for a socket, what the daemon reports for a URL
+    "local": {"socket": DOCKER_SOCKET},
+}
+DEFAULT_NODE = next(iter(NODES))  # Instances recorded before multi-node support live here
+PLACEMENT_STRATEGY = "least-loaded"  # "least-loaded" spreads instances, "bin-pack" fills the fullest node that still fits
+NODE_RETRY_INTERVAL = 60  # Seconds an unreachable node is skipped by placement
+RESOURCE_PLANS = {  # Limits applied to each container; "disk" needs overlay2 on xfs with pquota, None leaves it unlimited
+    "small": {"memory": "1g", "cpus": 0.5, "pids": 256, "disk": None},
+    "standard": {"memory": RAM_LIMIT, "cpus": 1.0, "pids": 512, "disk": None},
+    "large": {"memory": "4g", "cpus": 2.0, "pids": 1024, "disk": None},
+}
+DEFAULT_PLAN = "standard"
+OS_PLANS = {"alpine": "small"}  # Plan for instances of an OS whose owner has no plan of their own
+MEMORY_OVERCOMMIT = 1.0  # Memory committed to instances may reach this multiple of a node's memory
+CPU_OVERCOMMIT = 4.0  # CPUs committed to instances may reach this multiple of a node's CPUs
+ADMISSION_MEMORY_HEADROOM = 0.10  # Fraction of a node's memory that must stay free after a deploy, by sampled usage
+ADMISSION_CPU_HEADROOM = 0.10  # Fraction of a node's CPUs that must stay free after a deploy, by sampled usage
+ADMISSION_QUEUE_LIMIT = 20  # Deploys that may wait for headroom; more are rejected
+ADMISSION_QUEUE_TIMEOUT = 600  # Seconds a deploy waits for headroom before it is rejected
+IMAGE_REFRESH_INTERVAL = 6 * 3600  # Seconds between pulls of every OS image on every node; also runs at startup
+IMAGE_PULL_CONCURRENCY = 2  # Image pulls running at once across all nodes
+SNAPSHOT_REPO = "vantanodes-snapshots"  # Image repository snapshots are committed to, one namespace per user
+SNAPSHOT_QUOTA = "10g"  # Snapshot storage per user, counting only each snapshot's own layer (base layers are shared)
+SNAPSHOT_LIMIT = 5  # Snapshots per user; the least recently used is evicted to make room
+SNAPSHOT_STORAGE_LIMIT = "100g"  # All users' snapshots together; least recently used go first
 
-database_file = 'database.txt'
+database_file = 'instances.db'
+legacy_database_file = 'database.txt'  # Old user|container|ssh format, imported once on startup
+metrics_file = 'metrics.bin'  # Append-only container metrics samples
 admins_file = 'admins.json'
 
 # Modern Color Scheme
@@ -57,51 +148,2483 @@ EMOJI = {
     'globe': '🌎', 'id': '🆔', 'role': '🔰'
 }
 
-# OS Options with fancy emojis and descriptions
-OS_OPTIONS = {
-    "ubuntu": {
-        "image": "ubuntu-vps", 
-        "name": "Ubuntu 22.04", 
-        "emoji": "🐧",
-        "description": "Stable and widely-used Linux distribution"
-    },
-    "debian": {
-        "image": "debian-vps", 
-        "name": "Debian 12", 
-        "emoji": "🦕",
-        "description": "Rock-solid stability with large software repository"
-    },
-    "alpine": {
-        "image": "alpine-vps", 
-        "name": "Alpine Linux", 
-        "emoji": "⛰️",
-        "description": "Lightweight and security-focused"
-    },
-    "arch": {
-        "image": "arch-vps", 
-        "name": "Arch Linux", 
-        "emoji": "🎯",
-        "description": "Rolling release with bleeding-edge software"
-    },
-    "kali": {
-        "image": "kali-vps", 
-        "name": "Kali Linux", 
-        "emoji": "💣",
-        "description": "Penetration testing and security auditing"
-    },
-    "fedora": {
-        "image": "fedora-vps", 
-        "name": "Fedora", 
-        "emoji": "🎩",
-        "description": "Innovative features with Red Hat backing"
-    }
-}
+# OS Options with fancy emojis and descriptions
+OS_OPTIONS = {
+    "ubuntu": {
+        "image": "ubuntu-vps", 
+        "name": "Ubuntu 22.04", 
+        "emoji": "🐧",
+        "description": "Stable and widely-used Linux distribution"
+    },
+    "debian": {
+        "image": "debian-vps", 
+        "name": "Debian 12", 
+        "emoji": "🦕",
+        "description": "Rock-solid stability with large software repository"
+    },
+    "alpine": {
+        "image": "alpine-vps", 
+        "name": "Alpine Linux", 
+        "emoji": "⛰️",
+        "description": "Lightweight and security-focused"
+    },
+    "arch": {
+        "image": "arch-vps", 
+        "name": "Arch Linux", 
+        "emoji": "🎯",
+        "description": "Rolling release with bleeding-edge software"
+    },
+    "kali": {
+        "image": "kali-vps", 
+        "name": "Kali Linux", 
+        "emoji": "💣",
+        "description": "Penetration testing and security auditing"
+    },
+    "fedora": {
+        "image": "fedora-vps", 
+        "name": "Fedora", 
+        "emoji": "🎩",
+        "description": "Innovative features with Red Hat backing"
+    }
+}
+
+# Animation frames for different states
+LOADING_ANIMATION = ["🔄", "⚡", "✨", "🌀", "🌪️", "🌈"]
+SUCCESS_ANIMATION = ["✅", "🎉", "✨", "🌟", "💫", "🔥"]
+ERROR_ANIMATION = ["❌", "💥", "⚠️", "🚨", "🔴", "🛑"]
+DEPLOY_ANIMATION = ["🚀", "🛰️", "🌌", "🔭", "👨‍🚀", "🪐"]
+SPARKS = "▁▂▃▄▅▆▇█"
+
+# ==================== INSTANCE STORE ====================
+
+class InstanceStore:
+    """SQLite-backed instance storage (WAL mode); lookups are served by InstanceRegistry in memory"""
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS instances (
+            container_id TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            ssh_command TEXT NOT NULL,
+            os_type TEXT,
+            created_at REAL NOT NULL,
+            node TEXT,
+            plan TEXT
+        );
+        CREATE TABLE IF NOT EXISTS user_plans (
+            owner TEXT PRIMARY KEY,
+            plan TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS snapshots (
+            owner TEXT NOT NULL,
+            name TEXT NOT NULL,
+            image TEXT NOT NULL,
+            image_id TEXT NOT NULL,
+            base_id TEXT NOT NULL,
+            node TEXT NOT NULL,
+            os_type TEXT,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL,
+            PRIMARY KEY (owner, name)
+        );
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        # Once the bot runs, every write goes through write() on this one thread, in order,
+        # so no statement can land inside another write's transaction
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="instance-store")
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self.migrate()
+    
+    async def write(self, method, *args):
+        """Run a write method on the writer thread without blocking the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self.writer, method, *args)
+    
+    def migrate(self):
+        """Add columns introduced after a database was created, and drop indexes nothing reads"""
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(instances)")}
+        for column in ('node', 'plan'):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE instances ADD COLUMN {column} TEXT")
+        # Only slowed down every flush once the registry took over lookups
+        self.conn.execute("DROP INDEX IF EXISTS idx_instances_owner")
+        self.conn.execute("DROP INDEX IF EXISTS idx_instances_ssh")
+    
+    def all(self):
+        rows = self.conn.execute("SELECT * FROM instances ORDER BY created_at").fetchall()
+        return [dict(row) for row in rows]
+    
+    def import_legacy(self, path):
+        """One-shot import of the old user|container|ssh flat file"""
+        rows = []
+        with open(path, 'r') as f:
+            for line in f:
+                parts = line.strip().split('|')
+                if len(parts) >= 3:
+                    rows.append((parts[1], parts[0], parts[2], None, time.time()))
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO instances (container_id, owner, ssh_command, os_type, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+    
+    def apply(self, upserts, deletes):
+        """Write a batch of changed and deleted instances in one transaction"""
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO instances (container_id, owner, ssh_command, os_type, created_at, node, plan) "
+                "VALUES (:container_id, :owner, :ssh_command, :os_type, :created_at, :node, :plan)",
+                upserts
+            )
+            self.conn.executemany(
+                "DELETE FROM instances WHERE container_id = ?",
+                [(container_id,) for container_id in deletes]
+            )
+    
+    def user_plans(self):
+        return {row['owner']: row['plan'] for row in self.conn.execute("SELECT * FROM user_plans")}
+    
+    def set_user_plan(self, owner, plan):
+        """Give owner their own resource plan, or drop it with plan=None"""
+        if plan is None:
+            self.conn.execute("DELETE FROM user_plans WHERE owner = ?", (owner,))
+        else:
+            self.conn.execute("INSERT OR REPLACE INTO user_plans (owner, plan) VALUES (?, ?)", (owner, plan))
+    
+    def snapshots(self):
+        return [dict(row) for row in self.conn.execute("SELECT * FROM snapshots")]
+    
+    def add_snapshot(self, snapshot):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO snapshots (owner, name, image, image_id, base_id, node, os_type, size, created_at, last_used) "
+            "VALUES (:owner, :name, :image, :image_id, :base_id, :node, :os_type, :size, :created_at, :last_used)",
+            snapshot
+        )
+    
+    def touch_snapshot(self, owner, name, last_used):
+        self.conn.execute("UPDATE snapshots SET last_used = ? WHERE owner = ? AND name = ?", (last_used, owner, name))
+    
+    def remove_snapshot(self, owner, name):
+        self.conn.execute("DELETE FROM snapshots WHERE owner = ? AND name = ?", (owner, name))
+
+# ==================== INSTANCE REGISTRY ====================
+
+class InstanceRegistry:
+    """In-memory view of all instances with write-behind persistence to the store"""
+    
+    def __init__(self, store):
+        self.store = store
+        self.instances = {}  # container_id -> record
+        self.owners = {}  # owner -> {container_id: record}
+        self.ssh_index = {}  # ssh_command -> container_id
+        self.node_plans = {}  # node -> {plan: number of instances}
+        self.sorted_ids = []  # For prefix matching with bisect
+        self.dirty = set()
+        self.deleted = set()
+        self.flush_lock = asyncio.Lock()
+        
+        for record in store.all():
+            self._index(record)
+    
+    def _index(self, record):
+        container_id = record['container_id']
+        # Instances from before multi-node support live on the default node
+        record['node'] = record.get('node') or DEFAULT_NODE
+        # ...and are counted at the plan they would get today, though they run without limits
+        record['plan'] = record.get('plan') or OS_PLANS.get(record.get('os_type'), DEFAULT_PLAN)
+        self.instances[container_id] = record
+        self.owners.setdefault(record['owner'], {})[container_id] = record
+        self.ssh_index[record['ssh_command']] = container_id
+        plans = self.node_plans.setdefault(record['node'], {})
+        plans[record['plan']] = plans.get(record['plan'], 0) + 1
+        insort(self.sorted_ids, container_id)
+    
+    def _unindex(self, record):
+        container_id = record['container_id']
+        del self.instances[container_id]
+        owned = self.owners.get(record['owner'], {})
+        owned.pop(container_id, None)
+        if not owned:
+            self.owners.pop(record['owner'], None)
+        if self.ssh_index.get(record['ssh_command']) == container_id:
+            del self.ssh_index[record['ssh_command']]
+        self.node_plans[record['node']][record['plan']] -= 1
+        i = bisect_left(self.sorted_ids, container_id)
+        if i < len(self.sorted_ids) and self.sorted_ids[i] == container_id:
+            del self.sorted_ids[i]
+    
+    def add(self, owner, container_id, ssh_command, os_type=None, node=None, plan=None):
+        if container_id in self.instances:
+            self._unindex(self.instances[container_id])
+        self._index({
+            'container_id': container_id,
+            'owner': owner,
+            'ssh_command': ssh_command,
+            'os_type': os_type,
+            'created_at': time.time(),
+            'node': node,
+            'plan': plan
+        })
+        self.deleted.discard(container_id)
+        self.dirty.add(container_id)
+    
+    def update_ssh(self, container_id, ssh_command):
+        record = self.instances.get(container_id)
+        if not record:
+            return
+        if self.ssh_index.get(record['ssh_command']) == container_id:
+            del self.ssh_index[record['ssh_command']]
+        record['ssh_command'] = ssh_command
+        self.ssh_index[ssh_command] = container_id
+        self.dirty.add(container_id)
+    
+    def update_plan(self, container_id, plan):
+        record = self.instances.get(container_id)
+        if not record:
+            return
+        self._unindex(record)
+        record['plan'] = plan
+        self._index(record)
+        self.dirty.add(container_id)
+    
+    def remove(self, container_id):
+        record = self.instances.get(container_id)
+        if not record:
+            return
+        self._unindex(record)
+        self.dirty.discard(container_id)
+        self.deleted.add(container_id)
+    
+    def remove_by_ssh(self, ssh_command):
+        container_id = self.ssh_index.get(ssh_command)
+        if container_id:
+            self.remove(container_id)
+    
+    def find(self, prefix, owner=None):
+        """Look up an instance by container ID prefix, optionally scoped to an owner"""
+        if not prefix:
+            return None
+        if owner is not None:
+            for container_id, record in self.owners.get(owner, {}).items():
+                if container_id.startswith(prefix):
+                    return record
+            return None
+        i = bisect_left(self.sorted_ids, prefix)
+        if i < len(self.sorted_ids) and self.sorted_ids[i].startswith(prefix):
+            return self.instances[self.sorted_ids[i]]
+        return None
+    
+    def by_owner(self, owner):
+        return list(self.owners.get(owner, {}).values())
+    
+    def all(self):
+        return list(self.instances.values())
+    
+    def count(self, owner=None):
+        if owner is None:
+            return len(self.instances)
+        return len(self.owners.get(owner, {}))
+    
+    def count_owners(self):
+        return len(self.owners)
+    
+    def _take_batch(self):
+        upserts = [dict(self.instances[container_id]) for container_id in self.dirty]
+        deletes = list(self.deleted)
+        self.dirty.clear()
+        self.deleted.clear()
+        return upserts, deletes
+    
+    def _requeue(self, upserts, deletes):
+        for record in upserts:
+            if record['container_id'] in self.instances:
+                self.dirty.add(record['container_id'])
+        for container_id in deletes:
+            if container_id not in self.instances:
+                self.deleted.add(container_id)
+    
+    async def flush(self):
+        """Persist dirty records without blocking the event loop"""
+        async with self.flush_lock:
+            if not self.dirty and not self.deleted:
+                return
+            upserts, deletes = self._take_batch()
+            try:
+                await self.store.write(self.store.apply, upserts, deletes)
+            except Exception as e:
+                print(f"⚠️ Error flushing instance registry: {e}")
+                self._requeue(upserts, deletes)
+    
+    def flush_now(self):
+        """Synchronous flush for shutdown paths"""
+        if not self.dirty and not self.deleted:
+            return
+        upserts, deletes = self._take_batch()
+        try:
+            # Behind any writes still queued from the event loop
+            self.store.writer.submit(self.store.apply, upserts, deletes).result()
+        except Exception as e:
+            print(f"⚠️ Error flushing instance registry: {e}")
+            self._requeue(upserts, deletes)
+
+# ==================== TELEMETRY ====================
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), " ")}"'
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+class Counter:
+    kind = 'counter'
+    suffix = '_total'  # The 0.0.4 text format names a counter family after its samples
+    
+    def __init__(self, name, documentation, labels=()):
+        self.name = name + self.suffix
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+    
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+    
+    def samples(self):
+        for labels, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labels, labels)} {value}"
+
+class Gauge(Counter):
+    kind = 'gauge'
+    suffix = ''
+    
+    def set(self, *labels, value):
+        self.values[labels] = value
+    
+    def clear(self):
+        self.values.clear()
+
+class Histogram(Counter):
+    kind = 'histogram'
+    suffix = ''
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+    
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, *labels, value):
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * len(self.buckets), 0.0, 0]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            entry[0][index] += 1
+        entry[1] += value
+        entry[2] += 1
+    
+    @asynccontextmanager
+    async def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(*labels, value=time.perf_counter() - started)
+    
+    def samples(self):
+        names = self.labels + ('le',)
+        for labels, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(names, labels + (bound,))} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(names, labels + ('+Inf',))} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {count}"
+
+class Telemetry:
+    """In-process metrics in the Prometheus text format; no client library needed"""
+    
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []  # Called before each render to refresh gauges
+        
+        self.command_duration = self.add(Histogram(
+            'vantanodes_command_duration_seconds', 'Slash command handling time', ('command', 'outcome')
+        ))
+        self.docker_duration = self.add(Histogram(
+            'vantanodes_docker_request_duration_seconds', 'Docker Engine API request time', ('operation',)
+        ))
+        self.docker_errors = self.add(Counter(
+            'vantanodes_docker_errors', 'Docker Engine API errors', ('operation', 'status')
+        ))
+        self.tmate_duration = self.add(Histogram(
+            'vantanodes_tmate_negotiation_seconds', 'Time to get a tmate SSH session', ('status',),
+            buckets=(0.5, 1, 2, 5, 10, 20, 30, 45, 60, 90, 120)
+        ))
+        self.rate_limits = self.add(Counter(
+            'vantanodes_discord_rate_limits', 'Discord REST rate limit hits', ('scope',)
+        ))
+        self.loop_lag = self.add(Histogram(
+            'vantanodes_event_loop_lag_seconds', 'Delay of event loop wakeups beyond their schedule',
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+        ))
+        self.loop_lag_last = self.add(Gauge('vantanodes_event_loop_lag_last_seconds', 'Most recent event loop lag'))
+        self.instances = self.add(Gauge('vantanodes_instances', 'Registered instances', ('os',)))
+        self.container_cpu = self.add(Gauge('vantanodes_container_cpu_percent', 'Container CPU usage', ('container', 'os')))
+        self.container_memory = self.add(Gauge('vantanodes_container_memory_bytes', 'Container memory usage', ('container', 'os')))
+        self.container_net = self.add(Gauge(
+            'vantanodes_container_network_bytes', 'Container network bytes since start', ('container', 'os', 'direction')
+        ))
+        self.container_running = self.add(Gauge('vantanodes_container_running', 'Whether the container is running', ('container', 'os')))
+        self.node_instances = self.add(Gauge('vantanodes_node_instances', 'Instances placed on each node, including pending ones', ('node',)))
+        self.node_memory = self.add(Gauge('vantanodes_node_memory_bytes', 'Memory committed to instances and available on each node', ('node', 'kind')))
+        self.node_cpus = self.add(Gauge('vantanodes_node_cpus', 'CPUs committed to instances and available on each node', ('node', 'kind')))
+        self.admissions = self.add(Counter('vantanodes_admission_decisions', 'Deploy admission decisions', ('decision',)))
+        self.admission_queue = self.add(Gauge('vantanodes_admission_queue', 'Deploys waiting for host headroom'))
+        self.image_pull_duration = self.add(Histogram(
+            'vantanodes_image_pull_seconds', 'Time to pull (or confirm as current) an OS image', ('image', 'status'),
+            buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+        ))
+        self.image_size = self.add(Gauge('vantanodes_image_size_bytes', 'Size of each OS image on each node', ('node', 'image')))
+        self.images_pruned = self.add(Counter('vantanodes_images_pruned', 'Dangling images removed', ('node',)))
+        self.snapshots = self.add(Counter('vantanodes_snapshots', 'Snapshots created, evicted and cloned', ('event',)))
+        self.snapshot_bytes = self.add(Gauge('vantanodes_snapshot_bytes', 'Storage charged to snapshots, across all users'))
+    
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+    
+    def render(self):
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+telemetry = Telemetry()
+
+class RateLimitCounter(logging.Handler):
+    """Counts the rate limit warnings discord.py logs for REST requests"""
+    
+    def emit(self, record):
+        message = record.getMessage()
+        if 'rate limit' in message.lower():
+            telemetry.rate_limits.inc('global' if 'global' in message.lower() else 'route')
+
+def docker_operation(method, path):
+    """Request label with IDs removed, e.g. `POST /containers/{id}/start`"""
+    path = re.sub(r'^/(containers|exec)/(?!(?:json|create)(?:/|$))[^/]+', lambda m: f"/{m.group(1)}/{{id}}", path)
+    # Image names can contain slashes (registry/namespace/repo:tag)
+    path = re.sub(r'^/images/(?!(?:json|create|prune)(?:/|$)).+?(?=/(?:json|history|push|tag)$|$)', "/images/{id}", path)
+    return f"{method} {path}"
+
+class MetricsExporter:
+    """Serves the telemetry registry over HTTP on the bot's event loop"""
+    
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.runner = None
+    
+    async def handle(self, request):
+        return web.Response(text=telemetry.render(), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+    
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        print(f"📈 Metrics exporter listening on http://{self.host}:{self.port}/metrics")
+    
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+def collect_fleet_metrics():
+    """Instance counts per OS and per-container gauges from the registry and state cache"""
+    counts = {os_id: 0 for os_id in OS_OPTIONS}
+    for gauge in (telemetry.container_cpu, telemetry.container_memory, telemetry.container_net, telemetry.container_running):
+        gauge.clear()
+    for record in bot.registry.all():
+        os_id = record.get('os_type') or 'unknown'
+        counts[os_id] = counts.get(os_id, 0) + 1
+        container = record['container_id'][:12]
+        entry = bot.state_cache.states.get(record['container_id'], {})
+        telemetry.container_running.set(container, os_id, value=int(entry.get('status') == 'running'))
+        if entry.get('updated'):
+            telemetry.container_cpu.set(container, os_id, value=round(entry.get('cpu_percent', 0.0), 3))
+            telemetry.container_memory.set(container, os_id, value=entry.get('mem_bytes', 0))
+            telemetry.container_net.set(container, os_id, 'rx', value=entry.get('net_rx', 0))
+            telemetry.container_net.set(container, os_id, 'tx', value=entry.get('net_tx', 0))
+    for os_id, count in counts.items():
+        telemetry.instances.set(os_id, value=count)
+    for node in bot.nodes.nodes.values():
+        instances, memory, cpus = bot.nodes.committed(node)
+        telemetry.node_instances.set(node.name, value=instances)
+        telemetry.node_memory.set(node.name, 'committed', value=memory)
+        telemetry.node_cpus.set(node.name, 'committed', value=cpus)
+        if node.memory != float('inf'):
+            telemetry.node_memory.set(node.name, 'capacity', value=node.memory)
+        if node.cpus != float('inf'):
+            telemetry.node_cpus.set(node.name, 'capacity', value=node.cpus)
+    telemetry.admission_queue.set(value=len(bot.admission.queue))
+    for (node, image), entry in bot.images.images.items():
+        telemetry.image_size.set(node, image, value=entry['size'])
+    telemetry.snapshot_bytes.set(value=bot.snapshots.usage())
+
+class InstrumentedTree(app_commands.CommandTree):
+    """Command tree that records how long each slash command takes and traces sampled invocations"""
+    
+    def __init__(self, client, **kwargs):
+        super().__init__(client, **kwargs)
+        client.add_listener(self.on_command_completion, 'on_app_command_completion')
+    
+    async def interaction_check(self, interaction):
+        # Runs in the task that goes on to invoke the command, so the trace is current for all of it
+        if interaction.type == discord.InteractionType.application_command:
+            interaction.extras['started'] = time.perf_counter()
+            interaction.extras['trace'] = tracer.begin((interaction.data or {}).get('name', 'unknown'), str(interaction.user))
+        return True
+    
+    def finish(self, interaction, outcome):
+        started = interaction.extras.pop('started', None)
+        if started is None:
+            return
+        command = interaction.command.qualified_name if interaction.command else 'unknown'
+        telemetry.command_duration.observe(command, outcome, value=time.perf_counter() - started)
+        tracer.end(interaction.extras.pop('trace', None))
+    
+    async def on_command_completion(self, interaction, command):
+        self.finish(interaction, 'ok')
+    
+    async def on_error(self, interaction, error):
+        self.finish(interaction, 'error')
+        await super().on_error(interaction, error)
+
+# ==================== TRACING ====================
+
+current_trace = contextvars.ContextVar('current_trace', default=None)
+current_depth = contextvars.ContextVar('current_depth', default=0)
+
+class Trace:
+    """Spans recorded during one command invocation"""
+    
+    def __init__(self, command, user):
+        self.command = command
+        self.user = user
+        self.time = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.spans = []  # [name, offset, duration, depth, failed]
+        self.dropped = 0
+
+class Span:
+    __slots__ = ('trace', 'name', 'started', 'token', 'record')
+    
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        depth = current_depth.get()
+        self.token = current_depth.set(depth + 1)
+        self.record = None
+        if len(self.trace.spans) < TRACE_MAX_SPANS:
+            self.record = [self.name, self.started - self.trace.started, None, depth, False]
+            self.trace.spans.append(self.record)
+        else:
+            self.trace.dropped += 1
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        current_depth.reset(self.token)
+        if self.record:
+            self.record[2] = time.perf_counter() - self.started
+            self.record[4] = exc_type is not None
+        return False
+
+class NullSpan:
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_SPAN = NullSpan()
+
+def span(name):
+    """Time a block as part of the current command's trace; a no-op when the command isn't traced"""
+    trace = current_trace.get()
+    return Span(trace, name) if trace else NULL_SPAN
+
+async def _untraced(coro):
+    current_trace.set(None)
+    current_depth.set(0)
+    return await coro
+
+def start_background(coro):
+    """Start work that may outlive the current command in a task whose spans go to no trace"""
+    return asyncio.create_task(_untraced(coro))
+
+def rest_span_name(method, url):
+    """Span name for a Discord REST call, with IDs and interaction tokens left out"""
+    path = re.sub(r'^/api/v\d+', '', url.path)
+    path = re.sub(r'/\d{15,}(?=/|$)', '/{id}', path)
+    path = re.sub(r'/[\w.-]{40,}(?=/|$)', '/{token}', path)
+    return f"discord {method} {path}"
+
+async def on_rest_start(session, context, params):
+    context.span = span(rest_span_name(params.method, params.url)) if current_trace.get() else NULL_SPAN
+    context.span.__enter__()
+
+async def on_rest_end(session, context, params):
+    context.span.__exit__(None, None, None)
+
+async def on_rest_exception(session, context, params):
+    context.span.__exit__(type(params.exception), params.exception, None)
+
+def rest_trace_config():
+    """aiohttp tracing for the bot's session, which also carries interaction responses, so each call becomes a span"""
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(on_rest_start)
+    config.on_request_end.append(on_rest_end)
+    config.on_request_exception.append(on_rest_exception)
+    return config
+
+class Tracer:
+    """Samples command invocations and keeps the most recent traces"""
+    
+    def __init__(self):
+        self.traces = deque(maxlen=TRACE_BUFFER)
+    
+    def begin(self, command, user):
+        """Start a trace, current for the rest of the calling task, or return None if not sampled"""
+        if random.random() >= TRACE_SAMPLE_RATE:
+            return None
+        trace = Trace(command, user)
+        current_trace.set(trace)
+        return trace
+    
+    def end(self, trace):
+        if not trace:
+            return
+        trace.duration = time.perf_counter() - trace.started
+        self.traces.append(trace)
+    
+    def last(self, command=None):
+        for trace in reversed(self.traces):
+            if command is None or trace.command == command:
+                return trace
+        return None
+    
+    @staticmethod
+    def waterfall(trace, width=24, limit=3800):
+        """Text waterfall of a trace's spans, one line per span"""
+        total = trace.duration or 1e-9
+        lines = []
+        size = 0
+        for number, (name, offset, duration, depth, failed) in enumerate(trace.spans):
+            start = min(int(offset / total * width), width - 1)
+            length = max(1, round((duration or 0) / total * width)) if duration is not None else width - start
+            bar = (" " * start + ("▓" if failed else "█") * length)[:width].ljust(width)
+            label = (" " * depth + name)[:30].ljust(30)
+            timing = f"{duration * 1000:8.1f}ms" if duration is not None else "   running"
+            line = f"{label} |{bar}| {timing}"
+            if size + len(line) > limit:
+                lines.append(f"… {len(trace.spans) - number} more spans")
+                break
+            lines.append(line)
+            size += len(line) + 1
+        if trace.dropped:
+            lines.append(f"… {trace.dropped} spans not recorded")
+        return "\n".join(lines) or "No spans recorded"
+
+tracer = Tracer()
+
+# ==================== LOOP WATCHDOG ====================
+
+class LoopWatchdog:
+    """Measures event loop lag and captures the stack of whatever blocks the loop"""
+    
+    def __init__(self):
+        self.reports = deque(maxlen=LOOP_STALL_REPORTS)
+        self.stalls = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.last_beat = time.monotonic()
+        self.capture = None  # (wall time, stack) taken by the watcher thread during the current stall
+        self.loop_thread = None
+        self.heartbeat_task = None
+        self.stopped = threading.Event()
+    
+    def start(self):
+        self.loop_thread = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.heartbeat_task = asyncio.create_task(self.heartbeat())
+        threading.Thread(target=self.watch, name="loop-watchdog", daemon=True).start()
+    
+    def stop(self):
+        self.stopped.set()
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+    
+    async def heartbeat(self):
+        while True:
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            now = time.monotonic()
+            lag = max(now - self.last_beat - LOOP_LAG_INTERVAL, 0)
+            self.last_beat = now
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            telemetry.loop_lag.observe(value=lag)
+            telemetry.loop_lag_last.set(value=lag)
+            capture, self.capture = self.capture, None
+            if lag >= LOOP_STALL_THRESHOLD:
+                self.record(lag, capture)
+    
+    def watch(self):
+        """Runs in its own thread, so it keeps going while the loop is stuck"""
+        # Sample early so short stalls are still caught; it is only reported if the lag reaches the threshold
+        while not self.stopped.wait(LOOP_STALL_THRESHOLD / 10):
+            overdue = time.monotonic() - self.last_beat - LOOP_LAG_INTERVAL
+            if overdue >= LOOP_STALL_THRESHOLD / 2 and self.capture is None:
+                frame = sys._current_frames().get(self.loop_thread)
+                if frame is not None:
+                    self.capture = (time.time(), traceback.format_stack(frame))
+    
+    def record(self, lag, capture):
+        self.stalls += 1
+        started, stack = capture if capture else (time.time() - lag, [])
+        report = {'time': started, 'lag': lag, 'stack': stack, 'culprit': self.culprit(stack)}
+        self.reports.append(report)
+        print(f"⚠️ Event loop blocked for {lag * 1000:.0f}ms at {report['culprit']}")
+        send_to_logs(f"🐢 Event loop blocked for **{lag * 1000:.0f}ms** at `{report['culprit']}`")
+    
+    @staticmethod
+    def culprit(stack):
+        """Innermost frame in this file, else the innermost frame overall"""
+        if not stack:
+            return "unknown (stall ended before it was sampled)"
+        own = os.path.basename(__file__)
+        for entry in reversed(stack):
+            if f'/{own}"' in entry or f'"{own}"' in entry:
+                break
+        else:
+            entry = stack[-1]
+        location = entry.strip().splitlines()[0]
+        match = re.match(r'File "(.+)", line (\d+), in (.+)', location)
+        return f"{os.path.basename(match.group(1))}:{match.group(2)} in {match.group(3)}" if match else location
+
+# ==================== DOCKER CLIENT ====================
+
+class DockerError(Exception):
+    """Error returned by the Docker Engine API"""
+    
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ExecStream:
+    """Demultiplexed stdout of a running `docker exec`"""
+    
+    def __init__(self, response):
+        self.response = response
+        self.buffer = b''
+        self.stderr = b''
+        self.eof = False
+        self.drain_task = None
+    
+    async def _read_frame(self):
+        # Non-TTY exec output is framed: 1 byte stream type, 3 padding, 4 byte big-endian size
+        header = await self.response.content.readexactly(8)
+        size = int.from_bytes(header[4:8], 'big')
+        return header[0], await self.response.content.readexactly(size)
+    
+    async def readline(self):
+        """Read one stdout line, returning b'' at end of stream"""
+        while b'\n' not in self.buffer and not self.eof:
+            try:
+                stream_type, payload = await self._read_frame()
+            except (asyncio.IncompleteReadError, aiohttp.ClientError):
+                self.eof = True
+                break
+            if stream_type == 1:
+                self.buffer += payload
+            elif stream_type == 2:
+                self.stderr = (self.stderr + payload)[-4096:]
+        if b'\n' in self.buffer:
+            line, _, self.buffer = self.buffer.partition(b'\n')
+            return line + b'\n'
+        line, self.buffer = self.buffer, b''
+        return line
+    
+    def detach(self):
+        """Keep consuming output in the background so the exec'd process never blocks on a full pipe"""
+        async def drain():
+            while await self.readline():
+                pass
+            self.close()
+        self.drain_task = start_background(drain())
+    
+    def close(self):
+        self.response.close()
+
+class DockerClient:
+    """Async Docker Engine API client over the unix socket, or TCP when given a URL"""
+    
+    def __init__(self, socket_path=DOCKER_SOCKET, url=None, ssl_context=None):
+        self.socket_path = socket_path
+        self.url = url
+        self.ssl_context = ssl_context  # Client certificate and CA for an https:// daemon
+        self.base_url = f"{(url or 'http://docker').rstrip('/')}/{DOCKER_API_VERSION}"
+        self.session = None
+        self.stream_session = None
+    
+    def _connector(self, **kwargs):
+        if self.url:
+            return aiohttp.TCPConnector(ssl=self.ssl_context or True, **kwargs)
+        return aiohttp.UnixConnector(path=self.socket_path, **kwargs)
+    
+    def _get_session(self, stream=False):
+        # Short calls share a keep-alive pool; long-lived streams get their own
+        # connector so they can't starve the pool
+        if stream:
+            if self.stream_session is None or self.stream_session.closed:
+                self.stream_session = aiohttp.ClientSession(
+                    connector=self._connector(limit=0, force_close=True),
+                    timeout=aiohttp.ClientTimeout(total=None, sock_connect=10)
+                )
+            return self.stream_session
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=self._connector(limit=100),
+                timeout=aiohttp.ClientTimeout(total=DOCKER_TIMEOUT, sock_connect=10)
+            )
+        return self.session
+    
+    async def close(self):
+        for session in (self.session, self.stream_session):
+            if session is not None and not session.closed:
+                await session.close()
+    
+    async def _request(self, method, path, params=None, body=None, stream=False, timeout=None, read_timeout=None):
+        """Call the API; timeout (seconds) replaces DOCKER_TIMEOUT, and also limits a stream.
+        
+        read_timeout limits the wait for each chunk of the response, however long it runs in total.
+        """
+        operation = docker_operation(method, path)
+        try:
+            # Streams are timed until the response headers arrive
+            with span(f"docker {operation}"):
+                async with telemetry.docker_duration.time(operation):
+                    return await self._send(method, path, params, body, stream, timeout, read_timeout)
+        except DockerError as e:
+            telemetry.docker_errors.inc(operation, e.status)
+            raise
+    
+    async def _send(self, method, path, params, body, stream, timeout, read_timeout):
+        session = self._get_session(stream)
+        kwargs = {}
+        if timeout or read_timeout:
+            kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout, sock_connect=10, sock_read=read_timeout)
+        if params:
+            params = {
+                key: json.dumps(value) if isinstance(value, dict) else str(value).lower() if isinstance(value, bool) else str(value)
+                for key, value in params.items()
+            }
+        try:
+            response = await session.request(method, self.base_url + path, params=params, json=body, **kwargs)
+        except asyncio.TimeoutError:
+            raise DockerError(504, f"Docker daemon didn't answer {method} {path} in time")
+        except aiohttp.ClientError as e:
+            raise DockerError(0, f"Docker daemon unreachable: {e}")
+        if response.status >= 400:
+            try:
+                message = (await response.json(content_type=None)).get('message', response.reason)
+            except Exception:
+                message = response.reason
+            response.release()
+            raise DockerError(response.status, message)
+        if stream:
+            return response
+        async with response:
+            if response.status in (204, 304):
+                return None
+            try:
+                data = await response.read()
+            except asyncio.TimeoutError:
+                raise DockerError(504, f"Docker daemon didn't finish answering {method} {path} in time")
+        if not data:
+            return None
+        if response.content_type == 'application/json':
+            return json.loads(data)
+        return data
+    
+    async def pull_image(self, image):
+        name, tag = image, 'latest'
+        # A colon before the last slash is a registry port, not a tag
+        if ':' in image.rsplit('/', 1)[-1]:
+            name, tag = image.rsplit(':', 1)
+        response = await self._request(
+            "POST", "/images/create", params={'fromImage': name, 'tag': tag}, stream=True, read_timeout=DOCKER_PULL_STALL_TIMEOUT
+        )
+        async with response:
+            try:
+                async for line in response.content:
+                    if line.strip():
+                        progress = json.loads(line)
+                        if 'error' in progress:
+                            raise DockerError(500, progress['error'])
+            except asyncio.TimeoutError:
+                raise DockerError(504, f"pull of {image} made no progress for {DOCKER_PULL_STALL_TIMEOUT}s")
+    
+    async def info(self):
+        return await self._request("GET", "/info")
+    
+    async def inspect_image(self, image):
+        return await self._request("GET", f"/images/{image}/json")
+    
+    async def remove_image(self, image, force=False):
+        await self._request("DELETE", f"/images/{image}", params={'force': force})
+    
+    async def tag_image(self, image, repo, tag):
+        await self._request("POST", f"/images/{image}/tag", params={'repo': repo, 'tag': tag})
+    
+    async def commit_container(self, container_id, repo=None, tag=None, comment=None):
+        """Save the container's filesystem as a new image, tagged repo:tag if given; returns its ID"""
+        params = {'container': container_id, 'pause': True}
+        if repo:
+            params.update(repo=repo, tag=tag or 'latest')
+        if comment:
+            params['comment'] = comment
+        return (await self._request("POST", "/commit", params=params, body={}, timeout=DOCKER_SLOW_TIMEOUT))['Id']
+    
+    async def prune_images(self):
+        """Remove dangling images; returns (images deleted, bytes reclaimed)"""
+        result = await self._request("POST", "/images/prune", params={'filters': {'dangling': ['true']}}, timeout=DOCKER_SLOW_TIMEOUT)
+        return len(result.get('ImagesDeleted') or []), result.get('SpaceReclaimed', 0)
+    
+    async def create_container(self, image, privileged=True, labels=None, host_config=None):
+        config = {
+            'Image': image,
+            'Tty': True,
+            'OpenStdin': True,
+            'Labels': labels or {},
+            'HostConfig': {'Privileged': privileged, **(host_config or {})}
+        }
+        try:
+            result = await self._request("POST", "/containers/create", body=config)
+        except DockerError as e:
+            if e.status != 404:
+                raise
+            # Same as `docker run`: pull the missing image and try again
+            await self.pull_image(image)
+            result = await self._request("POST", "/containers/create", body=config)
+        return result['Id']
+    
+    async def run_container(self, image, privileged=True, labels=None, host_config=None):
+        """Equivalent of `docker run -itd`"""
+        container_id = await self.create_container(image, privileged=privileged, labels=labels, host_config=host_config)
+        try:
+            await self.start_container(container_id)
+        except DockerError:
+            await self.remove_container(container_id, force=True)
+            raise
+        return container_id
+    
+    async def inspect_container(self, container_id):
+        return await self._request("GET", f"/containers/{container_id}/json")
+    
+    async def container_changes(self, container_id):
+        """Files added, changed or deleted since the container was created from its image"""
+        return await self._request("GET", f"/containers/{container_id}/changes") or []
+    
+    async def container_exists(self, container_id):
+        try:
+            await self.inspect_container(container_id)
+            return True
+        except DockerError as e:
+            if e.status == 404:
+                return False
+            raise
+    
+    async def list_containers(self, all=True, filters=None):
+        params = {'all': all}
+        if filters:
+            params['filters'] = filters
+        return await self._request("GET", "/containers/json", params=params)
+    
+    async def start_container(self, container_id):
+        await self._request("POST", f"/containers/{container_id}/start")
+    
+    async def update_container(self, container_id, resources):
+        """Change the resource limits of a container, running or not"""
+        await self._request("POST", f"/containers/{container_id}/update", body=resources)
+    
+    async def stop_container(self, container_id, timeout=10):
+        # The daemon waits up to `timeout` for the container to exit before killing it
+        await self._request("POST", f"/containers/{container_id}/stop", params={'t': timeout}, timeout=timeout + DOCKER_TIMEOUT)
+    
+    async def restart_container(self, container_id, timeout=10):
+        await self._request("POST", f"/containers/{container_id}/restart", params={'t': timeout}, timeout=timeout + DOCKER_TIMEOUT)
+    
+    async def kill_container(self, container_id):
+        await self._request("POST", f"/containers/{container_id}/kill")
+    
+    async def remove_container(self, container_id, force=False):
+        await self._request("DELETE", f"/containers/{container_id}", params={'force': force})
+    
+    async def container_stats(self, container_id):
+        return await self._request("GET", f"/containers/{container_id}/stats", params={'stream': False})
+    
+    async def _create_exec(self, container_id, cmd):
+        result = await self._request("POST", f"/containers/{container_id}/exec", body={
+            'Cmd': cmd,
+            'AttachStdout': True,
+            'AttachStderr': True,
+            'Tty': False
+        })
+        return result['Id']
+    
+    async def exec_run(self, container_id, cmd):
+        """Run a command in the container to completion, returning (exit_code, output)"""
+        exec_id = await self._create_exec(container_id, cmd)
+        stream = ExecStream(await self._request(
+            "POST", f"/exec/{exec_id}/start", body={'Detach': False, 'Tty': False}, stream=True, timeout=DOCKER_TIMEOUT
+        ))
+        output = b''
+        try:
+            while True:
+                line = await stream.readline()
+                if not line:
+                    break
+                output += line
+        except asyncio.TimeoutError:
+            raise DockerError(504, f"`{' '.join(cmd)}` didn't finish within {DOCKER_TIMEOUT}s")
+        finally:
+            stream.close()
+        info = await self._request("GET", f"/exec/{exec_id}/json")
+        return info.get('ExitCode'), output.decode('utf-8', errors='replace')
+    
+    async def events(self, filters=None, since=None):
+        """Stream daemon events as they happen"""
+        params = {}
+        if filters:
+            params['filters'] = filters
+        if since is not None:
+            params['since'] = since
+        response = await self._request("GET", "/events", params=params, stream=True)
+        async with response:
+            async for line in response.content:
+                if line.strip():
+                    yield json.loads(line)
+    
+    async def exec_stream(self, container_id, cmd):
+        """Start a long-running command in the container and stream its output"""
+        exec_id = await self._create_exec(container_id, cmd)
+        return ExecStream(await self._request("POST", f"/exec/{exec_id}/start", body={'Detach': False, 'Tty': False}, stream=True))
+
+# ==================== NODE POOL ====================
+
+def plan_spec(plan):
+    return RESOURCE_PLANS.get(plan) or RESOURCE_PLANS[DEFAULT_PLAN]
+
+def plan_limits(plan):
+    """Memory in bytes and CPUs one instance on this plan commits"""
+    spec = plan_spec(plan)
+    return parse_size(spec['memory']), float(spec['cpus'])
+
+def plan_host_config(plan, live=False):
+    """Docker HostConfig limits for a plan; live=True leaves out what can't change after creation"""
+    spec = plan_spec(plan)
+    memory = parse_size(spec['memory'])
+    config = {
+        'Memory': memory,
+        'MemorySwap': memory,  # No swap on top of the limit
+        'NanoCpus': int(spec['cpus'] * 1e9),
+        'CpuShares': int(spec['cpus'] * 1024),  # Relative weight when the host's CPUs are contended
+        'PidsLimit': spec['pids']
+    }
+    if spec.get('disk') and not live:
+        config['StorageOpt'] = {'size': spec['disk']}
+    return config
+
+def describe_plan(plan):
+    spec = plan_spec(plan)
+    return f"{plan} ({spec['memory']} RAM, {spec['cpus']:g} CPU, {spec['pids']} processes{', ' + spec['disk'] + ' disk' if spec.get('disk') else ''})"
+
+def docker_tls_context(config):
+    """SSL context from a node's "ca", "cert" and "key" files, or None if it has none"""
+    if not any(config.get(key) for key in ('ca', 'cert', 'key')):
+        return None
+    context = ssl.create_default_context(cafile=config.get('ca'))
+    if config.get('cert'):
+        context.load_cert_chain(config['cert'], config.get('key'))
+    return context
+
+class Node:
+    """One Docker host and the memory it offers to instances"""
+    
+    def __init__(self, name, config):
+        self.name = name
+        url = config.get('url')
+        if url and url.startswith('http://'):
+            print(f"⚠️ Node {name} uses an unauthenticated Docker API at {url}; use https:// with a client certificate")
+        self.docker = DockerClient(config.get('socket', DOCKER_SOCKET), url=url, ssl_context=docker_tls_context(config))
+        self.memory_limit = config.get('memory')  # Docker-style size; None means all of the host's memory
+        self.configured_cpus = config.get('cpus')
+        # Remote hosts are measured by NodePool.discover(); until then they have no limit
+        self.host_memory = None if self.docker.url else psutil.virtual_memory().total
+        self.host_cpus = None if self.docker.url else os.cpu_count()
+        self.cpus = self.configured_cpus or self.host_cpus or float('inf')
+        self.unreachable_until = 0
+    
+    @property
+    def memory(self):
+        if self.memory_limit:
+            return parse_size(self.memory_limit)
+        return self.host_memory or float('inf')
+    
+    @property
+    def usable_memory(self):
+        """Memory usage can actually reach: the configured size, but never more than the host has"""
+        return min(self.memory, self.host_memory or float('inf'))
+    
+    @property
+    def usable_cpus(self):
+        return min(self.cpus, self.host_cpus or float('inf'))
+    
+    @property
+    def reachable(self):
+        return time.time() >= self.unreachable_until
+
+class NodePool:
+    """Docker hosts instances are placed on, and which one each container lives on"""
+    
+    def __init__(self, nodes, registry):
+        self.nodes = {name: Node(name, config) for name, config in nodes.items()}
+        self.default = self.nodes.get(DEFAULT_NODE) or next(iter(self.nodes.values()))
+        self.registry = registry
+        self.strategy = PLACEMENT_STRATEGY
+        self.held = {name: {} for name in self.nodes}  # node -> {plan: placed containers not yet registered}
+        self.locations = {}  # container_id -> node name, for containers not in the registry
+        missing = sorted(set(registry.node_plans) - set(self.nodes))
+        if missing:
+            print(f"⚠️ Instances are recorded on nodes missing from NODES: {', '.join(missing)}")
+    
+    def get(self, name):
+        """The node called name; containers with no recorded node are on the default one"""
+        if name is None:
+            return self.default
+        node = self.nodes.get(name)
+        if node is None:
+            raise DockerError(503, f"Node {name} is not configured")
+        return node
+    
+    def node_for(self, container_id):
+        record = self.registry.instances.get(container_id)
+        return self.get(record['node'] if record else self.locations.get(container_id))
+    
+    def docker_for(self, container_id):
+        return self.node_for(container_id).docker
+    
+    def committed(self, node):
+        """(instances, memory bytes, CPUs) committed on a node, including placements in progress"""
+        instances = memory = cpus = 0
+        for plans in (self.registry.node_plans.get(node.name, {}), self.held[node.name]):
+            for plan, count in plans.items():
+                plan_memory, plan_cpus = plan_limits(plan)
+                instances += count
+                memory += count * plan_memory
+                cpus += count * plan_cpus
+        return instances, memory, cpus
+    
+    def fits(self, node, plan, replacing=None):
+        """Whether node can take an instance on plan (instead of one on `replacing`) within the overcommit ratios"""
+        _, memory, cpus = self.committed(node)
+        plan_memory, plan_cpus = plan_limits(plan)
+        if replacing:
+            old_memory, old_cpus = plan_limits(replacing)
+            plan_memory -= old_memory
+            plan_cpus -= old_cpus
+        return (
+            memory + plan_memory <= node.memory * MEMORY_OVERCOMMIT
+            and cpus + plan_cpus <= node.cpus * CPU_OVERCOMMIT
+        )
+    
+    def can_place(self, plan, only=None):
+        return any(
+            node.reachable and self.fits(node, plan) and only in (None, node.name)
+            for node in self.nodes.values()
+        )
+    
+    def place(self, plan, prefer=None, only=None):
+        """Pick a node for a new container on plan and hold its resources until settle()
+        
+        prefer is a set of node names to choose from first, when any of them fits;
+        only restricts placement to one node name.
+        """
+        candidates = [
+            node for node in self.nodes.values()
+            if node.reachable and self.fits(node, plan) and only in (None, node.name)
+        ]
+        if not candidates:
+            raise DockerError(507, f"No node has room for another {plan} instance")
+        if prefer:
+            candidates = [node for node in candidates if node.name in prefer] or candidates
+        if self.strategy == 'bin-pack':
+            node = min(candidates, key=lambda n: n.memory * MEMORY_OVERCOMMIT - self.committed(n)[1])
+        else:
+            node = min(candidates, key=lambda n: self.committed(n)[1] / n.memory)
+        held = self.held[node.name]
+        held[plan] = held.get(plan, 0) + 1
+        return node
+    
+    def track(self, container_id, node):
+        """Remember where a container that isn't an instance yet was created"""
+        self.locations[container_id] = node.name
+    
+    def settle(self, node, plan, container_id=None):
+        """Release a placement once its container is registered or gone"""
+        self.held[node.name][plan] -= 1
+        self.locations.pop(container_id, None)
+    
+    async def discover(self):
+        """Read the memory and CPUs of remote nodes that weren't given a size"""
+        async def measure(node):
+            try:
+                info = await node.docker.info()
+            except DockerError as e:
+                print(f"⚠️ Couldn't read the size of node {node.name}: {e}")
+                return
+            node.host_memory = info.get('MemTotal') or None
+            node.host_cpus = info.get('NCPU') or None
+            if not node.configured_cpus:
+                node.cpus = node.host_cpus or float('inf')
+        
+        await asyncio.gather(*(
+            measure(node) for node in self.nodes.values()
+            if node.docker.url and not (node.memory_limit and node.configured_cpus)
+        ))
+    
+    def mark_unreachable(self, node):
+        node.unreachable_until = time.time() + NODE_RETRY_INTERVAL
+        print(f"⚠️ Node {node.name} unreachable, skipping it for {NODE_RETRY_INTERVAL}s")
+    
+    async def close(self):
+        for node in self.nodes.values():
+            await node.docker.close()
+
+# ==================== CONTAINER STATE CACHE ====================
+
+class ContainerStateCache:
+    """Container status and resource usage kept current from the Docker events stream"""
+    
+    EVENT_STATUS = {
+        'create': 'created',
+        'start': 'running',
+        'unpause': 'running',
+        'pause': 'paused',
+        'stop': 'exited',
+        'die': 'exited'
+    }
+    
+    def __init__(self, nodes, registry):
+        self.nodes = nodes
+        self.registry = registry
+        self.states = {}  # container_id -> {'status', 'cpu', 'mem_used', 'mem_limit', 'updated'}
+        self.seen = {name: set() for name in nodes.nodes}  # node -> container IDs it reported
+        self.live_nodes = set()  # Nodes whose events stream is connected
+        self.status_updated = 0
+        self.stats_updated = 0
+        self.watch_tasks = []
+        self.sample_listeners = []  # Called with (container_id, entry) after each stats sample
+    
+    @property
+    def live(self):
+        return len(self.live_nodes) == len(self.seen)
+    
+    def start(self):
+        self.watch_tasks = [asyncio.create_task(self.watch(node)) for node in self.nodes.nodes.values()]
+    
+    def stop(self):
+        for task in self.watch_tasks:
+            task.cancel()
+    
+    def _entry(self, container_id):
+        return self.states.setdefault(container_id, {
+            'status': None, 'cpu': '0.00%', 'mem_used': '0B', 'mem_limit': '0B', 'updated': 0
+        })
+    
+    async def sync(self, node):
+        """Replace a node's statuses with a fresh list from its daemon"""
+        containers = await node.docker.list_containers(all=True)
+        seen = set()
+        for container in containers:
+            entry = self._entry(container['Id'])
+            entry['status'] = container['State']
+            seen.add(container['Id'])
+        for container_id in self.seen[node.name] - seen:
+            self.states.pop(container_id, None)
+        self.seen[node.name] = seen
+        self.status_updated = time.time()
+    
+    def apply_event(self, node, event):
+        container_id = event.get('Actor', {}).get('ID') or event.get('id')
+        action = event.get('Action', '')
+        if not container_id:
+            return
+        if action == 'destroy':
+            self.states.pop(container_id, None)
+            self.seen[node.name].discard(container_id)
+        elif action in self.EVENT_STATUS:
+            self.seen[node.name].add(container_id)
+            entry = self._entry(container_id)
+            entry['status'] = self.EVENT_STATUS[action]
+            if entry['status'] != 'running':
+                entry.update({'cpu': '0.00%', 'mem_used': '0B'})
+        self.status_updated = time.time()
+    
+    async def watch(self, node):
+        while True:
+            try:
+                # Subscribe from before the sync so nothing slips through the gap
+                since = int(time.time())
+                await self.sync(node)
+                self.live_nodes.add(node.name)
+                filters = {'type': ['container'], 'event': ['create', 'start', 'stop', 'die', 'destroy', 'pause', 'unpause']}
+                async for event in node.docker.events(filters=filters, since=since):
+                    self.apply_event(node, event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Docker events stream lost on node {node.name}: {e}")
+            self.live_nodes.discard(node.name)
+            await asyncio.sleep(5)
+    
+    async def sample_stats(self):
+        """Refresh CPU and memory for every running instance"""
+        running = [
+            container_id for container_id in self.registry.instances
+            if self.states.get(container_id, {}).get('status') == 'running'
+        ]
+        semaphore = asyncio.Semaphore(STATS_CONCURRENCY)
+        
+        async def sample(container_id):
+            async with semaphore:
+                raw = await self.nodes.docker_for(container_id).container_stats(container_id)
+            entry = self._entry(container_id)
+            entry.update(parse_container_stats(raw))
+            entry['updated'] = time.time()
+            for listener in self.sample_listeners:
+                listener(container_id, entry)
+        
+        await asyncio.gather(*(sample(c) for c in running), return_exceptions=True)
+        self.stats_updated = time.time()
+    
+    def status(self, container_id):
+        return self.states.get(container_id, {}).get('status')
+    
+    def stats(self, container_id):
+        return self.states.get(container_id, {'cpu': '0.00%', 'mem_used': '0B', 'mem_limit': '0B'})
+    
+    def freshness(self):
+        """Human-readable staleness of the cached data"""
+        status_text = "live" if self.live else f"<t:{int(self.status_updated)}:R>" if self.status_updated else "never"
+        stats_text = f"<t:{int(self.stats_updated)}:R>" if self.stats_updated else "pending"
+        return f"{EMOJI['clock']} Status: {status_text} • Stats sampled: {stats_text}"
+
+# ==================== LIFECYCLE SCHEDULER ====================
+
+class LifecycleScheduler:
+    """Caps concurrent container operations, serialises per container and queues fairly per user"""
+    
+    def __init__(self, limit=LIFECYCLE_CONCURRENCY):
+        self.limit = limit
+        self.active = 0
+        self.queues = OrderedDict()  # user -> deque of waiting futures, in round-robin order
+        self.locks = {}  # container_id -> [asyncio.Lock, holders + waiters]
+    
+    def position(self, user, future):
+        """1-based position of a waiting request under round-robin dispatch"""
+        queue = self.queues.get(user)
+        if not queue or future not in queue:
+            return 0
+        index = queue.index(future)
+        users = list(self.queues)
+        rank = users.index(user)
+        ahead = 0
+        for i, other in enumerate(users):
+            # Round k serves every user's k-th request, in rotation order
+            rounds = index + 1 if i < rank else index
+            ahead += min(len(self.queues[other]), rounds)
+        return ahead + 1
+    
+    def waiting(self):
+        return sum(len(queue) for queue in self.queues.values())
+    
+    def _dispatch(self):
+        while self.active < self.limit and self.queues:
+            user, queue = next(iter(self.queues.items()))
+            future = queue.popleft()
+            if queue:
+                self.queues.move_to_end(user)
+            else:
+                del self.queues[user]
+            if future.cancelled():
+                continue
+            self.active += 1
+            future.set_result(None)
+    
+    async def _acquire(self, user, on_queued):
+        if self.active < self.limit and not self.queues:
+            self.active += 1
+            return
+        
+        future = asyncio.get_running_loop().create_future()
+        self.queues.setdefault(user, deque()).append(future)
+        reported = None
+        try:
+            while not future.done():
+                position = self.position(user, future)
+                if on_queued and position and position != reported:
+                    reported = position
+                    try:
+                        await on_queued(position)
+                    except Exception:
+                        pass
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), QUEUE_UPDATE_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Got the slot at the same moment we were cancelled
+                self._release()
+            else:
+                future.cancel()
+                queue = self.queues.get(user)
+                if queue and future in queue:
+                    queue.remove(future)
+                    if not queue:
+                        del self.queues[user]
+            raise
+        if reported and on_queued:
+            try:
+                await on_queued(0)
+            except Exception:
+                pass
+    
+    def _release(self):
+        self.active -= 1
+        self._dispatch()
+    
+    @asynccontextmanager
+    async def container_lock(self, container_id):
+        entry = self.locks.setdefault(container_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.locks[container_id]
+    
+    @asynccontextmanager
+    async def slot(self, user, container_id=None, on_queued=None):
+        """Run a container operation; on_queued(position) is awaited while waiting, with 0 once started"""
+        if container_id:
+            async with self.container_lock(container_id):
+                with span("lifecycle queue"):
+                    await self._acquire(user, on_queued)
+                try:
+                    yield
+                finally:
+                    self._release()
+        else:
+            with span("lifecycle queue"):
+                await self._acquire(user, on_queued)
+            try:
+                yield
+            finally:
+                self._release()
+
+# ==================== IDLE REAPER ====================
+
+class IdleReaper:
+    """Deletes instances after INACTIVITY_TIMEOUT without activity"""
+    
+    def __init__(self, nodes, registry, state_cache, lifecycle):
+        self.nodes = nodes
+        self.registry = registry
+        self.lifecycle = lifecycle
+        self.last_activity = {}  # container_id -> timestamp
+        self.last_net_bytes = {}
+        # (deadline, container_id); entries go stale when an instance is touched
+        # and are re-pushed lazily when popped, so touches stay O(1)
+        self.deadlines = []
+        self.dry_run = REAPER_DRY_RUN
+        
+        now = time.time()
+        for container_id in registry.instances:
+            self.track(container_id, now)
+        state_cache.sample_listeners.append(self.observe_sample)
+    
+    def track(self, container_id, now=None):
+        now = now or time.time()
+        self.last_activity[container_id] = now
+        heapq.heappush(self.deadlines, (now + INACTIVITY_TIMEOUT, container_id))
+    
+    def touch(self, container_id):
+        if container_id in self.last_activity:
+            self.last_activity[container_id] = time.time()
+    
+    def observe_sample(self, container_id, entry):
+        """Count CPU or network use from a stats sample as activity"""
+        net_bytes = entry.get('net_bytes', 0)
+        previous = self.last_net_bytes.get(container_id)
+        self.last_net_bytes[container_id] = net_bytes
+        if entry.get('cpu_percent', 0) >= REAPER_CPU_THRESHOLD:
+            self.touch(container_id)
+        elif previous is not None and net_bytes - previous >= REAPER_NET_THRESHOLD:
+            self.touch(container_id)
+    
+    def forget(self, container_id):
+        self.last_activity.pop(container_id, None)
+        self.last_net_bytes.pop(container_id, None)
+    
+    async def has_tmate_clients(self, container_id):
+        try:
+            exit_code, output = await self.nodes.docker_for(container_id).exec_run(container_id, TMATE_CLIENTS_CMD)
+            return exit_code == 0 and sum(int(count) for count in output.split()) > 0
+        except (DockerError, ValueError):
+            return False
+    
+    async def tick(self):
+        """Handle every instance whose deadline has passed"""
+        now = time.time()
+        while self.deadlines and self.deadlines[0][0] <= now:
+            _, container_id = heapq.heappop(self.deadlines)
+            if container_id not in self.registry.instances:
+                self.forget(container_id)
+                continue
+            
+            deadline = self.last_activity.get(container_id, now) + INACTIVITY_TIMEOUT
+            if deadline > now:
+                heapq.heappush(self.deadlines, (deadline, container_id))
+                continue
+            
+            # Only instances that look idle pay for the tmate probe
+            if await self.has_tmate_clients(container_id):
+                self.track(container_id)
+                continue
+            
+            await self.reap(container_id, now)
+    
+    async def reap(self, container_id, now):
+        record = self.registry.instances[container_id]
+        idle = timedelta(seconds=int(now - self.last_activity.get(container_id, now)))
+        
+        if self.dry_run:
+            send_to_logs(f"🧹 [DRY RUN] Would delete idle instance `{container_id[:12]}` owned by `{record['owner']}` (idle {idle})")
+            self.track(container_id)
+            return
+        
+        try:
+            async with self.lifecycle.slot('reaper', container_id):
+                # A command may have used the instance while we waited for its lock
+                if self.last_activity.get(container_id, now) > now:
+                    heapq.heappush(self.deadlines, (self.last_activity[container_id] + INACTIVITY_TIMEOUT, container_id))
+                    return
+                await self.nodes.docker_for(container_id).remove_container(container_id, force=True)
+        except DockerError as e:
+            if e.status != 404:
+                print(f"⚠️ Failed to reap {container_id[:12]}: {e}")
+                self.track(container_id)
+                return
+        
+        self.registry.remove(container_id)
+        self.forget(container_id)
+        send_to_logs(f"🧹 Deleted idle instance `{container_id[:12]}` owned by `{record['owner']}` (idle {idle})")
+
+# ==================== WARM POOL ====================
+
+class WarmPool:
+    """Pre-started containers with tmate already negotiated, handed out by /deploy"""
+    
+    LABEL = 'vantanodes.pool'
+    
+    def __init__(self, nodes, registry, state_cache):
+        self.nodes = nodes
+        self.registry = registry
+        self.state_cache = state_cache
+        self.sizes = dict(WARM_POOL_SIZES)
+        self.ready = {os_id: [] for os_id in OS_OPTIONS}  # os_id -> [{'container_id', 'ssh_command', 'node', 'plan', 'created'}]
+        self.filling = {os_id: 0 for os_id in OS_OPTIONS}
+        self.refill_lock = asyncio.Lock()
+        self.semaphore = asyncio.Semaphore(WARM_POOL_CONCURRENCY)
+        self.tasks = set()
+    
+    @staticmethod
+    def plan(os_id):
+        """Pool containers get their OS's plan, so only owners without a plan of their own can use them"""
+        return OS_PLANS.get(os_id, DEFAULT_PLAN)
+    
+    def reserved_memory(self):
+        return sum(
+            (len(self.ready[os_id]) + self.filling[os_id]) * plan_limits(self.plan(os_id))[0]
+            for os_id in OS_OPTIONS
+        )
+    
+    def available(self, os_id):
+        return len(self.ready.get(os_id, []))
+    
+    async def cleanup(self):
+        """Remove pool containers left over from a previous run; their tmate sessions are gone"""
+        for node in self.nodes.nodes.values():
+            try:
+                containers = await node.docker.list_containers(all=True, filters={'label': [self.LABEL]})
+            except DockerError as e:
+                print(f"⚠️ Warm pool: couldn't clean up node {node.name}: {e}")
+                continue
+            for container in containers:
+                if container['Id'] not in self.registry.instances:
+                    try:
+                        await node.docker.remove_container(container['Id'], force=True)
+                    except DockerError:
+                        pass
+    
+    async def acquire(self, os_id):
+        """Take a ready container for os_id, or None if the pool is empty"""
+        entries = self.ready.get(os_id, [])
+        while entries:
+            entry = entries.pop(0)
+            if await self.healthy(entry):
+                self.schedule_refill()
+                return entry
+            # Died, or lost its tmate session, while waiting in the pool
+            await self.discard(entry['container_id'], entry['plan'])
+        self.schedule_refill()
+        return None
+    
+    async def healthy(self, entry):
+        """Whether a pool container is still running with its tmate session attached"""
+        container_id = entry['container_id']
+        exec_stream = bot.tmate_streams.get(container_id)
+        if exec_stream is None or exec_stream.drain_task.done():
+            return False
+        status = self.state_cache.status(container_id)
+        if status is None:
+            # Not seen by the state cache yet; ask the node
+            try:
+                status = (await self.nodes.docker_for(container_id).inspect_container(container_id))['State']['Status']
+            except DockerError:
+                return False
+        return status == 'running'
+    
+    async def discard(self, container_id, plan):
+        node = self.nodes.node_for(container_id)
+        try:
+            await node.docker.remove_container(container_id, force=True)
+        except DockerError:
+            pass
+        finally:
+            self.nodes.settle(node, plan, container_id)
+    
+    def schedule_refill(self):
+        task = start_background(self.refill())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+    
+    async def refill(self):
+        """Top every OS up to its target size while staying inside the memory budget"""
+        async with self.refill_lock:
+            budget = parse_size(WARM_POOL_MEMORY_BUDGET)
+            for os_id, target in self.sizes.items():
+                if os_id not in OS_OPTIONS:
+                    continue
+                per_container = plan_limits(self.plan(os_id))[0]
+                while len(self.ready[os_id]) + self.filling[os_id] < target:
+                    if self.reserved_memory() + per_container > budget:
+                        return
+                    self.filling[os_id] += 1
+                    task = start_background(self._fill_one(os_id))
+                    self.tasks.add(task)
+                    task.add_done_callback(self.tasks.discard)
+    
+    async def _fill_one(self, os_id):
+        plan = self.plan(os_id)
+        node = None
+        container_id = None
+        try:
+            async with self.semaphore:
+                node = self.nodes.place(plan)
+                container_id = await node.docker.run_container(
+                    OS_OPTIONS[os_id]["image"], labels={self.LABEL: os_id}, host_config=plan_host_config(plan)
+                )
+                self.nodes.track(container_id, node)
+                tmate = await start_tmate_session(container_id)
+            if tmate.ok:
+                # The placement stays held until the container is handed out
+                self.ready[os_id].append({
+                    'container_id': container_id,
+                    'ssh_command': tmate.ssh_command,
+                    'node': node.name,
+                    'plan': plan,
+                    'created': time.time()
+                })
+                node = container_id = None
+            else:
+                print(f"⚠️ Warm pool: {tmate.describe()} ({os_id})")
+        except Exception as e:
+            print(f"⚠️ Warm pool: failed to start {os_id} container: {e}")
+        finally:
+            self.filling[os_id] -= 1
+            if container_id:
+                await self.discard(container_id, plan)
+            elif node:
+                self.nodes.settle(node, plan)
+
+# ==================== IMAGE MANAGER ====================
+
+class ImageManager:
+    """Keeps every OS image present and current on every node, so deploys never wait for a pull"""
+    
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.images = {}  # (node, image) -> {'id', 'digest', 'size', 'pulled', 'pull_seconds', 'checked', 'error'}
+        self.semaphore = asyncio.Semaphore(IMAGE_PULL_CONCURRENCY)
+        self.refreshed = 0
+    
+    def present(self, node, image):
+        entry = self.images.get((node.name, image))
+        return bool(entry and entry['id'])
+    
+    async def sync(self, node, image):
+        """Pull image on node and record what is there; returns 'added', 'updated', 'current' or 'missing'"""
+        entry = self.images.setdefault((node.name, image), {
+            'id': None, 'digest': None, 'size': 0, 'pulled': 0, 'pull_seconds': None, 'checked': 0, 'error': None
+        })
+        async with self.semaphore:
+            started = time.perf_counter()
+            try:
+                # Cheap when the image is current: the registry only sends the manifest
+                await node.docker.pull_image(image)
+                entry['error'] = None
+                status = 'ok'
+            except DockerError as e:
+                # Images built on the node itself can't be pulled; they are fine as long as they exist
+                entry['error'] = str(e)
+                status = 'error'
+            entry['pull_seconds'] = time.perf_counter() - started
+            telemetry.image_pull_duration.observe(image, status, value=entry['pull_seconds'])
+            try:
+                details = await node.docker.inspect_image(image)
+            except DockerError as e:
+                if e.status != 404:
+                    raise
+                details = None
+        
+        entry['checked'] = time.time()
+        previous = entry['id']
+        if details is None:
+            entry.update({'id': None, 'digest': None, 'size': 0})
+            return 'missing'
+        entry.update({
+            'id': details['Id'],
+            'digest': (details.get('RepoDigests') or [None])[0],
+            'size': details.get('Size', 0)
+        })
+        if details['Id'] == previous:
+            return 'current'
+        entry['pulled'] = time.time()
+        return 'updated' if previous else 'added'
+    
+    async def refresh(self):
+        """Sync every OS image on every reachable node, then prune dangling layers"""
+        images = sorted({os_data['image'] for os_data in OS_OPTIONS.values()})
+        nodes = [node for node in self.nodes.nodes.values() if node.reachable]
+        jobs = [(node, image) for node in nodes for image in images]
+        results = await asyncio.gather(*(self.sync(node, image) for node, image in jobs), return_exceptions=True)
+        for (node, image), result in zip(jobs, results):
+            if isinstance(result, Exception):
+                print(f"⚠️ Image {image} on node {node.name}: {result}")
+            elif result == 'missing':
+                print(f"⚠️ Image {image} is missing on node {node.name}: {self.images[(node.name, image)]['error']}")
+            elif result == 'updated':
+                send_to_logs(f"📦 New version of `{image}` on node `{node.name}`")
+        
+        for node in nodes:
+            try:
+                deleted, reclaimed = await node.docker.prune_images()
+            except DockerError as e:
+                print(f"⚠️ Image prune failed on node {node.name}: {e}")
+                continue
+            if deleted:
+                telemetry.images_pruned.inc(node.name, amount=deleted)
+                send_to_logs(f"🧹 Pruned {deleted} dangling images on `{node.name}`, reclaimed {format_bytes(reclaimed)}")
+        self.refreshed = time.time()
+
+# ==================== SNAPSHOTS ====================
+
+class SnapshotError(Exception):
+    """A snapshot that can't be taken, kept or found"""
+
+def snapshot_repo(owner):
+    """Image repository holding owner's snapshots, e.g. `vantanodes-snapshots/alice-1a2b3c`"""
+    slug = re.sub(r'[^a-z0-9]+', '-', owner.lower()).strip('-')[:40] or 'user'
+    return f"{SNAPSHOT_REPO}/{slug}-{hashlib.sha1(owner.encode()).hexdigest()[:6]}"
+
+def snapshot_tag(name):
+    """Docker tag for a snapshot name, or None if nothing usable is left of it"""
+    tag = re.sub(r'[^A-Za-z0-9_.-]+', '-', name.strip()).strip('.-')[:128]
+    return tag or None
+
+class SnapshotManager:
+    """Per-user snapshots committed from instances' writable layers, kept within quotas.
+    
+    Base layers are shared by Docker, so each snapshot is charged only for what it adds
+    on top of the image its container was created from (an OS image or an earlier
+    snapshot). Least recently used snapshots are evicted to make room for new ones.
+    """
+    
+    def __init__(self, nodes, store):
+        self.nodes = nodes
+        self.store = store
+        self.snapshots = {(s['owner'], s['name']): s for s in store.snapshots()}
+        self.lock = asyncio.Lock()  # Quota accounting and eviction
+    
+    def get(self, owner, name):
+        return self.snapshots.get((owner, name)) or self.snapshots.get((owner, snapshot_tag(name)))
+    
+    def for_owner(self, owner):
+        """owner's snapshots, most recently used first"""
+        owned = [s for (o, _), s in self.snapshots.items() if o == owner]
+        return sorted(owned, key=lambda s: s['last_used'], reverse=True)
+    
+    def usage(self, owner=None):
+        return sum(s['size'] for (o, _), s in self.snapshots.items() if owner in (None, o))
+    
+    async def touch(self, snapshot):
+        snapshot['last_used'] = time.time()
+        await self.store.write(self.store.touch_snapshot, snapshot['owner'], snapshot['name'], snapshot['last_used'])
+    
+    async def _remove_image(self, snapshot):
+        """Untag a snapshot's image; Docker keeps the layers while clones or later snapshots use them"""
+        try:
+            await self.nodes.get(snapshot['node']).docker.remove_image(snapshot['image'], force=True)
+        except DockerError as e:
+            if e.status != 404:
+                print(f"⚠️ Failed to remove snapshot image {snapshot['image']}: {e}")
+    
+    async def delete(self, snapshot):
+        self.snapshots.pop((snapshot['owner'], snapshot['name']), None)
+        await self.store.write(self.store.remove_snapshot, snapshot['owner'], snapshot['name'])
+        await self._remove_image(snapshot)
+    
+    def _victims(self, owner, name, size):
+        """Snapshots to evict, least recently used first, so one of size fits every limit"""
+        quota = parse_size(SNAPSHOT_QUOTA)
+        storage_limit = parse_size(SNAPSHOT_STORAGE_LIMIT)
+        if size > quota or size > storage_limit:
+            raise SnapshotError(f"the snapshot is {format_bytes(size)}, more than the {format_bytes(min(quota, storage_limit))} allowed")
+        
+        others = [s for key, s in self.snapshots.items() if key != (owner, name)]
+        owned = sorted((s for s in others if s['owner'] == owner), key=lambda s: s['last_used'])
+        victims = []
+        while owned and (len(owned) + 1 > SNAPSHOT_LIMIT or sum(s['size'] for s in owned) + size > quota):
+            victims.append(owned.pop(0))
+        remaining = sorted((s for s in others if s not in victims), key=lambda s: s['last_used'])
+        while remaining and sum(s['size'] for s in remaining) + size > storage_limit:
+            victims.append(remaining.pop(0))
+        return victims
+    
+    async def create(self, record, name):
+        """Commit record's container as owner's snapshot called name, replacing any of that name.
+        
+        Returns (snapshot, evicted snapshots). Raises SnapshotError if the container has
+        no changes of its own or the snapshot is too big to keep.
+        """
+        owner = record['owner']
+        tag = snapshot_tag(name)
+        if not tag:
+            raise SnapshotError("the snapshot name has no usable characters")
+        node = self.nodes.get(record['node'])
+        docker = node.docker
+        
+        base_id = (await docker.inspect_container(record['container_id']))['Image']
+        parent = next((s for s in self.snapshots.values() if s['image_id'] == base_id and s['owner'] == owner), None)
+        source = f"snapshot `{parent['name']}`" if parent else "its OS image"
+        if not await docker.container_changes(record['container_id']):
+            # Committing would only store the image it already runs from again
+            raise SnapshotError(f"nothing has changed since the instance was created from {source}")
+        base = await docker.inspect_image(base_id)
+        # Committed under a throwaway tag until it's known to fit, so a failed snapshot never
+        # replaces a kept one. An untagged commit would be dangling and could be pruned meanwhile.
+        repo = snapshot_repo(owner)
+        pending = f"{repo}:pending-{os.urandom(4).hex()}"
+        with span("docker commit"):
+            image_id = await docker.commit_container(
+                record['container_id'], repo, pending.rsplit(':', 1)[1],
+                comment=f"Snapshot of {record['container_id'][:12]} for {owner}"
+            )
+        try:
+            size = max((await docker.inspect_image(image_id)).get('Size', 0) - base.get('Size', 0), 0)
+            
+            async with self.lock:
+                if size == 0 and parent:
+                    # Only runtime scratch files changed; the parent snapshot already holds this
+                    raise SnapshotError(f"nothing has changed since the instance was created from {source}")
+                victims = self._victims(owner, tag, size)
+                for victim in victims:
+                    await self.delete(victim)
+                
+                previous = self.snapshots.get((owner, tag))
+                await docker.tag_image(image_id, repo, tag)
+                now = time.time()
+                snapshot = {
+                    'owner': owner,
+                    'name': tag,
+                    'image': f"{repo}:{tag}",
+                    'image_id': image_id,
+                    'base_id': base_id,
+                    'node': node.name,
+                    'os_type': record.get('os_type'),
+                    'size': size,
+                    'created_at': now,
+                    'last_used': now
+                }
+                self.snapshots[(owner, tag)] = snapshot
+                await self.store.write(self.store.add_snapshot, snapshot)
+        finally:
+            # Only untags once the real tag is on; otherwise it deletes the rejected commit
+            try:
+                await docker.remove_image(pending, force=True)
+            except DockerError as e:
+                print(f"⚠️ Failed to remove pending snapshot image {pending}: {e}")
+        
+        if previous:
+            # The tag moved to the new image; the old one stays while anything is built on it
+            try:
+                await docker.remove_image(previous['image_id'])
+            except DockerError:
+                pass
+        telemetry.snapshots.inc('created')
+        if victims:
+            telemetry.snapshots.inc('evicted', amount=len(victims))
+        return snapshot, victims
+
+# ==================== ADMISSION CONTROL ====================
+
+class AdmissionRejected(Exception):
+    """A deploy refused by the admission controller"""
+
+class AdmissionController:
+    """Accepts, queues or rejects deploys by the headroom a node would have left after them.
+    
+    Load is the sampled usage of each node's instances (plus the host sampler for nodes on
+    this host), with instances not sampled yet and placements in progress counted at their
+    full plan limits. Headroom is measured against the memory and CPUs the host really has,
+    even when a node is configured larger to overcommit.
+    """
+    
+    def __init__(self, nodes, registry, state_cache, host_sampler):
+        self.nodes = nodes
+        self.registry = registry
+        self.state_cache = state_cache
+        self.host_sampler = host_sampler
+        self.memory_headroom = ADMISSION_MEMORY_HEADROOM
+        self.cpu_headroom = ADMISSION_CPU_HEADROOM
+        self.queue_limit = ADMISSION_QUEUE_LIMIT
+        self.queue = deque()  # Tickets of waiting deploys, first in first out
+        self.changed = asyncio.Event()
+    
+    def wake(self):
+        """Have waiting deploys re-check after new samples or a freed placement"""
+        self.changed.set()
+        self.changed = asyncio.Event()
+    
+    def loads(self):
+        """Predicted (memory bytes, CPUs) in use on each node"""
+        sampled = {name: [0.0, 0.0] for name in self.nodes.nodes}
+        pending = {name: [0.0, 0.0] for name in self.nodes.nodes}
+        for container_id, record in self.registry.instances.items():
+            entry = self.state_cache.states.get(container_id)
+            if entry and entry.get('updated'):
+                if entry.get('status') == 'running':
+                    usage = sampled.setdefault(record['node'], [0.0, 0.0])
+                    usage[0] += entry.get('mem_bytes', 0)
+                    usage[1] += entry.get('cpu_percent', 0.0) / 100
+            else:
+                memory, cpus = plan_limits(record['plan'])
+                usage = pending.setdefault(record['node'], [0.0, 0.0])
+                usage[0] += memory
+                usage[1] += cpus
+        for name, plans in self.nodes.held.items():
+            for plan, count in plans.items():
+                memory, cpus = plan_limits(plan)
+                pending[name][0] += count * memory
+                pending[name][1] += count * cpus
+        
+        host = self.host_sampler.latest()
+        loads = {}
+        for name, node in self.nodes.nodes.items():
+            memory, cpus = sampled[name]
+            if host and not node.docker.url:
+                # Same host as the bot, so other processes count too
+                memory = max(memory, host['mem_used'])
+                cpus = max(cpus, host['cpu'] / 100 * (node.host_cpus or 1))
+            loads[name] = (memory + pending[name][0], cpus + pending[name][1])
+        return loads
+    
+    def headroom_nodes(self, plan, only=None):
+        """Names of nodes that could take plan and keep the configured headroom of their real capacity"""
+        plan_memory, plan_cpus = plan_limits(plan)
+        loads = self.loads()
+        names = set()
+        for name, node in self.nodes.nodes.items():
+            if only not in (None, name) or not node.reachable or not self.nodes.fits(node, plan):
+                continue
+            memory, cpus = loads[name]
+            if (
+                memory + plan_memory <= node.usable_memory * (1 - self.memory_headroom)
+                and cpus + plan_cpus <= node.usable_cpus * (1 - self.cpu_headroom)
+            ):
+                names.add(name)
+        return names
+    
+    def check(self, plan, only=None):
+        """('accept' | 'queue' | 'reject', reason) for a new deploy on plan
+        
+        only restricts the deploy to one node, as for clones of a snapshot.
+        """
+        if not self.nodes.can_place(plan, only=only):
+            where = f"node {only}" if only else "no node"
+            return 'reject', f"{where} can take another {plan} instance without exceeding its overcommit limit"
+        plan_memory, plan_cpus = plan_limits(plan)
+        if not any(
+            plan_memory <= node.usable_memory * (1 - self.memory_headroom)
+            and plan_cpus <= node.usable_cpus * (1 - self.cpu_headroom)
+            for node in self.nodes.nodes.values() if only in (None, node.name)
+        ):
+            return 'reject', f"the {plan} plan is larger than any node allows"
+        # Arrivals go behind anyone already waiting
+        if not self.queue and self.headroom_nodes(plan, only=only):
+            return 'accept', None
+        if len(self.queue) >= self.queue_limit:
+            return 'reject', f"{len(self.queue)} deploys are already waiting for headroom"
+        return 'queue', "not enough free memory or CPU on any node right now"
+    
+    async def admit(self, plan, on_queued=None, only=None):
+        """Wait until a deploy on plan may go ahead and return the node placed for it.
+        
+        on_queued(position) is awaited while waiting, with 0 once admitted. Raises
+        AdmissionRejected if the deploy is refused or waits longer than ADMISSION_QUEUE_TIMEOUT.
+        """
+        decision, reason = self.check(plan, only=only)
+        telemetry.admissions.inc(decision)
+        if decision == 'reject':
+            raise AdmissionRejected(reason)
+        if decision == 'accept':
+            return self.nodes.place(plan, prefer=self.headroom_nodes(plan, only=only), only=only)
+        
+        ticket = object()
+        self.queue.append(ticket)
+        deadline = time.monotonic() + ADMISSION_QUEUE_TIMEOUT
+        reported = None
+        try:
+            while True:
+                position = self.queue.index(ticket) + 1
+                if position == 1:
+                    preferred = self.headroom_nodes(plan, only=only)
+                    if preferred:
+                        node = self.nodes.place(plan, prefer=preferred, only=only)
+                        break
+                if not self.nodes.can_place(plan, only=only):
+                    telemetry.admissions.inc('reject')
+                    where = f"node {only}" if only else "no node"
+                    raise AdmissionRejected(f"{where} can take another {plan} instance without exceeding its overcommit limit")
+                if on_queued and position != reported:
+                    reported = position
+                    try:
+                        await on_queued(position)
+                    except Exception:
+                        pass
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    telemetry.admissions.inc('timeout')
+                    raise AdmissionRejected(f"no headroom freed up within {ADMISSION_QUEUE_TIMEOUT}s")
+                try:
+                    await asyncio.wait_for(self.changed.wait(), min(remaining, QUEUE_UPDATE_INTERVAL))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.queue.remove(ticket)
+            self.wake()
+        if reported and on_queued:
+            try:
+                await on_queued(0)
+            except Exception:
+                pass
+        return node
+
+# ==================== HOST SAMPLER ====================
+
+class HostSampler:
+    """Host CPU, memory, disk, load and network samples in fixed-size ring buffers"""
+    
+    COLUMNS = ('time', 'cpu', 'mem_percent', 'mem_used', 'disk_percent', 'disk_used', 'load', 'net_sent', 'net_recv')
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.columns = {name: array('d', bytes(8 * capacity)) for name in self.COLUMNS}
+        self.head = 0  # Next slot to write
+        self.size = 0
+        self.mem_total = 0
+        self.disk_total = 0
+        self.last_net = None
+        psutil.cpu_percent(interval=None)  # Prime the counter; the first real sample measures from here
+    
+    def sample(self):
+        """Read the host counters; cheap, never sleeps"""
+        now = time.time()
+        mem = psutil.virtual_memory()
+        disk = psutil.disk_usage('/')
+        net = psutil.net_io_counters()
+        self.mem_total = mem.total
+        self.disk_total = disk.total
+        sent = recv = 0.0
+        if self.last_net:
+            last_time, last_sent, last_recv = self.last_net
+            elapsed = max(now - last_time, 1e-6)
+            sent = max(net.bytes_sent - last_sent, 0) / elapsed
+            recv = max(net.bytes_recv - last_recv, 0) / elapsed
+        self.last_net = (now, net.bytes_sent, net.bytes_recv)
+        return {
+            'time': now,
+            'cpu': psutil.cpu_percent(interval=None),
+            'mem_percent': mem.percent,
+            'mem_used': mem.used,
+            'disk_percent': disk.percent,
+            'disk_used': disk.used,
+            'load': os.getloadavg()[0] if hasattr(os, 'getloadavg') else 0.0,
+            'net_sent': sent,
+            'net_recv': recv
+        }
+    
+    def record(self, row):
+        for name in self.COLUMNS:
+            self.columns[name][self.head] = row[name]
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+    
+    def _indexes(self):
+        """Ring positions from oldest to newest"""
+        start = (self.head - self.size) % self.capacity
+        return ((start + i) % self.capacity for i in range(self.size))
+    
+    def latest(self):
+        if not self.size:
+            return None
+        i = (self.head - 1) % self.capacity
+        return {name: self.columns[name][i] for name in self.COLUMNS}
+    
+    def history(self, column, seconds, width=60):
+        """Average of a column over `width` equal time buckets covering the last `seconds`; None where no samples"""
+        times = self.columns['time']
+        values = self.columns[column]
+        start = time.time() - seconds
+        sums = [0.0] * width
+        counts = [0] * width
+        for i in self._indexes():
+            if times[i] < start:
+                continue
+            bucket = min(int((times[i] - start) * width / seconds), width - 1)
+            sums[bucket] += values[i]
+            counts[bucket] += 1
+        return [sums[b] / counts[b] if counts[b] else None for b in range(width)]
+
+# ==================== CONTAINER METRICS ====================
 
-# Animation frames for different states
-LOADING_ANIMATION = ["🔄", "⚡", "✨", "🌀", "🌪️", "🌈"]
-SUCCESS_ANIMATION = ["✅", "🎉", "✨", "🌟", "💫", "🔥"]
-ERROR_ANIMATION = ["❌", "💥", "⚠️", "🚨", "🔴", "🛑"]
-DEPLOY_ANIMATION = ["🚀", "🛰️", "🌌", "🔭", "👨‍🚀", "🪐"]
+class MetricSeries:
+    """One container's samples folded into fixed-width time buckets, oldest overwritten past the retention"""
+    
+    # Byte sums need exact 64-bit integers: a float32 is off by kilobytes past a few gigabytes
+    TYPECODES = {'count': 'H', 'cpu': 'f', 'mem': 'q', 'net_rx': 'q', 'net_tx': 'q', 'blk_read': 'q', 'blk_write': 'q'}
+    FIELDS = tuple(TYPECODES)
+    
+    def __init__(self, resolution, retention):
+        self.resolution = resolution
+        self.capacity = retention // resolution
+        self.times = array('I')  # Bucket starts, whole seconds
+        self.values = {name: array(code) for name, code in self.TYPECODES.items()}
+        self.head = -1  # Slot of the newest bucket
+    
+    def add(self, timestamp, row):
+        """Fold a row (count, sums of cpu/mem, byte deltas) into its bucket"""
+        start = int(timestamp - timestamp % self.resolution)
+        if self.head < 0 or start > self.times[self.head]:
+            if len(self.times) < self.capacity:
+                self.times.append(start)
+                for name in self.FIELDS:
+                    self.values[name].append(0)
+                self.head = len(self.times) - 1
+            else:
+                self.head = (self.head + 1) % self.capacity
+                self.times[self.head] = start
+                for name in self.FIELDS:
+                    self.values[name][self.head] = 0
+        # Late rows land in the newest bucket rather than reopening an old one
+        for name in self.FIELDS:
+            self.values[name][self.head] += row[name]
+    
+    def buckets(self, since=0):
+        """(start, row) pairs from oldest to newest"""
+        size = len(self.times)
+        for i in range(size):
+            slot = (self.head + 1 + i) % size
+            if self.times[slot] >= since:
+                yield self.times[slot], {name: self.values[name][slot] for name in self.FIELDS}
+    
+    def newest(self):
+        return self.times[self.head] if self.head >= 0 else 0
+
+class ContainerMetrics:
+    """Per-container CPU, memory, network and block I/O history, persisted as an append-only file"""
+    
+    # time, container ID (raw 32 bytes), sample count, cpu sum, mem sum, net rx/tx and blk read/write bytes
+    RECORD = struct.Struct('<d32sHf5q')
+    MAGIC = b'VNM\x02'  # Starts files in the RECORD format; older files are all LEGACY_RECORD
+    LEGACY_RECORD = struct.Struct('<d32sH6f')
+    
+    def __init__(self, path):
+        self.path = path
+        self.series = {}  # container_id -> {resolution: MetricSeries}
+        self.counters = {}  # container_id -> last cumulative (net_rx, net_tx, blk_read, blk_write)
+        self.pending = bytearray()
+        self.last_compact = 0
+        self.load()
+        self.compact()
+    
+    def _fold(self, container_id, timestamp, row, now):
+        series = self.series.get(container_id)
+        if series is None:
+            series = self.series[container_id] = {
+                resolution: MetricSeries(resolution, retention)
+                for resolution, retention in METRICS_RESOLUTIONS.items()
+            }
+        for resolution, retention in METRICS_RESOLUTIONS.items():
+            if timestamp >= now - retention:
+                series[resolution].add(timestamp, row)
+    
+    def _pack(self, container_id, timestamp, row):
+        return self.RECORD.pack(
+            timestamp, bytes.fromhex(container_id), int(row['count']), row['cpu'], row['mem'],
+            row['net_rx'], row['net_tx'], row['blk_read'], row['blk_write']
+        )
+    
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        now = time.time()
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        if data.startswith(self.MAGIC):
+            data, record = data[len(self.MAGIC):], self.RECORD
+        else:
+            # Rewritten in the current format by the compaction that follows
+            record = self.LEGACY_RECORD
+        usable = len(data) - len(data) % record.size  # Drop a record torn by a crash mid-write
+        for timestamp, raw_id, count, cpu, *sums in record.iter_unpack(data[:usable]):
+            mem, net_rx, net_tx, blk_read, blk_write = (round(value) for value in sums)
+            row = {
+                'count': count, 'cpu': cpu, 'mem': mem, 'net_rx': net_rx, 'net_tx': net_tx,
+                'blk_read': blk_read, 'blk_write': blk_write
+            }
+            self._fold(raw_id.hex(), timestamp, row, now)
+    
+    def observe(self, container_id, entry):
+        """Sample listener: record one stats sample"""
+        timestamp = entry['updated']
+        totals = (entry['net_rx'], entry['net_tx'], entry['blk_read'], entry['blk_write'])
+        previous = self.counters.get(container_id, totals)
+        self.counters[container_id] = totals
+        # Counters restart from zero with the container
+        deltas = [max(total - last, 0) for total, last in zip(totals, previous)]
+        row = {
+            'count': 1, 'cpu': entry['cpu_percent'], 'mem': entry['mem_bytes'],
+            'net_rx': deltas[0], 'net_tx': deltas[1], 'blk_read': deltas[2], 'blk_write': deltas[3]
+        }
+        self._fold(container_id, timestamp, row, timestamp)
+        self.pending += self._pack(container_id, timestamp, row)
+    
+    def _append(self, data):
+        with open(self.path, 'ab') as f:
+            if not f.tell():
+                f.write(self.MAGIC)  # The file was removed since the last compaction
+            f.write(data)
+    
+    def compact(self):
+        """Rewrite the file as the finest retained buckets of each period, dropping expired data"""
+        now = time.time()
+        resolutions = sorted(METRICS_RESOLUTIONS)
+        out = bytearray(self.MAGIC)
+        for container_id, series in list(self.series.items()):
+            if series[resolutions[-1]].newest() < now - METRICS_RESOLUTIONS[resolutions[-1]]:
+                del self.series[container_id]
+                self.counters.pop(container_id, None)
+                continue
+            # Each resolution covers the period the next finer one no longer keeps; boundaries are
+            # aligned to the coarser bucket so none is split. Written oldest first so a reload
+            # folds them back in order
+            boundary = float('inf')
+            ranges = []
+            for finer, coarser in zip(resolutions, resolutions[1:] + [None]):
+                lower = 0
+                if coarser:
+                    lower = now - METRICS_RESOLUTIONS[finer]
+                    lower += -lower % coarser
+                ranges.append((finer, lower, boundary))
+                boundary = lower
+            for resolution, lower, upper in reversed(ranges):
+                for start, row in series[resolution].buckets(lower):
+                    if start < upper:
+                        out += self._pack(container_id, start, row)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(out)
+        os.replace(tmp_path, self.path)
+        self.last_compact = now
+    
+    async def flush(self):
+        """Append samples taken since the last flush; compact once in a while"""
+        # Only the stats sampling loop writes to the series, and it awaits this call,
+        # so the worker thread never sees them change underneath it
+        if self.pending:
+            data = bytes(self.pending)
+            self.pending.clear()
+            await asyncio.to_thread(self._append, data)
+        if time.time() - self.last_compact >= METRICS_COMPACT_INTERVAL:
+            await asyncio.to_thread(self.compact)
+    
+    def history(self, container_id, column, seconds, width=60):
+        """Per-bucket averages (cpu, mem) or byte totals (I/O) over the last `seconds`, resampled to `width` points"""
+        series = self.series.get(container_id)
+        if not series:
+            return [None] * width
+        # Finest resolution that still covers the whole window
+        resolution = next(
+            (r for r in sorted(METRICS_RESOLUTIONS) if METRICS_RESOLUTIONS[r] >= seconds),
+            max(METRICS_RESOLUTIONS)
+        )
+        start = time.time() - seconds
+        sums = [0.0] * width
+        counts = [0.0] * width
+        averaged = column in ('cpu', 'mem')
+        for bucket_start, row in series[resolution].buckets(start - resolution):
+            point = min(max(int((bucket_start - start) * width / seconds), 0), width - 1)
+            sums[point] += row[column]
+            counts[point] = counts[point] + row['count'] if averaged else 1
+        return [sums[p] / counts[p] if counts[p] else None for p in range(width)]
+
+# ==================== LOG SINK ====================
+
+class LogSink:
+    """Logs channel writer: lines are queued and sent in batches so callers never wait on Discord"""
+    
+    MESSAGE_LIMIT = 2000
+    
+    def __init__(self, client, channel_id):
+        self.client = client
+        self.channel_id = channel_id
+        self.lines = deque()
+        self.wakeup = asyncio.Event()
+        self.drain_task = None
+        self.sent = 0  # Messages sent to the channel
+        self.dropped = 0  # Lines discarded because the queue was full
+        self.truncated = 0  # Lines cut to fit into one message
+        self.failed = 0  # Lines lost to send errors or a missing channel
+        self.reported_drops = 0
+    
+    def start(self):
+        self.drain_task = asyncio.create_task(self.drain())
+    
+    def write(self, message):
+        line = f"`[{datetime.now().strftime('%H:%M:%S')}]` {message}"
+        if len(line) > self.MESSAGE_LIMIT:
+            line = line[:self.MESSAGE_LIMIT - 1] + "…"
+            self.truncated += 1
+        if len(self.lines) >= LOG_QUEUE_SIZE:
+            self.lines.popleft()
+            self.dropped += 1
+        self.lines.append(line)
+        self.wakeup.set()
+    
+    def _pack(self):
+        """Take as many queued lines as fit into one message"""
+        parts = []
+        size = 0
+        if self.dropped > self.reported_drops:
+            parts.append(f"{EMOJI['warning']} {self.dropped - self.reported_drops} log lines dropped (queue full)")
+            size = len(parts[0])
+            self.reported_drops = self.dropped
+        # Lines are at most MESSAGE_LIMIT long, so the first one always fits
+        while self.lines and size + bool(parts) + len(self.lines[0]) <= self.MESSAGE_LIMIT:
+            line = self.lines.popleft()
+            size += bool(parts) + len(line)
+            parts.append(line)
+        return parts
+    
+    async def _send(self, parts):
+        channel = self.client.get_channel(self.channel_id)
+        try:
+            if not channel or not channel.permissions_for(channel.guild.me).send_messages:
+                self.failed += len(parts)
+                return
+            await channel.send("\n".join(parts))
+            self.sent += 1
+        except Exception as e:
+            self.failed += len(parts)
+            print(f"Failed to send logs: {e}")
+    
+    async def drain(self):
+        await self.client.wait_until_ready()
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while self.lines:
+                await self._send(self._pack())
+                # One message per interval keeps bursts clear of the channel rate limit
+                await asyncio.sleep(LOG_FLUSH_INTERVAL)
+    
+    async def close(self):
+        """Stop draining and send whatever is still queued"""
+        if self.drain_task:
+            self.drain_task.cancel()
+        try:
+            while self.lines:
+                await asyncio.wait_for(self._send(self._pack()), 5)
+        except Exception as e:
+            print(f"⚠️ Lost {len(self.lines)} log lines on shutdown: {e}")
 
 # ==================== BOT SETUP ====================
 intents = discord.Intents.default()
@@ -110,14 +2633,80 @@ intents.members = True
 
 class AdminBot(commands.Bot):
     def __init__(self):
-        super().__init__(command_prefix=commands.when_mentioned_or(PREFIX), intents=intents)
+        super().__init__(command_prefix=commands.when_mentioned_or(PREFIX), intents=intents, tree_cls=InstrumentedTree, http_trace=rest_trace_config())
         self.start_time = datetime.now()
         self.main_admin_id = MAIN_ADMIN_ID
         self.admins = set([MAIN_ADMIN_ID])
         self.bot_name = BOT_NAME
+        self.store = InstanceStore(database_file)
         
         # Load admins from file
         self.load_admins()
+        
+        # Import the old flat-file database if it is still around
+        if os.path.exists(legacy_database_file):
+            imported = self.store.import_legacy(legacy_database_file)
+            os.replace(legacy_database_file, legacy_database_file + '.imported')
+            print(f"✅ Imported {imported} instances from {legacy_database_file}")
+        
+        self.registry = InstanceRegistry(self.store)
+        self.user_plans = self.store.user_plans()  # owner -> plan name
+        self.nodes = NodePool(NODES, self.registry)
+        self.state_cache = ContainerStateCache(self.nodes, self.registry)
+        self.lifecycle = LifecycleScheduler()
+        self.reaper = IdleReaper(self.nodes, self.registry, self.state_cache, self.lifecycle)
+        self.tmate_streams = {}  # container_id -> ExecStream of the running `tmate -F`
+        self.cleanups = set()  # Cleanup tasks that must finish even though their command was cancelled
+        self.warm_pool = WarmPool(self.nodes, self.registry, self.state_cache)
+        self.log_sink = LogSink(self, LOGS_CHANNEL_ID)
+        self.host_sampler = HostSampler(HOST_HISTORY_SECONDS // HOST_SAMPLE_INTERVAL)
+        self.admission = AdmissionController(self.nodes, self.registry, self.state_cache, self.host_sampler)
+        self.images = ImageManager(self.nodes)
+        self.snapshots = SnapshotManager(self.nodes, self.store)
+        self.metrics = ContainerMetrics(metrics_file)
+        self.state_cache.sample_listeners.append(self.metrics.observe)
+        self.exporter = MetricsExporter(EXPORTER_HOST, EXPORTER_PORT) if EXPORTER_PORT else None
+        self.watchdog = LoopWatchdog()
+    
+    async def setup_hook(self):
+        await self.nodes.discover()
+        flush_registry.start()
+        self.state_cache.start()
+        sample_container_stats.start()
+        reap_idle_instances.start()
+        refill_warm_pool.start()
+        refresh_images.start()
+        self.log_sink.start()
+        sample_host_resources.start()
+        self.watchdog.start()
+        if self.exporter:
+            telemetry.collectors.append(collect_fleet_metrics)
+            logging.getLogger('discord.http').addHandler(RateLimitCounter(logging.WARNING))
+            try:
+                await self.exporter.start()
+            except OSError as e:
+                print(f"⚠️ Metrics exporter failed to start: {e}")
+    
+    async def close(self):
+        flush_registry.cancel()
+        sample_container_stats.cancel()
+        reap_idle_instances.cancel()
+        refill_warm_pool.cancel()
+        refresh_images.cancel()
+        sample_host_resources.cancel()
+        self.watchdog.stop()
+        if self.exporter:
+            await self.exporter.stop()
+        self.state_cache.stop()
+        await self.registry.flush()
+        await self.metrics.flush()
+        await self.log_sink.close()
+        if self.cleanups:
+            await asyncio.gather(*self.cleanups, return_exceptions=True)
+        for exec_stream in self.tmate_streams.values():
+            exec_stream.close()
+        await self.nodes.close()
+        await super().close()
     
     def load_admins(self):
         """Load admins from JSON file"""
@@ -177,147 +2766,454 @@ def create_embed(title, description=None, color=EMBED_COLOR, fields=None, footer
     
     return embed
 
+def parse_size(value):
+    """Parse a Docker-style size like '2g' or '512m' into bytes"""
+    value = str(value).strip().lower().rstrip('b')
+    units = {'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
 def generate_random_port():
     return random.randint(1025, 65535)
 
-def add_to_database(user, container_name, ssh_command):
-    with open(database_file, 'a') as f:
-        f.write(f"{user}|{container_name}|{ssh_command}\n")
+def add_to_database(user, container_name, ssh_command, os_type=None, node=None, plan=None):
+    with span("registry add"):
+        bot.registry.add(user, container_name, ssh_command, os_type, node, plan)
+        bot.reaper.track(container_name)
+
+def update_ssh_in_database(container_id, ssh_command):
+    with span("registry update"):
+        bot.registry.update_ssh(container_id, ssh_command)
+        bot.reaper.touch(container_id)
 
 def remove_from_database(ssh_command):
-    if not os.path.exists(database_file):
-        return
-    with open(database_file, 'r') as f:
-        lines = f.readlines()
-    with open(database_file, 'w') as f:
-        for line in lines:
-            if ssh_command not in line:
-                f.write(line)
+    with span("registry remove"):
+        bot.registry.remove_by_ssh(ssh_command)
 
 def remove_container_from_database_by_id(container_id):
-    if not os.path.exists(database_file):
-        return
-    with open(database_file, 'r') as f:
-        lines = f.readlines()
-    with open(database_file, 'w') as f:
-        for line in lines:
-            parts = line.strip().split('|')
-            if len(parts) < 2 or parts[1] != container_id:
-                f.write(line)
+    with span("registry remove"):
+        bot.registry.remove(container_id)
 
 def get_container_info_by_id(container_id):
-    if not os.path.exists(database_file):
+    server = bot.registry.find(container_id)
+    if not server:
         return None, None, None
-    with open(database_file, 'r') as f:
-        for line in f:
-            parts = line.strip().split('|')
-            if len(parts) >= 3 and parts[1].startswith(container_id):
-                return parts[0], parts[1], parts[2]
-    return None, None, None
+    return server['owner'], server['container_id'], server['ssh_command']
+
+def get_user_container(user, container_id):
+    """Find one of the user's instances by ID prefix"""
+    return bot.registry.find(container_id, owner=user)
 
 def get_user_servers(user):
-    if not os.path.exists(database_file):
-        return []
-    servers = []
-    with open(database_file, 'r') as f:
-        for line in f:
-            parts = line.strip().split('|')
-            if len(parts) >= 3 and parts[0] == user:
-                servers.append(line.strip())
-    return servers
+    return bot.registry.by_owner(user)
 
 def get_all_servers():
-    if not os.path.exists(database_file):
-        return []
-    servers = []
-    with open(database_file, 'r') as f:
-        for line in f:
-            servers.append(line.strip())
-    return servers
+    return bot.registry.all()
 
 def count_user_servers(user):
-    return len(get_user_servers(user))
+    return bot.registry.count(owner=user)
 
-async def capture_ssh_session_line(process):
+def plan_for(owner, os_id):
+    """Resource plan a new instance gets: the owner's own plan, else the OS's, else the default"""
+    return bot.user_plans.get(owner) or OS_PLANS.get(os_id, DEFAULT_PLAN)
+
+def get_os_label(server):
+    """Resolve the display name for an instance's OS"""
+    os_type = server.get('os_type')
+    if os_type in OS_OPTIONS:
+        return f"{OS_OPTIONS[os_type]['emoji']} {OS_OPTIONS[os_type]['name']}"
+    # Instances imported from database.txt don't record their OS
+    for os_id, os_data in OS_OPTIONS.items():
+        if os_id in server['ssh_command'].lower():
+            return f"{os_data['emoji']} {os_data['name']}"
+    return "Unknown"
+
+async def capture_ssh_session_line(exec_stream):
     while True:
-        output = await process.stdout.readline()
+        output = await exec_stream.readline()
         if not output:
             break
-        output = output.decode('utf-8').strip()
+        output = output.decode('utf-8', errors='replace').strip()
         if "ssh session:" in output:
             return output.split("ssh session:")[1].strip()
     return None
 
-def get_system_resources():
+class TmateResult:
+    """Outcome of a tmate session negotiation"""
+    
+    def __init__(self, status, ssh_command=None, stderr='', elapsed=0.0):
+        self.status = status  # 'ok', 'timeout', 'exited' or 'error'
+        self.ssh_command = ssh_command
+        self.stderr = stderr
+        self.elapsed = elapsed
+    
+    @property
+    def ok(self):
+        return self.status == 'ok'
+    
+    def describe(self):
+        if self.status == 'timeout':
+            return f"tmate did not provide a session within {self.elapsed:.0f}s"
+        if self.status == 'exited':
+            return f"tmate exited without a session{': ' + self.stderr if self.stderr else ''}"
+        return f"tmate failed: {self.stderr}"
+
+def start_cleanup(coro):
+    """Run cleanup for a cancelled command in the background; close() waits for it"""
+    task = start_background(coro)
+    bot.cleanups.add(task)
+    task.add_done_callback(bot.cleanups.discard)
+    return task
+
+async def kill_tmate(container_id, socket):
+    """Stop the tmate server on `socket`, leaving any other session in the container alone"""
     try:
-        cpu_percent = psutil.cpu_percent(interval=1)
-        mem = psutil.virtual_memory()
-        mem_total = mem.total / (1024 ** 3)
-        mem_used = mem.used / (1024 ** 3)
-        disk = psutil.disk_usage('/')
-        disk_total = disk.total / (1024 ** 3)
-        disk_used = disk.used / (1024 ** 3)
-        
-        return {
-            'cpu': cpu_percent,
-            'memory': {'total': round(mem_total, 2), 'used': round(mem_used, 2), 'percent': mem.percent},
-            'disk': {'total': round(disk_total, 2), 'used': round(disk_used, 2), 'percent': disk.percent}
-        }
-    except Exception:
+        await bot.nodes.docker_for(container_id).exec_run(container_id, ["tmate", "-S", socket, "kill-server"])
+    except DockerError:
+        pass
+
+async def start_tmate_session(container_id, timeout=None):
+    """Launch `tmate -F` in the container and wait (bounded) for its SSH session line"""
+    timeout = timeout or TMATE_TIMEOUT
+    started = time.monotonic()
+    exec_stream = None
+    socket = f"{TMATE_SOCKET_PREFIX}{os.urandom(8).hex()}.sock"
+    
+    # Only one live tmate stream per container; drop the previous one
+    previous = bot.tmate_streams.pop(container_id, None)
+    if previous:
+        previous.close()
+    
+    async def negotiate():
+        nonlocal exec_stream
+        # stdout and stderr arrive interleaved on the same exec stream and are
+        # demultiplexed by ExecStream, so stderr can never fill up and stall tmate
+        exec_stream = await bot.nodes.docker_for(container_id).exec_stream(container_id, ["tmate", "-S", socket, "-F"])
+        return await capture_ssh_session_line(exec_stream)
+    
+    try:
+        with span("tmate negotiate"):
+            ssh_session_line = await asyncio.wait_for(negotiate(), timeout)
+    except asyncio.TimeoutError:
+        status, ssh_session_line, error = 'timeout', None, ''
+    except DockerError as e:
+        status, ssh_session_line, error = 'error', None, str(e)
+    except asyncio.CancelledError:
+        if exec_stream:
+            exec_stream.close()
+        # The caller is going away; finish the kill in the background
+        start_cleanup(kill_tmate(container_id, socket))
+        raise
+    else:
+        status, error = ('ok', '') if ssh_session_line else ('exited', '')
+    
+    stderr = exec_stream.stderr.decode('utf-8', errors='replace').strip()[-500:] if exec_stream else ''
+    result = TmateResult(status, ssh_session_line, error or stderr, time.monotonic() - started)
+    telemetry.tmate_duration.observe(status, value=result.elapsed)
+    
+    if result.ok:
+        exec_stream.detach()
+        bot.tmate_streams[container_id] = exec_stream
+        exec_stream.drain_task.add_done_callback(
+            lambda _: bot.tmate_streams.pop(container_id, None) if bot.tmate_streams.get(container_id) is exec_stream else None
+        )
+    else:
+        if exec_stream:
+            exec_stream.close()
+        await kill_tmate(container_id, socket)
+    return result
+
+def get_system_resources():
+    """Latest host sample from the background sampler"""
+    sample = bot.host_sampler.latest()
+    if not sample:
         return {
             'cpu': 0,
             'memory': {'total': 0, 'used': 0, 'percent': 0},
-            'disk': {'total': 0, 'used': 0, 'percent': 0}
+            'disk': {'total': 0, 'used': 0, 'percent': 0},
+            'load': 0,
+            'network': {'sent': 0, 'recv': 0}
         }
+    return {
+        'cpu': round(sample['cpu'], 1),
+        'memory': {
+            'total': round(bot.host_sampler.mem_total / (1024 ** 3), 2),
+            'used': round(sample['mem_used'] / (1024 ** 3), 2),
+            'percent': sample['mem_percent']
+        },
+        'disk': {
+            'total': round(bot.host_sampler.disk_total / (1024 ** 3), 2),
+            'used': round(sample['disk_used'] / (1024 ** 3), 2),
+            'percent': sample['disk_percent']
+        },
+        'load': round(sample['load'], 2),
+        'network': {'sent': sample['net_sent'], 'recv': sample['net_recv']}
+    }
+
+def sparkline(values, ceiling=None):
+    """Render a series as block characters; None values become gaps"""
+    present = [v for v in values if v is not None]
+    if not present:
+        return ""
+    top = ceiling or max(present) or 1
+    last = len(SPARKS) - 1
+    return "".join(
+        " " if v is None else SPARKS[min(int(v / top * last + 0.5), last)]
+        for v in values
+    )
+
+def format_bytes(num):
+    """Format a byte count the way `docker stats` does (e.g. 512MiB)"""
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(num) < 1024:
+            return f"{num:.4g}{unit}"
+        num /= 1024
+    return f"{num:.4g}TiB"
+
+def parse_container_stats(raw):
+    """Turn an Engine API stats payload into CPU %, memory and cumulative network / block I/O counters"""
+    cpu_stats = raw.get('cpu_stats', {})
+    precpu_stats = raw.get('precpu_stats', {})
+    cpu_delta = cpu_stats.get('cpu_usage', {}).get('total_usage', 0) - precpu_stats.get('cpu_usage', {}).get('total_usage', 0)
+    system_delta = cpu_stats.get('system_cpu_usage', 0) - precpu_stats.get('system_cpu_usage', 0)
+    online_cpus = cpu_stats.get('online_cpus') or len(cpu_stats.get('cpu_usage', {}).get('percpu_usage') or []) or 1
+    cpu_percent = (cpu_delta / system_delta) * online_cpus * 100 if system_delta > 0 and cpu_delta > 0 else 0.0
+    
+    memory = raw.get('memory_stats', {})
+    # Same as the CLI: page cache doesn't count as used memory
+    cache = memory.get('stats', {}).get('inactive_file', memory.get('stats', {}).get('total_inactive_file', 0))
+    mem_used = max(memory.get('usage', 0) - cache, 0)
+    
+    networks = raw.get('networks') or {}
+    net_rx = sum(n.get('rx_bytes', 0) for n in networks.values())
+    net_tx = sum(n.get('tx_bytes', 0) for n in networks.values())
+    
+    blkio = raw.get('blkio_stats', {}).get('io_service_bytes_recursive') or []
+    blk_read = sum(e.get('value', 0) for e in blkio if e.get('op', '').lower() == 'read')
+    blk_write = sum(e.get('value', 0) for e in blkio if e.get('op', '').lower() == 'write')
+    
+    return {
+        'cpu': f"{cpu_percent:.2f}%",
+        'mem_used': format_bytes(mem_used),
+        'mem_limit': format_bytes(memory.get('limit', 0)),
+        'cpu_percent': cpu_percent,
+        'mem_bytes': mem_used,
+        'net_bytes': net_rx + net_tx,
+        'net_rx': net_rx,
+        'net_tx': net_tx,
+        'blk_read': blk_read,
+        'blk_write': blk_write
+    }
+
+async def get_container_statuses(container_ids):
+    """Get the state of many containers with a single list call per node"""
+    by_node = {}
+    for container_id in container_ids:
+        try:
+            node = bot.nodes.node_for(container_id)
+        except DockerError:
+            continue  # Its status stays unknown
+        by_node.setdefault(node, []).append(container_id)
+    
+    async def list_node(node, ids):
+        # Filtering by ID keeps the response small; for very large fleets the filter
+        # itself would blow past the daemon's header size limit, so list everything
+        filters = {'id': ids} if len(ids) <= STATUS_FILTER_MAX_IDS else None
+        try:
+            return await node.docker.list_containers(all=True, filters=filters)
+        except DockerError as e:
+            print(f"Error getting container statuses from node {node.name}: {e}")
+            return []
+    
+    results = await asyncio.gather(*(list_node(node, ids) for node, ids in by_node.items()))
+    return {c['Id']: c['State'] for containers in results for c in containers}
 
-def get_container_stats():
-    """Get CPU and memory usage for all running containers."""
+def format_status(status):
+    if not status:
+        return "🔴 Unknown"
+    status_emoji = "🟢" if status == "running" else "🔴"
+    return f"{status_emoji} {status.capitalize()}"
+
+async def get_cached_statuses(container_ids):
+    """Container statuses from the state cache, falling back to one bulk query before it has synced"""
+    if bot.state_cache.status_updated:
+        return {container_id: bot.state_cache.status(container_id) for container_id in container_ids}
+    return await get_container_statuses(container_ids)
+
+async def remove_container_quietly(node, container_id):
     try:
-        stats_raw = subprocess.check_output(
-            ["docker", "stats", "--no-stream", "--format", "{{.ID}}|{{.CPUPerc}}|{{.MemUsage}}"],
-            text=True
-        ).strip().split('\n')
-        
-        stats = {}
-        for line in stats_raw:
-            parts = line.split('|')
-            if len(parts) >= 3:
-                container_id = parts[0]
-                cpu_percent = parts[1].strip()
-                mem_usage_raw = parts[2].strip()
-
-                mem_match = re.match(r"(\d+(\.\d+)?\w+)\s+/\s+(\d+(\.\d+)?\w+)", mem_usage_raw)
-                
-                mem_used = 'N/A'
-                mem_limit = 'N/A'
+        await node.docker.remove_container(container_id, force=True)
+    except DockerError:
+        pass
+
+async def provision_instance(requester_id, owner, os_id, on_step=None, on_queued=None, on_admission=None, snapshot=None):
+    """Create an instance with a live tmate session and record it for owner.
+    
+    Uses the warm pool when it can, otherwise goes through admission control
+    (on_admission gets the admission queue position). With a snapshot the
+    instance is a clone of it, created on the node that holds its image.
+    Returns (container_id, TmateResult); if tmate fails the container is rolled
+    back and nothing is recorded. Raises AdmissionRejected when the deploy is refused.
+    """
+    os_data = OS_OPTIONS[os_id]
+    plan = plan_for(owner, os_id)
+    image = snapshot['image'] if snapshot else os_data["image"]
+    only = snapshot['node'] if snapshot else None
+    warm = None
+    if not snapshot and plan == bot.warm_pool.plan(os_id):
+        with span("warm pool acquire"):
+            warm = await bot.warm_pool.acquire(os_id)
+    if warm:
+        container_id = warm['container_id']
+        node = bot.nodes.get(warm['node'])
+        tmate = TmateResult('ok', warm['ssh_command'])
+    else:
+        with span("admission"):
+            node = await bot.admission.admit(plan, on_queued=on_admission, only=only)
+        container_id = None
+        try:
+            async with bot.lifecycle.slot(requester_id, on_queued=on_queued):
+                # Create container
+                if on_step and snapshot:
+                    on_step(f"```diff\n+ Creating container from snapshot {snapshot['name']}...\n```")
+                elif on_step and bot.images.present(node, image):
+                    on_step("```diff\n+ Creating container from cached image...\n```")
+                elif on_step:
+                    on_step("```diff\n+ Pulling container image from repository...\n```")
+                while True:
+                    try:
+                        container_id = await node.docker.run_container(image, host_config=plan_host_config(plan))
+                        break
+                    except DockerError as e:
+                        if e.status != 0:
+                            raise
+                    # Try the next node; place() raises once none are left
+                    bot.nodes.mark_unreachable(node)
+                    retry = bot.nodes.place(plan, only=only)
+                    bot.nodes.settle(node, plan)
+                    node = retry
+                bot.nodes.track(container_id, node)
                 
-                if mem_match:
-                    mem_used = mem_match.group(1)
-                    mem_limit = mem_match.group(3)
-                else:
-                    mem_used = '0B'
-                    mem_limit = '0B'
+                # Setup SSH
+                if on_step:
+                    on_step("```diff\n+ Configuring SSH access and security...\n```")
+                tmate = await start_tmate_session(container_id)
+        except BaseException:
+            try:
+                if container_id:
+                    # Not recorded anywhere yet, so nothing else would ever remove it
+                    await asyncio.shield(start_cleanup(remove_container_quietly(node, container_id)))
+            finally:
+                bot.nodes.settle(node, plan, container_id)
+            raise
+    
+    if tmate.ok:
+        add_to_database(owner, container_id, tmate.ssh_command, os_id, node.name, plan)
+        if snapshot:
+            await bot.snapshots.touch(snapshot)
+            telemetry.snapshots.inc('cloned')
+    else:
+        await remove_container_quietly(node, container_id)
+    bot.nodes.settle(node, plan, container_id)
+    return container_id, tmate
 
-                stats[container_id] = {
-                    'cpu': cpu_percent,
-                    'mem_used': mem_used,
-                    'mem_limit': mem_limit
-                }
-        return stats
-    except Exception as e:
-        print(f"Error getting container stats: {e}")
-        return {}
+def create_ready_embed(os_data, ssh_session_line, deployed_by):
+    """DM sent to a user when their instance is ready"""
+    return create_embed(
+        f"✨ Your {os_data['name']} Instance is Ready!",
+        f"**SSH Access Details:**\n```{ssh_session_line}```\n\nDeployed by: {deployed_by.mention}",
+        color=EMBED_COLOR,
+        fields=[
+            ("💡 Getting Started", "```Connect using any SSH client\nUsername: root\nNo password required```", False)
+        ],
+        footer=f"💎 This instance will auto-delete after {INACTIVITY_TIMEOUT // 3600} hours of inactivity"
+    )
 
-async def send_to_logs(message):
-    try:
-        channel = bot.get_channel(LOGS_CHANNEL_ID)
-        if channel:
-            perms = channel.permissions_for(channel.guild.me)
-            if perms.send_messages:
-                timestamp = datetime.now().strftime("%H:%M:%S")
-                await channel.send(f"`[{timestamp}]` {message}")
-    except Exception as e:
-        print(f"Failed to send logs: {e}")
+class ProgressReporter:
+    """Coalesces edits of a progress message: only the latest state is sent, at most once per interval"""
+    
+    def __init__(self, msg, embed, interval=PROGRESS_EDIT_INTERVAL):
+        self.msg = msg
+        self.embed = embed
+        self.interval = interval
+        self.last_edit = 0
+        self.pending = False
+        self.flush_task = None
+    
+    def _apply(self, title, description, color, fields, footer):
+        if title is not None:
+            self.embed.title = f"{EMOJI['vps']} {title}"
+        if description is not None:
+            self.embed.description = description
+        if color is not None:
+            self.embed.color = color
+        if fields is not None:
+            self.embed.clear_fields()
+            for name, value, inline in fields:
+                self.embed.add_field(name=name, value=value, inline=inline)
+        if footer is not None:
+            self.embed.set_footer(text=footer)
+    
+    def update(self, description=None, title=None, color=None, fields=None, footer=None):
+        """Change the embed in place and schedule an edit; never waits on Discord"""
+        self._apply(title, description, color, fields, footer)
+        self.pending = True
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush_later())
+    
+    async def _flush_later(self):
+        delay = self.last_edit + self.interval - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.flush_task = None
+        await self._send()
+    
+    async def _send(self):
+        if not self.pending:
+            return
+        self.pending = False
+        self.last_edit = time.monotonic()
+        try:
+            with span("progress edit"):
+                await self.msg.edit(embed=self.embed)
+        except discord.HTTPException as e:
+            print(f"Failed to update progress message: {e}")
+    
+    async def finish(self, title=None, description=None, color=None, fields=None, footer=None):
+        """Apply the final state and send it immediately"""
+        if self.flush_task:
+            self.flush_task.cancel()
+            self.flush_task = None
+        self._apply(title, description, color, fields, footer if footer is not None else f"{bot.bot_name} • Admin Managed")
+        self.pending = True
+        await self._send()
+
+def queue_notifier(progress):
+    """Show a request's position in the lifecycle queue on its progress embed"""
+    original = progress.embed.description
+    
+    async def notify(position):
+        if position:
+            progress.update(f"```diff\n+ Queued at position {position} ({bot.lifecycle.active} operations running)...\n```")
+        else:
+            progress.update(original)
+    return notify
+
+def admission_notifier(progress):
+    """Show a deploy's position in the admission queue on its progress embed"""
+    original = progress.embed.description
+    
+    async def notify(position):
+        if position:
+            progress.update(f"```diff\n! Waiting for host headroom: position {position} of {len(bot.admission.queue)}...\n```")
+        else:
+            progress.update(original)
+    return notify
+
+def send_to_logs(message):
+    """Queue a line for the logs channel; returns immediately"""
+    bot.log_sink.write(message)
 
 # ==================== ADMIN MANAGEMENT ====================
 
@@ -392,7 +3288,7 @@ class AdminAddModal(discord.ui.Modal, title="Add Admin"):
                 color=SUCCESS_COLOR
             )
             await interaction.response.send_message(embed=embed)
-            await send_to_logs(f"👑 {interaction.user.mention} added {user.mention} as admin")
+            send_to_logs(f"👑 {interaction.user.mention} added {user.mention} as admin")
             
         except ValueError:
             await interaction.response.send_message(f"{EMOJI['error']} Invalid user ID!", ephemeral=True)
@@ -428,7 +3324,7 @@ class AdminRemoveModal(discord.ui.Modal, title="Remove Admin"):
                 color=SUCCESS_COLOR
             )
             await interaction.response.send_message(embed=embed)
-            await send_to_logs(f"👤 {interaction.user.mention} removed {user.mention} from admins")
+            send_to_logs(f"👤 {interaction.user.mention} removed {user.mention} from admins")
             
         except ValueError:
             await interaction.response.send_message(f"{EMOJI['error']} Invalid user ID!", ephemeral=True)
@@ -517,39 +3413,39 @@ async def deploy(interaction: discord.Interaction, user: discord.User, os: str):
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
+    # Refuse up front what admission control would reject anyway; warm pool deploys skip it
+    plan = plan_for(str(user), os)
+    warm = plan == bot.warm_pool.plan(os) and bot.warm_pool.available(os)
+    decision, reason = ('accept', None) if warm else bot.admission.check(plan)
+    if decision == 'reject':
+        embed = create_embed(
+            "❌ Capacity Reached",
+            f"{EMOJI['warning']} Can't deploy a **{describe_plan(plan)}** instance: {reason}.",
+            color=ERROR_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
     # Initial response
     embed = create_embed(
         f"🚀 Deploying {os_data['emoji']} {os_data['name']}",
         f"Creating instance for {user.mention}...\n"
-        f"```RAM: {RAM_LIMIT}\nAuto-Delete: 4h Inactivity```",
+        f"```Plan: {describe_plan(plan)}\nAuto-Delete: {INACTIVITY_TIMEOUT // 3600}h Inactivity```",
         color=EMBED_COLOR,
-        footer="This may take 1-2 minutes..."
+        footer="⚡ Instant deploy from warm pool" if warm else
+            f"⏳ Queued: {reason}" if decision == 'queue' else "This may take 1-2 minutes..."
     )
     await interaction.response.send_message(embed=embed)
-    msg = await interaction.original_response()
+    progress = ProgressReporter(await interaction.original_response(), embed)
 
     try:
-        # Create container
-        embed.description = "```diff\n+ Pulling container image from repository...\n```"
-        await msg.edit(embed=embed)
-        
-        container_id = subprocess.check_output(
-            ["docker", "run", "-itd", "--privileged", os_data["image"]]
-        ).strip().decode('utf-8')
-        
-        await send_to_logs(f"🔧 {interaction.user.mention} deployed {os_data['emoji']} {os_data['name']} for {user.mention} (ID: `{container_id[:12]}`)")
-        
-        # Setup SSH
-        embed.description = "```diff\n+ Configuring SSH access and security...\n```"
-        await msg.edit(embed=embed)
-
-        exec_cmd = await asyncio.create_subprocess_exec(
-            "docker", "exec", container_id, "tmate", "-F",
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+        container_id, tmate = await provision_instance(
+            interaction.user.id, str(user), os,
+            on_step=progress.update, on_queued=queue_notifier(progress), on_admission=admission_notifier(progress)
         )
         
-        ssh_session_line = await capture_ssh_session_line(exec_cmd)
+        ssh_session_line = tmate.ssh_command
+        send_to_logs(f"🔧 {interaction.user.mention} deployed {os_data['emoji']} {os_data['name']} for {user.mention} (ID: `{container_id[:12]}`)")
         
         if ssh_session_line:
             # Success - send to admin and user
@@ -561,60 +3457,175 @@ async def deploy(interaction: discord.Interaction, user: discord.User, os: str):
                 fields=[
                     ("📦 Container Info", f"```ID: {container_id[:12]}\nOS: {os_data['name']}\nStatus: Running```", False)
                 ],
-                footer="💎 This instance will auto-delete after 4 hours of inactivity"
+                footer=f"💎 This instance will auto-delete after {INACTIVITY_TIMEOUT // 3600} hours of inactivity"
             )
             await interaction.followup.send(embed=admin_embed, ephemeral=True)
             
             try:
-                user_embed = create_embed(
-                    f"✨ Your {os_data['name']} Instance is Ready!",
-                    f"**SSH Access Details:**\n```{ssh_session_line}```\n\nDeployed by: {interaction.user.mention}",
-                    color=EMBED_COLOR,
-                    fields=[
-                        ("💡 Getting Started", "```Connect using any SSH client\nUsername: root\nNo password required```", False)
-                    ],
-                    footer="💎 This instance will auto-delete after 4 hours of inactivity"
-                )
-                await user.send(embed=user_embed)
+                with span("dm user"):
+                    await user.send(embed=create_ready_embed(os_data, ssh_session_line, interaction.user))
             except discord.Forbidden:
                 pass
             
-            add_to_database(str(user), container_id, ssh_session_line)
-            
             # Final success message
-            embed = create_embed(
+            await progress.finish(
                 f"✅ Deployment Complete! {random.choice(SUCCESS_ANIMATION)}",
                 f"**{os_data['emoji']} {os_data['name']}** instance created for {user.mention}!",
                 color=SUCCESS_COLOR
             )
-            await msg.edit(embed=embed)
         else:
-            embed = create_embed(
+            await progress.finish(
                 f"⚠️ Timeout {random.choice(ERROR_ANIMATION)}",
-                "```diff\n- SSH configuration timed out...\n- Rolling back deployment\n```",
+                f"```diff\n- SSH configuration timed out...\n- {tmate.describe()}\n- Rolling back deployment\n```",
                 color=WARNING_COLOR
             )
-            await msg.edit(embed=embed)
-            subprocess.run(["docker", "kill", container_id], stderr=subprocess.DEVNULL)
-            subprocess.run(["docker", "rm", container_id], stderr=subprocess.DEVNULL)
             
-    except subprocess.CalledProcessError as e:
-        embed = create_embed(
+    except AdmissionRejected as e:
+        await progress.finish(
+            f"🚫 Deployment Rejected {random.choice(ERROR_ANIMATION)}",
+            f"```diff\n- Not enough capacity:\n- {e}\n```",
+            color=ERROR_COLOR
+        )
+        send_to_logs(f"🚫 Deployment for {user.mention} by {interaction.user.mention} rejected by admission control: {e}")
+        
+    except DockerError as e:
+        await progress.finish(
             f"❌ Deployment Failed {random.choice(ERROR_ANIMATION)}",
             f"```diff\n- Error during deployment:\n{e}\n```",
             color=ERROR_COLOR
         )
-        await msg.edit(embed=embed)
-        await send_to_logs(f"💥 Deployment failed for {user.mention} by {interaction.user.mention}: {e}")
+        send_to_logs(f"💥 Deployment failed for {user.mention} by {interaction.user.mention}: {e}")
         
     except Exception as e:
         print(f"Error in deploy command: {e}")
-        embed = create_embed(
+        await progress.finish(
             "💥 Critical Error",
             "```diff\n- An unexpected error occurred\n- Please try again later\n```",
             color=ERROR_COLOR
         )
-        await msg.edit(embed=embed)
+
+@bot.tree.command(name="deploy-bulk", description="🚀 [ADMIN] Create instances for many users at once")
+@app_commands.describe(
+    os="The OS to deploy (ubuntu, debian, alpine, arch, kali, fedora)",
+    users="User mentions or IDs, separated by spaces",
+    role="Deploy for every member of this role"
+)
+async def deploy_bulk(interaction: discord.Interaction, os: str, users: Optional[str] = None, role: Optional[discord.Role] = None):
+    """Deploy one VPS per user for a list of users or a role (Admin only)"""
+    if not is_admin(interaction.user.id):
+        embed = create_embed(
+            "🚫 Permission Denied",
+            f"{EMOJI['warning']} This command is restricted to administrators only.",
+            color=ERROR_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+
+    os = os.lower()
+    if os not in OS_OPTIONS:
+        valid_oses = "\n".join([f"{OS_OPTIONS[os_id]['emoji']} **{os_id}** - {OS_OPTIONS[os_id]['description']}" 
+                               for os_id in OS_OPTIONS.keys()])
+        embed = create_embed(
+            "❌ Invalid OS Selection",
+            f"**Available OS options:**\n{valid_oses}",
+            color=ERROR_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+
+    os_data = OS_OPTIONS[os]
+    await interaction.response.defer()
+    
+    # Resolve targets, one instance per user
+    targets = {}
+    if role:
+        for member in role.members:
+            if not member.bot:
+                targets[member.id] = member
+    for user_id in re.findall(r'\d{15,20}', users or ''):
+        user_id = int(user_id)
+        if user_id in targets:
+            continue
+        try:
+            targets[user_id] = (interaction.guild.get_member(user_id) if interaction.guild else None) or await bot.fetch_user(user_id)
+        except discord.NotFound:
+            pass
+    
+    if not targets:
+        embed = create_embed(
+            "❌ No Users Selected",
+            "Provide user mentions/IDs or a role to deploy for.",
+            color=ERROR_COLOR
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        return
+    
+    counts = {'done': 0, 'failed': 0, 'skipped': 0}
+    failures = []
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(BULK_DEPLOY_CONCURRENCY)
+    
+    def summary():
+        finished = counts['done'] + counts['failed'] + counts['skipped']
+        elapsed = time.monotonic() - started
+        rate = counts['done'] / elapsed * 60 if elapsed > 0 else 0
+        return (
+            f"**{os_data['emoji']} {os_data['name']}** for {len(targets)} users\n"
+            f"```diff\n"
+            f"+ Deployed: {counts['done']}\n"
+            f"- Failed: {counts['failed']}\n"
+            f"! Skipped (at limit): {counts['skipped']}\n"
+            f"  Progress: {finished}/{len(targets)}\n"
+            f"  Elapsed: {elapsed:.1f}s • {rate:.1f} instances/min\n```"
+        )
+    
+    embed = create_embed(f"🚀 Bulk Deploying {os_data['emoji']} {os_data['name']}", summary(), color=EMBED_COLOR)
+    progress = ProgressReporter(await interaction.followup.send(embed=embed, wait=True), embed, interval=BULK_PROGRESS_INTERVAL)
+    
+    def record(outcome, failure=None):
+        counts[outcome] += 1
+        if failure:
+            failures.append(failure)
+        progress.update(summary())
+    
+    async def deploy_one(user):
+        async with semaphore:
+            if count_user_servers(str(user)) >= SERVER_LIMIT:
+                record('skipped')
+                return
+            try:
+                container_id, tmate = await provision_instance(interaction.user.id, str(user), os)
+            except Exception as e:
+                record('failed', f"{user}: {e}")
+                return
+            if not tmate.ok:
+                record('failed', f"{user}: {tmate.describe()}")
+                return
+            record('done')
+        try:
+            await user.send(embed=create_ready_embed(os_data, tmate.ssh_command, interaction.user))
+        except (discord.Forbidden, discord.HTTPException):
+            pass
+    
+    await asyncio.gather(*(deploy_one(user) for user in targets.values()), return_exceptions=True)
+    
+    fields = []
+    if failures:
+        failure_text = "\n".join(failures[:10])
+        if len(failures) > 10:
+            failure_text += f"\n... and {len(failures) - 10} more"
+        fields.append(("❌ Failures", f"```{failure_text[:1000]}```", False))
+    await progress.finish(
+        title=f"✅ Bulk Deployment Complete! {random.choice(SUCCESS_ANIMATION)}",
+        description=summary(),
+        color=SUCCESS_COLOR if not counts['failed'] else WARNING_COLOR if counts['done'] else ERROR_COLOR,
+        fields=fields
+    )
+    send_to_logs(
+        f"🔧 {interaction.user.mention} bulk-deployed {os_data['emoji']} {os_data['name']}: "
+        f"{counts['done']} ok, {counts['failed']} failed, {counts['skipped']} skipped "
+        f"in {time.monotonic() - started:.1f}s"
+    )
 
 @bot.tree.command(name="start", description="🟢 Start your cloud instance")
 @app_commands.describe(container_id="Your instance ID (first 4+ characters)")
@@ -622,10 +3633,8 @@ async def start_server(interaction: discord.Interaction, container_id: str):
     """Start a VPS"""
     try:
         user = str(interaction.user)
-        container_info = None
-        ssh_command = None
         
-        if not os.path.exists(database_file):
+        if count_user_servers(user) == 0:
             embed = create_embed(
                 "📭 No Instances Found",
                 "You don't have any active instances!",
@@ -634,13 +3643,9 @@ async def start_server(interaction: discord.Interaction, container_id: str):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        with open(database_file, 'r') as f:
-            for line in f:
-                parts = line.strip().split('|')
-                if len(parts) >= 3 and user == parts[0] and container_id in parts[1]:
-                    container_info = parts[1]
-                    ssh_command = parts[2]
-                    break
+        server = get_user_container(user, container_id)
+        container_info = server['container_id'] if server else None
+        ssh_command = server['ssh_command'] if server else None
 
         if not container_info:
             embed = create_embed(
@@ -657,81 +3662,70 @@ async def start_server(interaction: discord.Interaction, container_id: str):
             color=EMBED_COLOR
         )
         await interaction.response.send_message(embed=embed)
-        msg = await interaction.original_response()
+        progress = ProgressReporter(await interaction.original_response(), embed)
 
         try:
-            check_cmd = subprocess.run(
-                ["docker", "inspect", "--format='{{.State.Status}}'", container_info],
-                capture_output=True, text=True
-            )
+            async with bot.lifecycle.slot(interaction.user.id, container_info, on_queued=queue_notifier(progress)):
+                exists = await bot.nodes.docker_for(container_info).container_exists(container_info)
             
-            if check_cmd.returncode != 0:
-                embed = create_embed(
-                    "❌ Container Not Found",
-                    f"Container `{container_info[:12]}` doesn't exist in Docker!",
-                    color=ERROR_COLOR
-                )
-                await msg.edit(embed=embed)
-                remove_from_database(ssh_command)
-                return
+                if not exists:
+                    await progress.finish(
+                        title="❌ Container Not Found",
+                        description=f"Container `{container_info[:12]}` doesn't exist in Docker!",
+                        color=ERROR_COLOR
+                    )
+                    remove_from_database(ssh_command)
+                    return
             
-            subprocess.run(["docker", "start", container_info], check=True)
+                await bot.nodes.docker_for(container_info).start_container(container_info)
             
-            try:
-                embed.description = "```diff\n+ Generating new SSH connection...\n```"
-                await msg.edit(embed=embed)
+                try:
+                    progress.update("```diff\n+ Generating new SSH connection...\n```")
                 
-                exec_cmd = await asyncio.create_subprocess_exec(
-                    "docker", "exec", container_info, "tmate", "-F",
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                ssh_session_line = await capture_ssh_session_line(exec_cmd)
+                    ssh_session_line = (await start_tmate_session(container_info)).ssh_command
                 
-                if ssh_session_line:
-                    remove_from_database(ssh_command)
-                    add_to_database(user, container_info, ssh_session_line)
+                    if ssh_session_line:
+                        update_ssh_in_database(container_info, ssh_session_line)
                     
-                    try:
-                        dm_embed = create_embed(
-                            f"🟢 Instance Started {random.choice(SUCCESS_ANIMATION)}",
-                            f"**Your instance is now running!**\n\n**🔑 New SSH Command:**\n```{ssh_session_line}```",
-                            color=SUCCESS_COLOR,
-                            fields=[("💡 Note", "The old SSH connection is no longer valid", False)]
-                        )
-                        await interaction.user.send(embed=dm_embed)
-                    except discord.Forbidden:
-                        pass
+                        try:
+                            dm_embed = create_embed(
+                                f"🟢 Instance Started {random.choice(SUCCESS_ANIMATION)}",
+                                f"**Your instance is now running!**\n\n**🔑 New SSH Command:**\n```{ssh_session_line}```",
+                                color=SUCCESS_COLOR,
+                                fields=[("💡 Note", "The old SSH connection is no longer valid", False)]
+                            )
+                            await interaction.user.send(embed=dm_embed)
+                        except discord.Forbidden:
+                            pass
                     
-                    embed = create_embed(
-                        f"🟢 Instance Started {random.choice(SUCCESS_ANIMATION)}",
-                        f"Instance `{container_info[:12]}` is now running!\n📩 Check your DMs for new connection details.",
-                        color=SUCCESS_COLOR
-                    )
-                else:
-                    embed = create_embed(
-                        "⚠️ SSH Refresh Failed",
-                        f"Instance `{container_info[:12]}` started but couldn't get new SSH details.",
+                        progress.update(
+                            title=f"🟢 Instance Started {random.choice(SUCCESS_ANIMATION)}",
+                            description=f"Instance `{container_info[:12]}` is now running!\n📩 Check your DMs for new connection details.",
+                            color=SUCCESS_COLOR
+                        )
+                    else:
+                        progress.update(
+                            title="⚠️ SSH Refresh Failed",
+                            description=f"Instance `{container_info[:12]}` started but couldn't get new SSH details.",
+                            color=WARNING_COLOR
+                        )
+                except Exception as e:
+                    print(f"Error getting new SSH session: {e}")
+                    progress.update(
+                        title="🟢 Instance Started",
+                        description=f"Instance `{container_info[:12]}` is running!\n⚠️ Could not refresh SSH details.",
                         color=WARNING_COLOR
                     )
-            except Exception as e:
-                print(f"Error getting new SSH session: {e}")
-                embed = create_embed(
-                    "🟢 Instance Started",
-                    f"Instance `{container_info[:12]}` is running!\n⚠️ Could not refresh SSH details.",
-                    color=WARNING_COLOR
-                )
             
-            await msg.edit(embed=embed)
-            await send_to_logs(f"🟢 {interaction.user.mention} started instance `{container_info[:12]}`")
+                await progress.finish()
+                send_to_logs(f"🟢 {interaction.user.mention} started instance `{container_info[:12]}`")
             
-        except subprocess.CalledProcessError as e:
-            embed = create_embed(
-                f"❌ Startup Failed {random.choice(ERROR_ANIMATION)}",
-                f"```diff\n- Error starting container:\n{e.stderr if e.stderr else e.stdout}\n```",
+        except DockerError as e:
+            await progress.finish(
+                title=f"❌ Startup Failed {random.choice(ERROR_ANIMATION)}",
+                description=f"```diff\n- Error starting container:\n{e}\n```",
                 color=ERROR_COLOR
             )
-            await msg.edit(embed=embed)
             
     except Exception as e:
         print(f"Error in start_server: {e}")
@@ -749,9 +3743,8 @@ async def stop_server(interaction: discord.Interaction, container_id: str):
     """Stop a VPS"""
     try:
         user = str(interaction.user)
-        container_info = None
         
-        if not os.path.exists(database_file):
+        if count_user_servers(user) == 0:
             embed = create_embed(
                 "📭 No Instances Found",
                 "You don't have any active instances!",
@@ -760,12 +3753,8 @@ async def stop_server(interaction: discord.Interaction, container_id: str):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        with open(database_file, 'r') as f:
-            for line in f:
-                parts = line.strip().split('|')
-                if len(parts) >= 3 and user == parts[0] and container_id in parts[1]:
-                    container_info = parts[1]
-                    break
+        server = get_user_container(user, container_id)
+        container_info = server['container_id'] if server else None
 
         if not container_info:
             embed = create_embed(
@@ -782,41 +3771,36 @@ async def stop_server(interaction: discord.Interaction, container_id: str):
             color=EMBED_COLOR
         )
         await interaction.response.send_message(embed=embed)
-        msg = await interaction.original_response()
+        progress = ProgressReporter(await interaction.original_response(), embed)
 
         try:
-            check_cmd = subprocess.run(
-                ["docker", "inspect", container_info],
-                capture_output=True, text=True
-            )
+            async with bot.lifecycle.slot(interaction.user.id, container_info, on_queued=queue_notifier(progress)):
+                exists = await bot.nodes.docker_for(container_info).container_exists(container_info)
             
-            if check_cmd.returncode != 0:
-                embed = create_embed(
-                    "❌ Container Not Found",
-                    f"Container `{container_info[:12]}` doesn't exist in Docker!",
-                    color=ERROR_COLOR
-                )
-                await msg.edit(embed=embed)
-                remove_from_database(container_info)
-                return
+                if not exists:
+                    await progress.finish(
+                        title="❌ Container Not Found",
+                        description=f"Container `{container_info[:12]}` doesn't exist in Docker!",
+                        color=ERROR_COLOR
+                    )
+                    remove_container_from_database_by_id(container_info)
+                    return
             
-            subprocess.run(["docker", "stop", container_info], check=True)
+                await bot.nodes.docker_for(container_info).stop_container(container_info)
             
-            embed = create_embed(
-                f"🛑 Instance Stopped {random.choice(SUCCESS_ANIMATION)}",
-                f"Instance `{container_info[:12]}` has been successfully stopped!",
-                color=SUCCESS_COLOR
-            )
-            await msg.edit(embed=embed)
-            await send_to_logs(f"🛑 {interaction.user.mention} stopped instance `{container_info[:12]}`")
+                await progress.finish(
+                    title=f"🛑 Instance Stopped {random.choice(SUCCESS_ANIMATION)}",
+                    description=f"Instance `{container_info[:12]}` has been successfully stopped!",
+                    color=SUCCESS_COLOR
+                )
+                send_to_logs(f"🛑 {interaction.user.mention} stopped instance `{container_info[:12]}`")
             
-        except subprocess.CalledProcessError as e:
-            embed = create_embed(
-                f"❌ Stop Failed {random.choice(ERROR_ANIMATION)}",
-                f"```diff\n- Error stopping container:\n{e.stderr if e.stderr else e.stdout}\n```",
+        except DockerError as e:
+            await progress.finish(
+                title=f"❌ Stop Failed {random.choice(ERROR_ANIMATION)}",
+                description=f"```diff\n- Error stopping container:\n{e}\n```",
                 color=ERROR_COLOR
             )
-            await msg.edit(embed=embed)
             
     except Exception as e:
         print(f"Error in stop_server: {e}")
@@ -834,10 +3818,8 @@ async def restart_server(interaction: discord.Interaction, container_id: str):
     """Restart a VPS"""
     try:
         user = str(interaction.user)
-        container_info = None
-        ssh_command = None
         
-        if not os.path.exists(database_file):
+        if count_user_servers(user) == 0:
             embed = create_embed(
                 "📭 No Instances Found",
                 "You don't have any active instances!",
@@ -846,13 +3828,9 @@ async def restart_server(interaction: discord.Interaction, container_id: str):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        with open(database_file, 'r') as f:
-            for line in f:
-                parts = line.strip().split('|')
-                if len(parts) >= 3 and user == parts[0] and container_id in parts[1]:
-                    container_info = parts[1]
-                    ssh_command = parts[2]
-                    break
+        server = get_user_container(user, container_id)
+        container_info = server['container_id'] if server else None
+        ssh_command = server['ssh_command'] if server else None
 
         if not container_info:
             embed = create_embed(
@@ -869,81 +3847,70 @@ async def restart_server(interaction: discord.Interaction, container_id: str):
             color=EMBED_COLOR
         )
         await interaction.response.send_message(embed=embed)
-        msg = await interaction.original_response()
+        progress = ProgressReporter(await interaction.original_response(), embed)
 
         try:
-            check_cmd = subprocess.run(
-                ["docker", "inspect", container_info],
-                capture_output=True, text=True
-            )
+            async with bot.lifecycle.slot(interaction.user.id, container_info, on_queued=queue_notifier(progress)):
+                exists = await bot.nodes.docker_for(container_info).container_exists(container_info)
             
-            if check_cmd.returncode != 0:
-                embed = create_embed(
-                    "❌ Container Not Found",
-                    f"Container `{container_info[:12]}` doesn't exist in Docker!",
-                    color=ERROR_COLOR
-                )
-                await msg.edit(embed=embed)
-                remove_from_database(ssh_command)
-                return
+                if not exists:
+                    await progress.finish(
+                        title="❌ Container Not Found",
+                        description=f"Container `{container_info[:12]}` doesn't exist in Docker!",
+                        color=ERROR_COLOR
+                    )
+                    remove_from_database(ssh_command)
+                    return
             
-            subprocess.run(["docker", "restart", container_info], check=True)
+                await bot.nodes.docker_for(container_info).restart_container(container_info)
             
-            embed.description = "```diff\n+ Generating new SSH connection...\n```"
-            await msg.edit(embed=embed)
+                progress.update("```diff\n+ Generating new SSH connection...\n```")
             
-            try:
-                exec_cmd = await asyncio.create_subprocess_exec(
-                    "docker", "exec", container_info, "tmate", "-F",
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                ssh_session_line = await capture_ssh_session_line(exec_cmd)
+                try:
+                    ssh_session_line = (await start_tmate_session(container_info)).ssh_command
                 
-                if ssh_session_line:
-                    remove_from_database(ssh_command)
-                    add_to_database(user, container_info, ssh_session_line)
+                    if ssh_session_line:
+                        update_ssh_in_database(container_info, ssh_session_line)
                     
-                    try:
-                        dm_embed = create_embed(
-                            f"🔄 Instance Restarted {random.choice(SUCCESS_ANIMATION)}",
-                            f"**Your instance has been restarted!**\n\n**🔑 New SSH Command:**\n```{ssh_session_line}```",
-                            color=SUCCESS_COLOR,
-                            fields=[("💡 Note", "The old SSH connection is no longer valid", False)]
-                        )
-                        await interaction.user.send(embed=dm_embed)
-                    except discord.Forbidden:
-                        pass
+                        try:
+                            dm_embed = create_embed(
+                                f"🔄 Instance Restarted {random.choice(SUCCESS_ANIMATION)}",
+                                f"**Your instance has been restarted!**\n\n**🔑 New SSH Command:**\n```{ssh_session_line}```",
+                                color=SUCCESS_COLOR,
+                                fields=[("💡 Note", "The old SSH connection is no longer valid", False)]
+                            )
+                            await interaction.user.send(embed=dm_embed)
+                        except discord.Forbidden:
+                            pass
                     
-                    embed = create_embed(
-                        f"🔄 Instance Restarted {random.choice(SUCCESS_ANIMATION)}",
-                        f"Instance `{container_info[:12]}` has been restarted!\n📩 Check your DMs for new connection details.",
-                        color=SUCCESS_COLOR
-                    )
-                else:
-                    embed = create_embed(
-                        "⚠️ SSH Refresh Failed",
-                        f"Instance `{container_info[:12]}` restarted but couldn't get new SSH details.",
+                        progress.update(
+                            title=f"🔄 Instance Restarted {random.choice(SUCCESS_ANIMATION)}",
+                            description=f"Instance `{container_info[:12]}` has been restarted!\n📩 Check your DMs for new connection details.",
+                            color=SUCCESS_COLOR
+                        )
+                    else:
+                        progress.update(
+                            title="⚠️ SSH Refresh Failed",
+                            description=f"Instance `{container_info[:12]}` restarted but couldn't get new SSH details.",
+                            color=WARNING_COLOR
+                        )
+                except Exception as e:
+                    print(f"Error getting new SSH session: {e}")
+                    progress.update(
+                        title="🔄 Instance Restarted",
+                        description=f"Instance `{container_info[:12]}` has been restarted!\n⚠️ Could not refresh SSH details.",
                         color=WARNING_COLOR
                     )
-            except Exception as e:
-                print(f"Error getting new SSH session: {e}")
-                embed = create_embed(
-                    "🔄 Instance Restarted",
-                    f"Instance `{container_info[:12]}` has been restarted!\n⚠️ Could not refresh SSH details.",
-                    color=WARNING_COLOR
-                )
             
-            await msg.edit(embed=embed)
-            await send_to_logs(f"🔄 {interaction.user.mention} restarted instance `{container_info[:12]}`")
+                await progress.finish()
+                send_to_logs(f"🔄 {interaction.user.mention} restarted instance `{container_info[:12]}`")
             
-        except subprocess.CalledProcessError as e:
-            embed = create_embed(
-                f"❌ Restart Failed {random.choice(ERROR_ANIMATION)}",
-                f"```diff\n- Error restarting container:\n{e.stderr if e.stderr else e.stdout}\n```",
+        except DockerError as e:
+            await progress.finish(
+                title=f"❌ Restart Failed {random.choice(ERROR_ANIMATION)}",
+                description=f"```diff\n- Error restarting container:\n{e}\n```",
                 color=ERROR_COLOR
             )
-            await msg.edit(embed=embed)
             
     except Exception as e:
         print(f"Error in restart_server: {e}")
@@ -961,10 +3928,8 @@ async def remove_server(interaction: discord.Interaction, container_id: str):
     """Remove a VPS"""
     try:
         user = str(interaction.user)
-        container_info = None
-        ssh_command = None
         
-        if not os.path.exists(database_file):
+        if count_user_servers(user) == 0:
             embed = create_embed(
                 "📭 No Instances Found",
                 "You don't have any active instances!",
@@ -973,13 +3938,9 @@ async def remove_server(interaction: discord.Interaction, container_id: str):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        with open(database_file, 'r') as f:
-            for line in f:
-                parts = line.strip().split('|')
-                if len(parts) >= 3 and user == parts[0] and container_id in parts[1]:
-                    container_info = parts[1]
-                    ssh_command = parts[2]
-                    break
+        server = get_user_container(user, container_id)
+        container_info = server['container_id'] if server else None
+        ssh_command = server['ssh_command'] if server else None
 
         if not container_info:
             embed = create_embed(
@@ -1004,38 +3965,36 @@ async def remove_server(interaction: discord.Interaction, container_id: str):
                 await interaction.response.defer()
                 
                 try:
-                    check_cmd = subprocess.run(
-                        ["docker", "inspect", container_info],
-                        capture_output=True, text=True
-                    )
+                    async with bot.lifecycle.slot(interaction.user.id, container_info):
+                        exists = await bot.nodes.docker_for(container_info).container_exists(container_info)
                     
-                    if check_cmd.returncode != 0:
-                        embed = create_embed(
-                            "❌ Container Not Found",
-                            f"Container `{container_info[:12]}` doesn't exist in Docker!",
-                            color=ERROR_COLOR
-                        )
-                        await interaction.followup.send(embed=embed, ephemeral=True)
-                        remove_from_database(ssh_command)
-                        return
+                        if not exists:
+                            embed = create_embed(
+                                "❌ Container Not Found",
+                                f"Container `{container_info[:12]}` doesn't exist in Docker!",
+                                color=ERROR_COLOR
+                            )
+                            await interaction.followup.send(embed=embed, ephemeral=True)
+                            remove_from_database(ssh_command)
+                            return
                     
-                    subprocess.run(["docker", "stop", container_info], check=True)
-                    subprocess.run(["docker", "rm", container_info], check=True)
+                        await bot.nodes.docker_for(container_info).stop_container(container_info)
+                        await bot.nodes.docker_for(container_info).remove_container(container_info)
                     
-                    remove_from_database(ssh_command)
+                        remove_from_database(ssh_command)
                     
-                    embed = create_embed(
-                        f"🗑️ Instance Deleted {random.choice(SUCCESS_ANIMATION)}",
-                        f"Instance `{container_info[:12]}` has been permanently deleted!",
-                        color=SUCCESS_COLOR
-                    )
-                    await interaction.followup.send(embed=embed)
-                    await send_to_logs(f"❌ {interaction.user.mention} deleted instance `{container_info[:12]}`")
+                        embed = create_embed(
+                            f"🗑️ Instance Deleted {random.choice(SUCCESS_ANIMATION)}",
+                            f"Instance `{container_info[:12]}` has been permanently deleted!",
+                            color=SUCCESS_COLOR
+                        )
+                        await interaction.followup.send(embed=embed)
+                        send_to_logs(f"❌ {interaction.user.mention} deleted instance `{container_info[:12]}`")
                     
-                except subprocess.CalledProcessError as e:
+                except DockerError as e:
                     embed = create_embed(
                         f"❌ Deletion Failed {random.choice(ERROR_ANIMATION)}",
-                        f"```diff\n- Error deleting container:\n{e.stderr if e.stderr else e.stdout}\n```",
+                        f"```diff\n- Error deleting container:\n{e}\n```",
                         color=ERROR_COLOR
                     )
                     await interaction.followup.send(embed=embed)
@@ -1077,10 +4036,8 @@ async def regen_ssh(interaction: discord.Interaction, container_id: str):
     """Regenerate SSH for a VPS"""
     try:
         user = str(interaction.user)
-        container_info = None
-        old_ssh_command = None
         
-        if not os.path.exists(database_file):
+        if count_user_servers(user) == 0:
             embed = create_embed(
                 "📭 No Instances Found",
                 "You don't have any active instances!",
@@ -1089,13 +4046,9 @@ async def regen_ssh(interaction: discord.Interaction, container_id: str):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        with open(database_file, 'r') as f:
-            for line in f:
-                parts = line.strip().split('|')
-                if len(parts) >= 3 and user == parts[0] and container_id in parts[1]:
-                    container_info = parts[1]
-                    old_ssh_command = parts[2]
-                    break
+        server = get_user_container(user, container_id)
+        container_info = server['container_id'] if server else None
+        old_ssh_command = server['ssh_command'] if server else None
 
         if not container_info:
             embed = create_embed(
@@ -1107,12 +4060,11 @@ async def regen_ssh(interaction: discord.Interaction, container_id: str):
             return
 
         try:
-            check_cmd = subprocess.run(
-                ["docker", "inspect", "--format='{{.State.Status}}'", container_info],
-                capture_output=True, text=True
-            )
-            
-            if check_cmd.returncode != 0:
+            try:
+                container_status = (await bot.nodes.docker_for(container_info).inspect_container(container_info))['State']['Status']
+            except DockerError as e:
+                if e.status != 404:
+                    raise
                 embed = create_embed(
                     "❌ Container Not Found",
                     f"Container `{container_info[:12]}` doesn't exist in Docker!",
@@ -1122,7 +4074,6 @@ async def regen_ssh(interaction: discord.Interaction, container_id: str):
                 remove_from_database(old_ssh_command)
                 return
             
-            container_status = check_cmd.stdout.strip().strip("'")
             if container_status != "running":
                 embed = create_embed(
                     "⚠️ Instance Not Running",
@@ -1138,24 +4089,17 @@ async def regen_ssh(interaction: discord.Interaction, container_id: str):
                 color=EMBED_COLOR
             )
             await interaction.response.send_message(embed=embed)
-            msg = await interaction.original_response()
+            progress = ProgressReporter(await interaction.original_response(), embed)
 
+            ssh_session_line = None
             try:
-                subprocess.run(
-                    ["docker", "exec", container_info, "pkill", "tmate"],
-                    stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL
-                )
-                
-                exec_cmd = await asyncio.create_subprocess_exec(
-                    "docker", "exec", container_info, "tmate", "-F",
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                ssh_session_line = await capture_ssh_session_line(exec_cmd)
+                async with bot.lifecycle.slot(interaction.user.id, container_info, on_queued=queue_notifier(progress)):
+                    await bot.nodes.docker_for(container_info).exec_run(container_info, ["pkill", "tmate"])
+                    
+                    ssh_session_line = (await start_tmate_session(container_info)).ssh_command
                 
                 if ssh_session_line:
-                    remove_from_database(old_ssh_command)
-                    add_to_database(user, container_info, ssh_session_line)
+                    update_ssh_in_database(container_info, ssh_session_line)
                     
                     try:
                         dm_embed = create_embed(
@@ -1168,40 +4112,44 @@ async def regen_ssh(interaction: discord.Interaction, container_id: str):
                     except discord.Forbidden:
                         pass
                     
-                    embed = create_embed(
-                        f"✅ SSH Regenerated {random.choice(SUCCESS_ANIMATION)}",
-                        f"New SSH details generated for `{container_info[:12]}`!\n📩 Check your DMs for the new connection.",
+                    progress.update(
+                        title=f"✅ SSH Regenerated {random.choice(SUCCESS_ANIMATION)}",
+                        description=f"New SSH details generated for `{container_info[:12]}`!\n📩 Check your DMs for the new connection.",
                         color=SUCCESS_COLOR
                     )
                 else:
-                    embed = create_embed(
-                        "⚠️ SSH Regeneration Failed",
-                        f"Could not generate new SSH details for `{container_info[:12]}`.\nTry again later.",
+                    progress.update(
+                        title="⚠️ SSH Regeneration Failed",
+                        description=f"Could not generate new SSH details for `{container_info[:12]}`.\nTry again later.",
                         color=WARNING_COLOR
                     )
+            except DockerError as e:
+                progress.update(
+                    title="❌ Error Regenerating SSH",
+                    description=f"```diff\n- Error:\n{e}\n```",
+                    color=ERROR_COLOR
+                )
             except Exception as e:
                 print(f"Error regenerating SSH: {e}")
-                embed = create_embed(
-                    "❌ SSH Regeneration Failed",
-                    f"An error occurred while regenerating SSH for `{container_info[:12]}`.",
+                progress.update(
+                    title="❌ SSH Regeneration Failed",
+                    description=f"An error occurred while regenerating SSH for `{container_info[:12]}`.",
                     color=ERROR_COLOR
                 )
             
-            await msg.edit(embed=embed)
+            await progress.finish()
             
             if ssh_session_line:
-                await send_to_logs(f"🔄 {interaction.user.mention} regenerated SSH for instance `{container_info[:12]}`")
+                send_to_logs(f"🔄 {interaction.user.mention} regenerated SSH for instance `{container_info[:12]}`")
             
-        except subprocess.CalledProcessError as e:
+        except DockerError as e:
+            # Inspecting the container failed, before any progress message was sent
             embed = create_embed(
                 "❌ Error Regenerating SSH",
-                f"```diff\n- Error:\n{e.stderr if e.stderr else e.stdout}\n```",
+                f"```diff\n- Error:\n{e}\n```",
                 color=ERROR_COLOR
             )
-            try:
-                await msg.edit(embed=embed)
-            except:
-                pass
+            await interaction.response.send_message(embed=embed, ephemeral=True)
             
     except Exception as e:
         print(f"Error in regen_ssh: {e}")
@@ -1213,6 +4161,241 @@ async def regen_ssh(interaction: discord.Interaction, container_id: str):
         except:
             pass
 
+@bot.tree.command(name="snapshot", description="📸 Save your instance's filesystem as a snapshot you can clone")
+@app_commands.describe(
+    container_id="Your instance ID (first 4+ characters)",
+    name="Snapshot name (default: instance ID and time); an existing snapshot of that name is replaced"
+)
+async def snapshot_server(interaction: discord.Interaction, container_id: str, name: Optional[str] = None):
+    """Snapshot a VPS"""
+    try:
+        user = str(interaction.user)
+        server = get_user_container(user, container_id)
+        
+        if not server:
+            embed = create_embed(
+                "🔍 Instance Not Found",
+                "No instance found with that ID that belongs to you!",
+                color=INFO_COLOR
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        container_info = server['container_id']
+        if server.get('os_type') not in OS_OPTIONS:
+            embed = create_embed(
+                "❌ Can't Snapshot",
+                f"{EMOJI['warning']} The OS of instance `{container_info[:12]}` isn't known, so it couldn't be cloned.",
+                color=ERROR_COLOR
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        name = name or f"{container_info[:12]}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        embed = create_embed(
+            f"📸 Snapshotting Instance {container_info[:12]}",
+            "```diff\n+ Saving the instance's filesystem...\n```",
+            color=EMBED_COLOR,
+            footer="The instance is paused for a moment while it's saved"
+        )
+        await interaction.response.send_message(embed=embed)
+        progress = ProgressReporter(await interaction.original_response(), embed)
+        
+        try:
+            async with bot.lifecycle.slot(interaction.user.id, container_info, on_queued=queue_notifier(progress)):
+                snapshot, evicted = await bot.snapshots.create(server, name)
+        except SnapshotError as e:
+            await progress.finish(
+                title="⚠️ Snapshot Not Taken",
+                description=f"Couldn't snapshot `{container_info[:12]}`: {e}.",
+                color=WARNING_COLOR
+            )
+            return
+        except DockerError as e:
+            await progress.finish(
+                title=f"❌ Snapshot Failed {random.choice(ERROR_ANIMATION)}",
+                description=f"```diff\n- Error saving container:\n{e}\n```",
+                color=ERROR_COLOR
+            )
+            return
+        
+        fields = [(
+            "📦 Snapshot",
+            f"```Name: {snapshot['name']}\nSize: {format_bytes(snapshot['size'])}\n"
+            f"Used: {format_bytes(bot.snapshots.usage(user))} of {SNAPSHOT_QUOTA}```",
+            False
+        )]
+        if evicted:
+            fields.append(("🧹 Evicted (least recently used)", ", ".join(f"`{s['name']}`" for s in evicted), False))
+        await progress.finish(
+            title=f"✅ Snapshot Saved {random.choice(SUCCESS_ANIMATION)}",
+            description=f"Instance `{container_info[:12]}` saved as `{snapshot['name']}`.\nUse `/clone {snapshot['name']}` to deploy a copy.",
+            color=SUCCESS_COLOR,
+            fields=fields
+        )
+        send_to_logs(f"📸 {interaction.user.mention} snapshotted instance `{container_info[:12]}` as `{snapshot['name']}` ({format_bytes(snapshot['size'])})")
+        
+    except Exception as e:
+        print(f"Error in snapshot_server: {e}")
+        try:
+            await interaction.followup.send(
+                embed=create_embed("❌ Error", "An error occurred while processing your request.", color=ERROR_COLOR),
+                ephemeral=True
+            )
+        except:
+            pass
+
+@bot.tree.command(name="clone", description="🧬 Deploy a new instance from one of your snapshots")
+@app_commands.describe(snapshot="Snapshot name (see /snapshots)")
+async def clone_snapshot(interaction: discord.Interaction, snapshot: str):
+    """Clone a snapshot into a new VPS"""
+    user = str(interaction.user)
+    found = bot.snapshots.get(user, snapshot)
+    if not found:
+        embed = create_embed(
+            "🔍 Snapshot Not Found",
+            "No snapshot with that name belongs to you! See `/snapshots`.",
+            color=INFO_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    if count_user_servers(user) >= SERVER_LIMIT:
+        embed = create_embed(
+            "❌ Server Limit Reached",
+            f"{EMOJI['warning']} You already have {SERVER_LIMIT} servers!",
+            color=ERROR_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    os_id = found['os_type']
+    os_data = OS_OPTIONS[os_id]
+    plan = plan_for(user, os_id)
+    decision, reason = bot.admission.check(plan, only=found['node'])
+    if decision == 'reject':
+        embed = create_embed(
+            "❌ Capacity Reached",
+            f"{EMOJI['warning']} Can't clone into a **{describe_plan(plan)}** instance: {reason}.",
+            color=ERROR_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    embed = create_embed(
+        f"🧬 Cloning {os_data['emoji']} {found['name']}",
+        f"Creating instance from snapshot `{found['name']}`...\n"
+        f"```Plan: {describe_plan(plan)}\nAuto-Delete: {INACTIVITY_TIMEOUT // 3600}h Inactivity```",
+        color=EMBED_COLOR,
+        footer=f"⏳ Queued: {reason}" if decision == 'queue' else "This may take a minute..."
+    )
+    await interaction.response.send_message(embed=embed)
+    progress = ProgressReporter(await interaction.original_response(), embed)
+    
+    try:
+        container_id, tmate = await provision_instance(
+            interaction.user.id, user, os_id, snapshot=found,
+            on_step=progress.update, on_queued=queue_notifier(progress), on_admission=admission_notifier(progress)
+        )
+        
+        if tmate.ssh_command:
+            try:
+                await interaction.user.send(embed=create_ready_embed(os_data, tmate.ssh_command, interaction.user))
+            except discord.Forbidden:
+                pass
+            await progress.finish(
+                f"✅ Clone Ready! {random.choice(SUCCESS_ANIMATION)}",
+                f"Instance `{container_id[:12]}` created from snapshot `{found['name']}`!\n📩 Check your DMs for connection details.",
+                color=SUCCESS_COLOR
+            )
+            send_to_logs(f"🧬 {interaction.user.mention} cloned snapshot `{found['name']}` into instance `{container_id[:12]}`")
+        else:
+            await progress.finish(
+                f"⚠️ Timeout {random.choice(ERROR_ANIMATION)}",
+                f"```diff\n- SSH configuration timed out...\n- {tmate.describe()}\n- Rolling back clone\n```",
+                color=WARNING_COLOR
+            )
+    
+    except AdmissionRejected as e:
+        await progress.finish(
+            f"🚫 Clone Rejected {random.choice(ERROR_ANIMATION)}",
+            f"```diff\n- Not enough capacity:\n- {e}\n```",
+            color=ERROR_COLOR
+        )
+    
+    except DockerError as e:
+        await progress.finish(
+            f"❌ Clone Failed {random.choice(ERROR_ANIMATION)}",
+            f"```diff\n- Error creating instance:\n{e}\n```",
+            color=ERROR_COLOR
+        )
+    
+    except Exception as e:
+        print(f"Error in clone command: {e}")
+        await progress.finish(
+            "💥 Critical Error",
+            "```diff\n- An unexpected error occurred\n- Please try again later\n```",
+            color=ERROR_COLOR
+        )
+
+@bot.tree.command(name="snapshots", description="📸 List your snapshots")
+async def list_snapshots(interaction: discord.Interaction):
+    """List user's snapshots"""
+    user = str(interaction.user)
+    snapshots = bot.snapshots.for_owner(user)
+    
+    if not snapshots:
+        embed = create_embed(
+            "📭 No Snapshots",
+            "You don't have any snapshots. Take one with `/snapshot <id>`.",
+            color=INFO_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    embed = create_embed(
+        f"📸 Your Snapshots ({len(snapshots)}/{SNAPSHOT_LIMIT})",
+        f"Using **{format_bytes(bot.snapshots.usage(user))}** of {SNAPSHOT_QUOTA}",
+        color=EMBED_COLOR,
+        footer="The least recently used snapshot is evicted when you run out of room"
+    )
+    for snapshot in snapshots:
+        os_data = OS_OPTIONS.get(snapshot['os_type'], {})
+        embed.add_field(
+            name=f"{os_data.get('emoji', '📦')} `{snapshot['name']}`",
+            value=(
+                f"▫️ **Size**: {format_bytes(snapshot['size'])}\n"
+                f"▫️ **Created**: <t:{int(snapshot['created_at'])}:R>\n"
+                f"▫️ **Last used**: <t:{int(snapshot['last_used'])}:R>"
+            ),
+            inline=False
+        )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="snapshot-delete", description="🗑️ Delete one of your snapshots")
+@app_commands.describe(snapshot="Snapshot name (see /snapshots)")
+async def delete_snapshot(interaction: discord.Interaction, snapshot: str):
+    """Delete a snapshot"""
+    found = bot.snapshots.get(str(interaction.user), snapshot)
+    if not found:
+        embed = create_embed(
+            "🔍 Snapshot Not Found",
+            "No snapshot with that name belongs to you! See `/snapshots`.",
+            color=INFO_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True)
+    async with bot.snapshots.lock:
+        await bot.snapshots.delete(found)
+    embed = create_embed(
+        f"🗑️ Snapshot Deleted {random.choice(SUCCESS_ANIMATION)}",
+        f"Snapshot `{found['name']}` is gone, freeing {format_bytes(found['size'])}.",
+        color=SUCCESS_COLOR
+    )
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
 @bot.tree.command(name="list", description="📜 List your cloud instances")
 async def list_servers(interaction: discord.Interaction):
     """List user's VPS"""
@@ -1229,34 +4412,18 @@ async def list_servers(interaction: discord.Interaction):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
+        statuses = await get_cached_statuses(s['container_id'] for s in servers)
         embed = create_embed(
             f"📋 Your Cloud Instances ({len(servers)}/{SERVER_LIMIT})",
+            bot.state_cache.freshness(),
             color=EMBED_COLOR
         )
         
         for server in servers:
-            parts = server.split('|')
-            if len(parts) < 3:
-                continue
-                
-            container_id = parts[1]
-            os_type = "Unknown"
-            
-            for os_id, os_data in OS_OPTIONS.items():
-                if os_id in parts[2].lower():
-                    os_type = f"{os_data['emoji']} {os_data['name']}"
-                    break
+            container_id = server['container_id']
+            os_type = get_os_label(server)
                     
-            try:
-                status = subprocess.check_output(
-                    ["docker", "inspect", "--format='{{.State.Status}}'", container_id],
-                    stderr=subprocess.DEVNULL
-                ).decode('utf-8').strip().strip("'")
-                
-                status_emoji = "🟢" if status == "running" else "🔴"
-                status_text = f"{status_emoji} {status.capitalize()}"
-            except:
-                status_text = "🔴 Unknown"
+            status_text = format_status(statuses.get(container_id))
                     
             embed.add_field(
                 name=f"🖥️ Instance `{container_id[:12]}`",
@@ -1267,43 +4434,50 @@ async def list_servers(interaction: discord.Interaction):
                 ),
                 inline=False
             )
-        
-        embed.set_footer(text="Use /start, /stop, or /remove with the instance ID")
-        await interaction.response.send_message(embed=embed)
-    except Exception as e:
-        print(f"Error in list_servers: {e}")
-        try:
-            await interaction.followup.send(
-                embed=create_embed("❌ Error", "An error occurred while processing your request.", color=ERROR_COLOR),
-                ephemeral=True
-            )
-        except:
-            pass
-
-@bot.tree.command(name="list-all", description="📜 [ADMIN] List all deployed instances")
-async def list_all_servers(interaction: discord.Interaction):
-    """List all VPS (Admin only)"""
-    if not is_admin(interaction.user.id):
-        embed = create_embed(
-            "🚫 Permission Denied",
-            f"{EMOJI['warning']} This command is restricted to administrators only.",
-            color=ERROR_COLOR
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
-
-    try:
-        await interaction.response.defer()
+        
+        embed.set_footer(text="Use /start, /stop, or /remove with the instance ID")
+        await interaction.response.send_message(embed=embed)
+    except Exception as e:
+        print(f"Error in list_servers: {e}")
+        try:
+            await interaction.followup.send(
+                embed=create_embed("❌ Error", "An error occurred while processing your request.", color=ERROR_COLOR),
+                ephemeral=True
+            )
+        except:
+            pass
 
-        servers = get_all_servers()
-        container_stats = get_container_stats()
+class InstanceListView(discord.ui.View):
+    """Pages through a snapshot of instances; only the page being shown is rendered"""
+    
+    def __init__(self, requester_id, servers, filters):
+        super().__init__(timeout=300)
+        self.requester_id = requester_id
+        self.servers = servers
+        self.filters = filters
+        self.page = 0
+        self.pages = max(1, -(-len(servers) // LIST_PAGE_SIZE))
+        self.message = None
+        self.update_buttons()
+    
+    def update_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.pages - 1
+        self.page_label.label = f"{self.page + 1}/{self.pages}"
+    
+    def render(self):
         host_stats = get_system_resources()
+        description = bot.state_cache.freshness()
+        if self.filters:
+            description += "\n🔍 " + " • ".join(f"**{name}**: `{value}`" for name, value in self.filters)
         
         embed = create_embed(
-            f"📊 System Overview - All Instances ({len(servers)} total)",
-            color=EMBED_COLOR
+            f"📊 System Overview - All Instances ({len(self.servers)} {'matching' if self.filters else 'total'})",
+            description,
+            color=EMBED_COLOR,
+            footer=f"Page {self.page + 1}/{self.pages} • {bot.bot_name} • Admin Managed"
         )
-
+        
         cpu_emoji = "🟢" if host_stats['cpu'] < 70 else "🟡" if host_stats['cpu'] < 90 else "🔴"
         mem_emoji = "🟢" if host_stats['memory']['percent'] < 70 else "🟡" if host_stats['memory']['percent'] < 90 else "🔴"
         disk_emoji = "🟢" if host_stats['disk']['percent'] < 70 else "🟡" if host_stats['disk']['percent'] < 90 else "🔴"
@@ -1317,57 +4491,106 @@ async def list_all_servers(interaction: discord.Interaction):
             ),
             inline=False
         )
-        embed.add_field(name="\u200b", value="\u200b", inline=False)
-
-        if not servers:
+        
+        if not self.servers:
             embed.add_field(
                 name="📭 No Instances Found",
-                value="There are no active instances.",
+                value="No instances match these filters." if self.filters else "There are no active instances.",
                 inline=False
             )
-            await interaction.followup.send(embed=embed)
-            return
-
-        for server in servers:
-            parts = server.split('|')
-            if len(parts) < 3:
-                continue
-                
-            user_owner = parts[0]
-            container_id = parts[1]
-            os_type = "Unknown"
-            
-            for os_id, os_data in OS_OPTIONS.items():
-                if os_id in parts[2].lower():
-                    os_type = f"{os_data['emoji']} {os_data['name']}"
-                    break
-
-            stats = container_stats.get(container_id, {'cpu': '0.00%', 'mem_used': '0B', 'mem_limit': '0B'})
-            
-            try:
-                status = subprocess.check_output(
-                    ["docker", "inspect", "--format='{{.State.Status}}'", container_id],
-                    stderr=subprocess.DEVNULL
-                ).decode('utf-8').strip().strip("'")
-                
-                status_emoji = "🟢" if status == "running" else "🔴"
-                status_text = f"{status_emoji} {status.capitalize()}"
-            except:
-                status_text = "🔴 Unknown"
-            
+            return embed
+        
+        start = self.page * LIST_PAGE_SIZE
+        for server in self.servers[start:start + LIST_PAGE_SIZE]:
+            container_id = server['container_id']
+            stats = bot.state_cache.stats(container_id)
             embed.add_field(
                 name=f"🖥️ Instance `{container_id[:12]}`",
                 value=(
-                    f"▫️ **Owner**: `{user_owner}`\n"
-                    f"▫️ **OS**: {os_type}\n"
-                    f"▫️ **Status**: {status_text}\n"
+                    f"▫️ **Owner**: `{server['owner']}`\n"
+                    f"▫️ **OS**: {get_os_label(server)}\n"
+                    f"▫️ **Node**: `{server['node']}` • **Plan**: `{server['plan']}`\n"
+                    f"▫️ **Status**: {format_status(bot.state_cache.status(container_id))}\n"
                     f"▫️ **CPU**: {stats['cpu']}\n"
-                    f"▫️ **RAM**: {stats['mem_used']} / {stats['mem_limit']}"
+                    f"▫️ **RAM**: {stats['mem_used']} / {stats['mem_limit']}\n"
+                    f"▫️ **CPU 1h**: `{sparkline(bot.metrics.history(container_id, 'cpu', 3600, width=20), 100) or 'no data'}`"
                 ),
                 inline=False
             )
+        return embed
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.requester_id:
+            await interaction.response.send_message(f"{EMOJI['error']} Only the admin who ran this command can change pages!", ephemeral=True)
+            return False
+        return True
+    
+    async def show(self, interaction):
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.render(), view=self)
+    
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary, emoji="◀️")
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(self.page - 1, 0)
+        await self.show(interaction)
+    
+    @discord.ui.button(label="1/1", style=discord.ButtonStyle.secondary, disabled=True)
+    async def page_label(self, interaction: discord.Interaction, button: discord.ui.Button):
+        pass
+    
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary, emoji="▶️")
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = min(self.page + 1, self.pages - 1)
+        await self.show(interaction)
+    
+    async def on_timeout(self):
+        if self.message:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+@bot.tree.command(name="list-all", description="📜 [ADMIN] List all deployed instances")
+@app_commands.describe(
+    owner="Only instances owned by this user (e.g. name or name#1234)",
+    os="Only instances of this OS (ubuntu, debian, alpine, arch, kali, fedora)",
+    status="Only instances in this state (running, exited, paused, created, unknown)",
+    node="Only instances placed on this node"
+)
+async def list_all_servers(interaction: discord.Interaction, owner: Optional[str] = None, os: Optional[str] = None, status: Optional[str] = None, node: Optional[str] = None):
+    """List all VPS (Admin only)"""
+    if not is_admin(interaction.user.id):
+        embed = create_embed(
+            "🚫 Permission Denied",
+            f"{EMOJI['warning']} This command is restricted to administrators only.",
+            color=ERROR_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+
+    try:
+        await interaction.response.defer()
+        
+        # Snapshot once; pages are rendered from it on demand
+        servers = get_user_servers(owner) if owner else get_all_servers()
+        filters = []
+        if owner:
+            filters.append(("Owner", owner))
+        if os:
+            os = os.lower()
+            servers = [s for s in servers if s.get('os_type') == os]
+            filters.append(("OS", os))
+        if node:
+            servers = [s for s in servers if s['node'] == node]
+            filters.append(("Node", node))
+        if status:
+            status = status.lower()
+            statuses = await get_cached_statuses(s['container_id'] for s in servers)
+            servers = [s for s in servers if (statuses.get(s['container_id']) or 'unknown') == status]
+            filters.append(("Status", status))
         
-        await interaction.followup.send(embed=embed)
+        view = InstanceListView(interaction.user.id, servers, filters)
+        view.message = await interaction.followup.send(embed=view.render(), view=view, wait=True)
     except Exception as e:
         print(f"Error in list_all_servers: {e}")
         try:
@@ -1378,6 +4601,90 @@ async def list_all_servers(interaction: discord.Interaction):
         except:
             pass
 
+STATS_WINDOWS = {"1h": 3600, "24h": 24 * 3600, "7d": 7 * 86400, "30d": 30 * 86400}
+
+@bot.tree.command(name="stats", description="📈 Show usage history of an instance")
+@app_commands.describe(
+    container_id="Instance ID (first 4+ characters)",
+    window="History window: 1h, 24h, 7d or 30d"
+)
+async def stats_command(interaction: discord.Interaction, container_id: str, window: str = "1h"):
+    """Show CPU, memory, network and disk I/O trends for one instance"""
+    try:
+        window = window.lower()
+        if window not in STATS_WINDOWS:
+            embed = create_embed(
+                "❌ Invalid Window",
+                f"Choose one of: {', '.join(f'`{w}`' for w in STATS_WINDOWS)}",
+                color=ERROR_COLOR
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        # Admins can inspect any instance, users only their own
+        if is_admin(interaction.user.id):
+            server = bot.registry.find(container_id)
+        else:
+            server = get_user_container(str(interaction.user), container_id)
+        if not server:
+            embed = create_embed(
+                "🔍 Instance Not Found",
+                "No instance found with that ID that belongs to you!",
+                color=INFO_COLOR
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        container_id = server['container_id']
+        seconds = STATS_WINDOWS[window]
+        current = bot.state_cache.stats(container_id)
+        
+        def trend(column, ceiling=None, unit=lambda v: f"{v:.1f}%"):
+            values = bot.metrics.history(container_id, column, seconds)
+            present = [v for v in values if v is not None]
+            if not present:
+                return "```No samples recorded yet```"
+            return (
+                f"```{sparkline(values, ceiling)}\n"
+                f"min {unit(min(present))} • avg {unit(sum(present) / len(present))} • max {unit(max(present))}```"
+            )
+        
+        def total(column):
+            return sum(v for v in bot.metrics.history(container_id, column, seconds) if v)
+        
+        embed = create_embed(
+            f"📈 Instance `{container_id[:12]}` — last {window}",
+            f"▫️ **Owner**: `{server['owner']}`\n"
+            f"▫️ **OS**: {get_os_label(server)}\n"
+            f"▫️ **Status**: {format_status(bot.state_cache.status(container_id))}\n"
+            f"▫️ **Now**: CPU {current['cpu']} • RAM {current['mem_used']} / {current['mem_limit']}",
+            color=EMBED_COLOR,
+            fields=[
+                (f"{EMOJI['cpu']} CPU", trend('cpu', 100), False),
+                (f"{EMOJI['ram']} Memory", trend('mem', unit=format_bytes), False),
+                (
+                    f"{EMOJI['network']} Network",
+                    f"```↓ {format_bytes(total('net_rx'))} • ↑ {format_bytes(total('net_tx'))}```",
+                    True
+                ),
+                (
+                    f"{EMOJI['disk']} Disk I/O",
+                    f"```read {format_bytes(total('blk_read'))} • write {format_bytes(total('blk_write'))}```",
+                    True
+                )
+            ]
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    except Exception as e:
+        print(f"Error in stats_command: {e}")
+        try:
+            await interaction.response.send_message(
+                embed=create_embed("❌ Error", "An error occurred while processing your request.", color=ERROR_COLOR),
+                ephemeral=True
+            )
+        except:
+            pass
+
 @bot.tree.command(name="delete-container", description="❌ [ADMIN] Delete any container by ID")
 @app_commands.describe(container_id="The ID of the container to delete")
 async def delete_user_container(interaction: discord.Interaction, container_id: str):
@@ -1417,22 +4724,23 @@ async def delete_user_container(interaction: discord.Interaction, container_id:
                 await interaction.response.defer()
                 
                 try:
-                    subprocess.run(["docker", "stop", container_info], check=True)
-                    subprocess.run(["docker", "rm", container_info], check=True)
-                    remove_container_from_database_by_id(container_info)
+                    async with bot.lifecycle.slot(interaction.user.id, container_info):
+                        await bot.nodes.docker_for(container_info).stop_container(container_info)
+                        await bot.nodes.docker_for(container_info).remove_container(container_info)
+                        remove_container_from_database_by_id(container_info)
                     
-                    embed = create_embed(
-                        f"☠️ Container Force Deleted {random.choice(SUCCESS_ANIMATION)}",
-                        f"Successfully deleted container `{container_info[:12]}`\n**Owner**: {user_owner}",
-                        color=SUCCESS_COLOR
-                    )
-                    await interaction.followup.send(embed=embed)
-                    await send_to_logs(f"💥 {interaction.user.mention} force-deleted container `{container_info[:12]}` owned by `{user_owner}`")
+                        embed = create_embed(
+                            f"☠️ Container Force Deleted {random.choice(SUCCESS_ANIMATION)}",
+                            f"Successfully deleted container `{container_info[:12]}`\n**Owner**: {user_owner}",
+                            color=SUCCESS_COLOR
+                        )
+                        await interaction.followup.send(embed=embed)
+                        send_to_logs(f"💥 {interaction.user.mention} force-deleted container `{container_info[:12]}` owned by `{user_owner}`")
 
-                except subprocess.CalledProcessError as e:
+                except DockerError as e:
                     embed = create_embed(
                         f"❌ Deletion Failed {random.choice(ERROR_ANIMATION)}",
-                        f"```diff\n- Error:\n{e.stderr if e.stderr else e.stdout}\n```",
+                        f"```diff\n- Error:\n{e}\n```",
                         color=ERROR_COLOR
                     )
                     await interaction.followup.send(embed=embed)
@@ -1469,10 +4777,22 @@ async def delete_user_container(interaction: discord.Interaction, container_id:
         except:
             pass
 
+HISTORY_WINDOWS = {"1h": 3600, "24h": 24 * 3600}
+
 @bot.tree.command(name="resources", description="📊 Show host system resources")
-async def resources_command(interaction: discord.Interaction):
+@app_commands.describe(history="Show usage history for the last 1h or 24h")
+async def resources_command(interaction: discord.Interaction, history: Optional[str] = None):
     """Show system resources"""
     try:
+        if history and history.lower() not in HISTORY_WINDOWS:
+            embed = create_embed(
+                "❌ Invalid History Window",
+                f"Choose one of: {', '.join(f'`{window}`' for window in HISTORY_WINDOWS)}",
+                color=ERROR_COLOR
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
         resources = get_system_resources()
         
         cpu_emoji = "🟢" if resources['cpu'] < 70 else "🟡" if resources['cpu'] < 90 else "🔴"
@@ -1485,10 +4805,33 @@ async def resources_command(interaction: discord.Interaction):
             fields=[
                 (f"{cpu_emoji} CPU Usage", f"```{resources['cpu']}%```", True),
                 (f"{mem_emoji} Memory", f"```{resources['memory']['used']}GB / {resources['memory']['total']}GB\n({resources['memory']['percent']}%)```", True),
-                (f"{disk_emoji} Disk Space", f"```{resources['disk']['used']}GB / {resources['disk']['total']}GB\n({resources['disk']['percent']}%)```", True)
+                (f"{disk_emoji} Disk Space", f"```{resources['disk']['used']}GB / {resources['disk']['total']}GB\n({resources['disk']['percent']}%)```", True),
+                ("📈 Load Average", f"```{resources['load']}```", True),
+                (f"{EMOJI['network']} Network", f"```↑ {format_bytes(resources['network']['sent'])}/s\n↓ {format_bytes(resources['network']['recv'])}/s```", True)
             ]
         )
         
+        if history:
+            sampler = bot.host_sampler
+            seconds = HISTORY_WINDOWS[history.lower()]
+            lines = []
+            for label, column, ceiling in (("CPU ", 'cpu', 100), ("MEM ", 'mem_percent', 100), ("LOAD", 'load', None)):
+                values = sampler.history(column, seconds)
+                present = [v for v in values if v is not None]
+                if present:
+                    lines.append(f"{label} {sparkline(values, ceiling)} {min(present):.1f}/{sum(present) / len(present):.1f}/{max(present):.1f}")
+            net = [
+                None if sent is None else sent + recv
+                for sent, recv in zip(sampler.history('net_sent', seconds), sampler.history('net_recv', seconds))
+            ]
+            if any(v is not None for v in net):
+                lines.append(f"NET  {sparkline(net)} peak {format_bytes(max(v for v in net if v is not None))}/s")
+            embed.add_field(
+                name=f"{EMOJI['stats']} Last {history.lower()} (min/avg/max)",
+                value=f"```{chr(10).join(lines)}```" if lines else "No samples recorded yet",
+                inline=False
+            )
+        
         health_score = (100 - resources['cpu']) * 0.3 + (100 - resources['memory']['percent']) * 0.4 + (100 - resources['disk']['percent']) * 0.3
         if health_score > 80:
             health_msg = "🌟 Excellent system health!"
@@ -1558,11 +4901,312 @@ async def uptime_command(interaction: discord.Interaction):
     )
     await interaction.response.send_message(embed=embed)
 
+@bot.tree.command(name="set-plan", description="📐 [ADMIN] Change a user's resource plan, applied live to their instances")
+@app_commands.describe(
+    user="The user whose plan to change",
+    plan="small, standard or large; default goes back to each OS's plan"
+)
+async def set_plan(interaction: discord.Interaction, user: discord.User, plan: str):
+    """Set a user's resource plan and resize their existing instances (Admin only)"""
+    if not is_admin(interaction.user.id):
+        embed = create_embed(
+            "🚫 Permission Denied",
+            f"{EMOJI['warning']} This command is restricted to administrators only.",
+            color=ERROR_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    plan = plan.lower()
+    if plan != 'default' and plan not in RESOURCE_PLANS:
+        plans = "\n".join(f"▫️ {describe_plan(name)}" for name in RESOURCE_PLANS)
+        embed = create_embed(
+            "❌ Invalid Plan",
+            f"**Available plans:**\n{plans}\n▫️ default (each OS's own plan)",
+            color=ERROR_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    await interaction.response.defer()
+    owner = str(user)
+    if plan == 'default':
+        await bot.store.write(bot.store.set_user_plan, owner, None)
+        bot.user_plans.pop(owner, None)
+    else:
+        await bot.store.write(bot.store.set_user_plan, owner, plan)
+        bot.user_plans[owner] = plan
+    
+    updated, refused, failed = [], [], []
+    for record in get_user_servers(owner):
+        target = plan_for(owner, record['os_type'])
+        if record['plan'] == target:
+            continue
+        container_id = record['container_id']
+        node = bot.nodes.get(record['node'])
+        if not bot.nodes.fits(node, target, replacing=record['plan']):
+            refused.append(f"`{container_id[:12]}` on {node.name}")
+            continue
+        try:
+            async with bot.lifecycle.container_lock(container_id):
+                await node.docker.update_container(container_id, plan_host_config(target, live=True))
+        except DockerError as e:
+            failed.append(f"`{container_id[:12]}`: {e}")
+            continue
+        bot.registry.update_plan(container_id, target)
+        updated.append(f"`{container_id[:12]}` → {target}")
+    
+    fields = []
+    if updated:
+        fields.append((f"{EMOJI['check']} Resized Live ({len(updated)})", "\n".join(updated)[:1024], False))
+    if refused:
+        fields.append((f"{EMOJI['warning']} Kept Old Plan, Node Full ({len(refused)})", "\n".join(refused)[:1024], False))
+    if failed:
+        fields.append((f"{EMOJI['cross']} Failed ({len(failed)})", "\n".join(failed)[:1024], False))
+    embed = create_embed(
+        "📐 Plan Updated",
+        f"{user.mention} is now on **{describe_plan(plan) if plan != 'default' else 'the default plan of each OS'}**.",
+        color=SUCCESS_COLOR if not refused and not failed else WARNING_COLOR,
+        fields=fields
+    )
+    await interaction.followup.send(embed=embed)
+    send_to_logs(f"📐 {interaction.user.mention} set {user.mention}'s plan to `{plan}` ({len(updated)} resized, {len(refused) + len(failed)} unchanged)")
+
+@bot.tree.command(name="admission", description="🚦 [ADMIN] Show or change the deploy admission thresholds")
+@app_commands.describe(
+    memory_headroom="Percent of each node's memory that must stay free after a deploy",
+    cpu_headroom="Percent of each node's CPUs that must stay free after a deploy",
+    queue_limit="Deploys that may wait for headroom before new ones are rejected"
+)
+async def admission_command(interaction: discord.Interaction, memory_headroom: Optional[app_commands.Range[int, 0, 90]] = None,
+                            cpu_headroom: Optional[app_commands.Range[int, 0, 90]] = None, queue_limit: Optional[app_commands.Range[int, 0, 1000]] = None):
+    """Adjust admission control until the next restart (Admin only)"""
+    if not is_admin(interaction.user.id):
+        embed = create_embed(
+            "🚫 Permission Denied",
+            f"{EMOJI['warning']} This command is restricted to administrators only.",
+            color=ERROR_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    admission = bot.admission
+    changed = []
+    if memory_headroom is not None:
+        admission.memory_headroom = memory_headroom / 100
+        changed.append(f"memory headroom {memory_headroom}%")
+    if cpu_headroom is not None:
+        admission.cpu_headroom = cpu_headroom / 100
+        changed.append(f"CPU headroom {cpu_headroom}%")
+    if queue_limit is not None:
+        admission.queue_limit = queue_limit
+        changed.append(f"queue limit {queue_limit}")
+    if changed:
+        admission.wake()
+        send_to_logs(f"🚦 {interaction.user.mention} changed admission control: {', '.join(changed)}")
+    
+    embed = create_embed(
+        "🚦 Admission Control" + (" Updated" if changed else ""),
+        f"**Memory Headroom**: {admission.memory_headroom:.0%}\n"
+        f"**CPU Headroom**: {admission.cpu_headroom:.0%}\n"
+        f"**Queue**: {len(admission.queue)} / {admission.queue_limit} waiting • "
+        f"timeout {ADMISSION_QUEUE_TIMEOUT // 60} min",
+        color=SUCCESS_COLOR if changed else EMBED_COLOR,
+        footer="Changes last until the bot restarts; edit the ADMISSION_* settings to keep them" if changed else None
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="images", description="📦 [ADMIN] OS image versions and sizes on every node")
+@app_commands.describe(refresh="Pull every image and prune dangling layers now")
+async def images_command(interaction: discord.Interaction, refresh: bool = False):
+    """Show what the image manager has on each node (Admin only)"""
+    if not is_admin(interaction.user.id):
+        embed = create_embed(
+            "🚫 Permission Denied",
+            f"{EMOJI['warning']} This command is restricted to administrators only.",
+            color=ERROR_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True)
+    if refresh:
+        await bot.images.refresh()
+    
+    fields = []
+    missing = False
+    for image in sorted({os_data['image'] for os_data in OS_OPTIONS.values()}):
+        lines = []
+        for node in bot.nodes.nodes.values():
+            entry = bot.images.images.get((node.name, image))
+            if not entry or not entry['checked']:
+                lines.append(f"{EMOJI['pending']} `{node.name}`: not checked yet")
+            elif not entry['id']:
+                missing = True
+                lines.append(f"{EMOJI['offline']} `{node.name}`: missing ({(entry['error'] or 'unknown error')[:80]})")
+            else:
+                digest = entry['digest'].rsplit('@', 1)[-1][:19] if entry['digest'] else entry['id'][:19]
+                pull = f"{entry['pull_seconds']:.1f}s" if entry['pull_seconds'] is not None else "n/a"
+                lines.append(
+                    f"{EMOJI['online']} `{node.name}`: `{digest}` • {format_bytes(entry['size'])} • "
+                    f"new <t:{int(entry['pulled'])}:R> • pull {pull}{' (local build)' if entry['error'] else ''}"
+                )
+        fields.append((f"{EMOJI['package']} {image}", "\n".join(lines)[:1024], False))
+    
+    embed = create_embed(
+        "📦 OS Images",
+        f"Last refresh: <t:{int(bot.images.refreshed)}:R>" if bot.images.refreshed else "First refresh still running",
+        color=WARNING_COLOR if missing else EMBED_COLOR,
+        fields=fields,
+        footer=f"Refreshed every {IMAGE_REFRESH_INTERVAL // 3600}h • /images refresh:True to pull now"
+    )
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="nodes", description="🌐 [ADMIN] Docker nodes and how full they are")
+async def nodes_command(interaction: discord.Interaction):
+    """Show every node's placement load (Admin only)"""
+    if not is_admin(interaction.user.id):
+        embed = create_embed(
+            "🚫 Permission Denied",
+            f"{EMOJI['warning']} This command is restricted to administrators only.",
+            color=ERROR_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    pool = bot.nodes
+    loads = bot.admission.loads()
+    fields = []
+    for node in pool.nodes.values():
+        instances, memory, cpus = pool.committed(node)
+        load_memory, load_cpus = loads[node.name]
+        if node.memory == float('inf'):
+            memory_capacity = "unlimited"
+        else:
+            memory_capacity = f"{format_bytes(node.memory * MEMORY_OVERCOMMIT)} ({memory / (node.memory * MEMORY_OVERCOMMIT) * 100:.0f}%)"
+        if node.cpus == float('inf'):
+            cpu_capacity = "unlimited"
+        else:
+            cpu_capacity = f"{node.cpus * CPU_OVERCOMMIT:g} ({cpus / (node.cpus * CPU_OVERCOMMIT) * 100:.0f}%)"
+        state = f"{EMOJI['online']} Reachable" if node.reachable else f"{EMOJI['offline']} Retrying <t:{int(node.unreachable_until)}:R>"
+        events = "live" if node.name in bot.state_cache.live_nodes else "disconnected"
+        fields.append((
+            f"{EMOJI['node']} {node.name}{' (default)' if node is pool.default else ''}",
+            f"▫️ **State**: {state}\n"
+            f"▫️ **Instances**: {instances}\n"
+            f"▫️ **Memory**: {format_bytes(memory)} / {memory_capacity}\n"
+            f"▫️ **CPUs**: {cpus:g} / {cpu_capacity}\n"
+            f"▫️ **In Use**: {format_bytes(load_memory)} • {load_cpus:.1f} CPUs\n"
+            f"▫️ **Events**: {events}\n"
+            f"▫️ **Endpoint**: `{node.docker.url or node.docker.socket_path}`",
+            False
+        ))
+    embed = create_embed(
+        f"🌐 Nodes ({len(pool.nodes)})",
+        f"**Placement**: {pool.strategy} • **Overcommit**: {MEMORY_OVERCOMMIT:g}x memory, {CPU_OVERCOMMIT:g}x CPU\n"
+        f"**Admission**: keeps {bot.admission.memory_headroom:.0%} memory and {bot.admission.cpu_headroom:.0%} CPU free • "
+        f"{len(bot.admission.queue)}/{bot.admission.queue_limit} deploys waiting",
+        color=EMBED_COLOR,
+        fields=fields
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="diag", description="🩺 [ADMIN] Event loop lag and blocking call reports")
+@app_commands.describe(report="Show the full stack of one report (1 = most recent)")
+async def diag_command(interaction: discord.Interaction, report: Optional[int] = None):
+    """Show event loop health and recent blocking-call reports (Admin only)"""
+    if not is_admin(interaction.user.id):
+        embed = create_embed(
+            "🚫 Permission Denied",
+            f"{EMOJI['warning']} This command is restricted to administrators only.",
+            color=ERROR_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    watchdog = bot.watchdog
+    reports = list(reversed(watchdog.reports))
+    
+    if report is not None:
+        if not 1 <= report <= len(reports):
+            embed = create_embed(
+                "🔍 Report Not Found",
+                f"There are {len(reports)} blocking reports.",
+                color=INFO_COLOR
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        entry = reports[report - 1]
+        # Innermost frames are the interesting ones; keep them when trimming
+        stack = "".join(entry['stack'])[-3900:] or "No stack was captured"
+        embed = create_embed(
+            f"🩺 Blocking Report #{report}",
+            f"**Blocked for**: {entry['lag'] * 1000:.0f}ms <t:{int(entry['time'])}:R>\n"
+            f"**At**: `{entry['culprit']}`\n```py\n{stack}\n```",
+            color=WARNING_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    latency = bot.latency * 1000
+    embed = create_embed(
+        "🩺 Event Loop Diagnostics",
+        f"**Gateway Latency**: {latency:.0f}ms\n"
+        f"**Loop Lag**: {watchdog.last_lag * 1000:.1f}ms now • {watchdog.max_lag * 1000:.0f}ms max\n"
+        f"**Stalls** (≥ {LOOP_STALL_THRESHOLD * 1000:.0f}ms): {watchdog.stalls}",
+        color=EMBED_COLOR if not reports else WARNING_COLOR
+    )
+    for number, entry in enumerate(reports[:10], 1):
+        embed.add_field(
+            name=f"#{number} • {entry['lag'] * 1000:.0f}ms",
+            value=f"`{entry['culprit'][:200]}`\n<t:{int(entry['time'])}:R>",
+            inline=False
+        )
+    if reports:
+        embed.set_footer(text="Use /diag report:<number> for the full stack")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="trace", description="🧭 [ADMIN] Show the span waterfall of a recent command")
+@app_commands.describe(command="Command name, e.g. deploy (defaults to the most recent command)")
+async def trace_command(interaction: discord.Interaction, command: Optional[str] = None):
+    """Render the latest trace of a command (Admin only)"""
+    if not is_admin(interaction.user.id):
+        embed = create_embed(
+            "🚫 Permission Denied",
+            f"{EMOJI['warning']} This command is restricted to administrators only.",
+            color=ERROR_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    command = command.lower().lstrip('/').removeprefix('last ').strip() if command else None
+    # This invocation is still running, so it is not in the buffer yet
+    trace = tracer.last(command)
+    if not trace:
+        recent = ", ".join(sorted({f"`{t.command}`" for t in tracer.traces})) or "none yet"
+        embed = create_embed(
+            "🔍 No Trace Found",
+            f"No traced `{command or 'command'}` invocation in the buffer.\n**Recent commands**: {recent}",
+            color=INFO_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    embed = create_embed(
+        f"🧭 Trace of /{trace.command}",
+        f"**By**: `{trace.user}` <t:{int(trace.time)}:R>\n"
+        f"**Total**: {trace.duration * 1000:.1f}ms • **Spans**: {len(trace.spans) + trace.dropped}\n"
+        f"```\n{Tracer.waterfall(trace)}\n```",
+        color=EMBED_COLOR,
+        footer=f"Sampling {TRACE_SAMPLE_RATE:.0%} of commands • {len(tracer.traces)} traces buffered"
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 @bot.tree.command(name="about", description="ℹ️ About the bot")
 async def about_command(interaction: discord.Interaction):
     """About the bot"""
-    total_servers = len(get_all_servers())
-    total_users = len(set([s.split('|')[0] for s in get_all_servers()]))
+    total_servers = bot.registry.count()
+    total_users = bot.registry.count_owners()
     
     embed = create_embed(
         f"About {bot.bot_name}",
@@ -1590,24 +5234,33 @@ async def help_command(interaction: discord.Interaction):
 
     commands_list = [
         ("📜 `/list`", "List your instances"),
-        ("📜 `/list-all`", "[ADMIN] List all instances"),
+        ("📜 `/list-all [owner] [os] [status] [node]`", "[ADMIN] List all instances, paginated"),
         ("🟢 `/start <id>`", "Start your instance"),
         ("🛑 `/stop <id>`", "Stop your instance"),
         ("🔄 `/restart <id>`", "Restart your instance"),
         ("🔄 `/regen-ssh <id>`", "Regenerate SSH"),
         ("🗑️ `/remove <id>`", "Delete an instance"),
-        ("📊 `/resources`", "Show system resources"),
+        ("📈 `/stats <id> [window]`", "Usage history of an instance"),
+        ("📸 `/snapshot <id> [name]` · `/clone <snapshot>` · `/snapshots` · `/snapshot-delete <snapshot>`", "Save an instance and deploy copies of it"),
+        ("📊 `/resources [history]`", "Show system resources, optionally with 1h/24h history"),
         ("🏓 `/ping`", "Check latency"),
         ("⏱️ `/uptime`", "Bot uptime"),
         ("ℹ️ `/about`", "About the bot"),
         ("👑 `/admin`", "[ADMIN] Manage admins"),
         ("👑 `/admins`", "List admins"),
-        ("❌ `/delete-container <id>`", "[ADMIN] Force delete container")
+        ("❌ `/delete-container <id>`", "[ADMIN] Force delete container"),
+        ("📐 `/set-plan @user <plan>`", "[ADMIN] Change a user's resource plan"),
+        ("🌐 `/nodes`", "[ADMIN] Docker nodes and placement load"),
+        ("📦 `/images [refresh]`", "[ADMIN] OS image versions on every node"),
+        ("🚦 `/admission [memory_headroom] [cpu_headroom] [queue_limit]`", "[ADMIN] Deploy admission thresholds"),
+        ("🩺 `/diag [report]`", "[ADMIN] Event loop lag and blocking calls"),
+        ("🧭 `/trace [command]`", "[ADMIN] Span waterfall of a recent command")
     ]
     
     # Add deploy command for admins
     if is_admin(interaction.user.id):
         commands_list.insert(0, ("🚀 `/deploy @user <os>`", "[ADMIN] Deploy VPS"))
+        commands_list.insert(1, ("🚀 `/deploy-bulk <os> [users] [role]`", "[ADMIN] Deploy VPS for many users"))
     
     for cmd, desc in commands_list:
         embed.add_field(name=cmd, value=desc, inline=False)
@@ -1628,7 +5281,7 @@ async def on_ready():
     print(f"📊 Bot ID: {bot.user.id}")
     print(f"👑 Main Admin: {bot.main_admin_id}")
     print(f"👥 Admins: {len(bot.admins)}")
-    print(f"📁 Database: {os.path.exists(database_file)}")
+    print(f"📁 Database: {database_file} ({bot.registry.count()} instances)")
     
     try:
         synced = await bot.tree.sync()
@@ -1636,25 +5289,93 @@ async def on_ready():
     except Exception as e:
         print(f"❌ Error syncing commands: {e}")
     
-    change_status.start()
+    # The gateway forgets the presence on reconnect
+    presence_state['rotated'] = 0
+    if not change_status.is_running():
+        change_status.start()
 
-@tasks.loop(seconds=5)
+STATUS_TEMPLATES = [
+    "🌠 Managing {} Instances",
+    "⚡ Powering {} Servers",
+    "🔮 Watching {} VMs",
+    "🚀 Hosting {} VPS",
+    "💻 Serving {} Terminals",
+    "🌐 Running {} Nodes"
+]
+presence_state = {'count': None, 'rotated': 0, 'template': STATUS_TEMPLATES[0]}
+
+@tasks.loop(seconds=STATUS_CHECK_INTERVAL)
 async def change_status():
-    """Change bot status periodically"""
+    """Update the presence when the instance count changes or the rotation interval passes"""
     try:
-        instance_count = len(open(database_file).readlines()) if os.path.exists(database_file) else 0
-        statuses = [
-            f"🌠 Managing {instance_count} Instances",
-            f"⚡ Powering {instance_count} Servers",
-            f"🔮 Watching {instance_count} VMs",
-            f"🚀 Hosting {instance_count} VPS",
-            f"💻 Serving {instance_count} Terminals",
-            f"🌐 Running {instance_count} Nodes"
-        ]
-        await bot.change_presence(activity=discord.Game(name=random.choice(statuses)))
+        instance_count = bot.registry.count()
+        now = time.monotonic()
+        rotate = now - presence_state['rotated'] >= STATUS_ROTATE_INTERVAL
+        if not rotate and instance_count == presence_state['count']:
+            return
+        if rotate:
+            presence_state['template'] = random.choice(STATUS_TEMPLATES)
+            presence_state['rotated'] = now
+        await bot.change_presence(activity=discord.Game(name=presence_state['template'].format(instance_count)))
+        presence_state['count'] = instance_count
     except Exception as e:
         print(f"💥 Failed to update status: {e}")
 
+@tasks.loop(seconds=REGISTRY_FLUSH_INTERVAL)
+async def flush_registry():
+    """Write-behind persistence for the instance registry"""
+    await bot.registry.flush()
+
+@tasks.loop(seconds=STATS_SAMPLE_INTERVAL)
+async def sample_container_stats():
+    """Keep the container stats cache warm so listings never wait on Docker"""
+    try:
+        await bot.state_cache.sample_stats()
+        bot.admission.wake()
+        await bot.metrics.flush()
+    except Exception as e:
+        print(f"💥 Failed to sample container stats: {e}")
+
+@tasks.loop(seconds=HOST_SAMPLE_INTERVAL)
+async def sample_host_resources():
+    """Record host resource usage for /resources and its history"""
+    try:
+        bot.host_sampler.record(await asyncio.to_thread(bot.host_sampler.sample))
+        bot.admission.wake()
+    except Exception as e:
+        print(f"💥 Failed to sample host resources: {e}")
+
+@tasks.loop(seconds=REAPER_INTERVAL)
+async def reap_idle_instances():
+    """Delete instances that passed their inactivity deadline"""
+    try:
+        await bot.reaper.tick()
+    except Exception as e:
+        print(f"💥 Idle reaper failed: {e}")
+
+@tasks.loop(seconds=WARM_POOL_REFILL_INTERVAL)
+async def refill_warm_pool():
+    """Keep the warm pool topped up"""
+    try:
+        await bot.warm_pool.refill()
+    except Exception as e:
+        print(f"💥 Failed to refill warm pool: {e}")
+
+@tasks.loop(seconds=IMAGE_REFRESH_INTERVAL)
+async def refresh_images():
+    """Pull new OS image versions and prune dangling layers"""
+    try:
+        await bot.images.refresh()
+    except Exception as e:
+        print(f"💥 Image refresh failed: {e}")
+
+@refill_warm_pool.before_loop
+async def before_refill_warm_pool():
+    try:
+        await bot.warm_pool.cleanup()
+    except Exception as e:
+        print(f"⚠️ Warm pool cleanup failed: {e}")
+
 @bot.event
 async def on_command_error(ctx, error):
     """Handle command errors"""
@@ -1669,6 +5390,8 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         print("\n🛑 Bot stopped by user")
         bot.save_admins()
+        bot.registry.flush_now()
     except Exception as e:
         print(f"❌ Fatal error: {e}")
         bot.save_admins()
+        bot.registry.flush_now()
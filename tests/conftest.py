@@ -0,0 +1,36 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bench  # noqa: E402
+
+vb = None  # bot.py, set before any test module is collected
+
+
+def pytest_configure(config):
+    """Import bot.py from a scratch directory so it doesn't create its files in the repo"""
+    global vb
+    vb = bench.setup_workdir()
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return vb.InstanceRegistry(vb.InstanceStore(str(tmp_path / "instances.db")))
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def fake_docker(tmp_path):
+    """Start fake Docker daemons on unix sockets under tmp_path; call with a name for each"""
+    def start(name="docker", latency=0, tmate_latency=0, pull_latency=0):
+        docker = bench.FakeDocker(str(tmp_path / f"{name}.sock"), latency, tmate_latency, 1, pull_latency)
+        docker.launch()
+        return docker
+    return start
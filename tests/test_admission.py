@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import run, vb
+
+GIB = 1024 ** 3
+
+
+class FixedHost:
+    """Host sampler stand-in with one sample"""
+
+    def __init__(self, mem_used, cpu=0.0):
+        self.sample = {'mem_used': mem_used, 'cpu': cpu}
+
+    def latest(self):
+        return self.sample
+
+
+def controller(monkeypatch, registry, host_memory, mem_used, node_config=None):
+    monkeypatch.setattr(vb.psutil, 'virtual_memory', lambda: SimpleNamespace(total=host_memory))
+    monkeypatch.setattr(vb.os, 'cpu_count', lambda: 4)
+    nodes = vb.NodePool({"local": {"socket": "/nonexistent.sock", **(node_config or {})}}, registry)
+    state_cache = vb.ContainerStateCache(nodes, registry)
+    return vb.AdmissionController(nodes, registry, state_cache, FixedHost(mem_used))
+
+
+def test_local_node_defaults_to_host_memory(monkeypatch, registry):
+    admission = controller(monkeypatch, registry, 16 * GIB, 0)
+    node = admission.nodes.get("local")
+    assert node.memory == 16 * GIB
+    assert node.cpus == 4
+
+
+def test_small_node_refuses_deploy(monkeypatch, registry):
+    admission = controller(monkeypatch, registry, 1 * GIB, 0)
+    decision, reason = admission.check('standard')
+    assert decision == 'reject'
+    with pytest.raises(vb.AdmissionRejected):
+        run(admission.admit('standard'))
+    assert admission.nodes.held["local"].get('standard', 0) == 0
+
+
+def test_headroom_uses_real_memory_not_configured_size(monkeypatch, registry):
+    # Configured far larger than the host to overcommit; the host itself is nearly full
+    admission = controller(monkeypatch, registry, 4 * GIB, 3 * GIB, {"memory": "64g"})
+    assert admission.check('standard')[0] == 'queue'
+    assert admission.check('small')[0] == 'queue'
+
+
+def test_deploy_accepted_with_headroom(monkeypatch, registry):
+    admission = controller(monkeypatch, registry, 8 * GIB, 1 * GIB)
+    assert admission.check('standard') == ('accept', None)
+    node = run(admission.admit('standard'))
+    assert node.name == "local"
+    assert admission.nodes.held["local"]['standard'] == 1
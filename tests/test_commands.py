@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+import bench
+from conftest import run, vb
+
+
+@pytest.fixture
+def finished(monkeypatch):
+    """Embeds of progress messages as they are finished"""
+    embeds = []
+    finish = vb.ProgressReporter.finish
+
+    async def record(self, *args, **kwargs):
+        await finish(self, *args, **kwargs)
+        embeds.append(self.embed)
+
+    monkeypatch.setattr(vb.ProgressReporter, 'finish', record)
+    return embeds
+
+
+def test_regen_ssh_reports_a_failed_exec(fake_docker, finished, monkeypatch):
+    daemon = fake_docker()
+    discord_api = bench.FakeDiscord(0, 1)
+
+    async def failing_exec(self, container_id, cmd):
+        raise vb.DockerError(500, "container is restarting")
+
+    monkeypatch.setattr(vb.DockerClient, 'exec_run', failing_exec)
+
+    async def scenario():
+        by_owner = bench.reset_bot([daemon], 1, 1, 4)
+        container_id = by_owner["user0"][0]
+        interaction = bench.FakeInteraction(discord_api, bench.FakeUser(discord_api, 2, "user0"))
+        try:
+            await vb.regen_ssh.callback(interaction, container_id[:12])
+        finally:
+            await vb.bot.nodes.close()
+
+    run(scenario())
+    assert [embed.title for embed in finished] == ["🚀 ❌ Error Regenerating SSH"]
+    assert "container is restarting" in finished[0].description
+
+
+def test_cancelled_provision_removes_its_container(fake_docker):
+    daemon = fake_docker(tmate_latency=30)
+
+    async def scenario():
+        bench.reset_bot([daemon], 0, 1, 4)
+        vb.bot.warm_pool.sizes = {}
+        try:
+            provision = asyncio.create_task(vb.provision_instance(1, "alice", "ubuntu"))
+            # Cancelled while waiting for tmate, after the container was created
+            while not daemon.execs:
+                await asyncio.sleep(0.01)
+            provision.cancel()
+            await asyncio.gather(provision, return_exceptions=True)
+            await asyncio.gather(*vb.bot.cleanups)
+            return provision
+        finally:
+            await vb.bot.nodes.close()
+
+    provision = run(scenario())
+    assert provision.cancelled()
+    assert not daemon.containers
+    assert not vb.bot.registry.instances
+    assert vb.bot.nodes.held["node0"].get('standard', 0) == 0
+    assert not vb.bot.nodes.locations
@@ -0,0 +1,207 @@
+import asyncio
+import shutil
+import ssl
+import subprocess
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+
+from bench import frame
+from conftest import run, vb
+
+RELEASE = web.AppKey("release", asyncio.Event)  # Lets hung handlers finish at shutdown
+
+
+@asynccontextmanager
+async def daemon(tmp_path, *routes):
+    """A Docker API stand-in on a unix socket, served from the test's own loop"""
+    app = web.Application()
+    app[RELEASE] = asyncio.Event()
+    for method, path, handler in routes:
+        app.router.add_route(method, f"/{vb.DOCKER_API_VERSION}{path}", handler)
+    runner = web.AppRunner(app, handle_signals=False)
+    await runner.setup()
+    socket_path = str(tmp_path / "docker.sock")
+    await web.UnixSite(runner, socket_path).start()
+    client = vb.DockerClient(socket_path)
+    try:
+        yield client
+    finally:
+        app[RELEASE].set()
+        await client.close()
+        await runner.cleanup()
+
+
+def exec_routes(*chunks, exit_code=0, hang=False):
+    async def create(request):
+        return web.json_response({'Id': "exec1"}, status=201)
+
+    async def start(request):
+        response = web.StreamResponse(headers={'Content-Type': 'application/vnd.docker.raw-stream'})
+        await response.prepare(request)
+        for chunk in chunks:
+            await response.write(chunk)
+            await asyncio.sleep(0.01)
+        if hang:
+            await request.app[RELEASE].wait()
+        return response
+
+    async def inspect(request):
+        return web.json_response({'ExitCode': exit_code})
+
+    return (
+        ("POST", "/containers/{id}/exec", create),
+        ("POST", "/exec/{id}/start", start),
+        ("GET", "/exec/{id}/json", inspect),
+    )
+
+
+def test_exec_run_demuxes_stdout_and_stderr(tmp_path):
+    async def scenario():
+        chunks = [frame(1, b"hello\nwor"), frame(2, b"oops\n"), frame(1, b"ld\n"), frame(1, b"tail")]
+        async with daemon(tmp_path, *exec_routes(*chunks, exit_code=3)) as client:
+            return await client.exec_run("c1", ["echo"])
+
+    assert run(scenario()) == (3, "hello\nworld\ntail")
+
+
+def test_exec_stream_reassembles_split_frames(tmp_path):
+    data = frame(1, b"ssh session: ssh abc@nyc1.tmate.io\n") + frame(2, b"warning\n") + frame(1, b"second\n")
+    # Cut headers and payloads at every awkward boundary
+    chunks = [data[i:i + 3] for i in range(0, len(data), 3)]
+
+    async def scenario():
+        async with daemon(tmp_path, *exec_routes(*chunks)) as client:
+            stream = await client.exec_stream("c1", ["tmate", "-F"])
+            try:
+                lines = [await stream.readline() for _ in range(3)]
+            finally:
+                stream.close()
+            return lines, stream.stderr
+
+    lines, stderr = run(scenario())
+    assert lines == [b"ssh session: ssh abc@nyc1.tmate.io\n", b"second\n", b""]
+    assert stderr == b"warning\n"
+
+
+def test_api_errors_carry_status_and_message(tmp_path):
+    async def missing(request):
+        return web.json_response({'message': "No such container: c1"}, status=404)
+
+    async def scenario():
+        async with daemon(tmp_path, ("GET", "/containers/{id}/json", missing)) as client:
+            assert not await client.container_exists("c1")
+            with pytest.raises(vb.DockerError) as raised:
+                await client.inspect_container("c1")
+            return raised.value
+
+    error = run(scenario())
+    assert (error.status, str(error)) == (404, "No such container: c1")
+    assert vb.telemetry.docker_errors.values[("GET /containers/{id}/json", 404)] >= 1
+
+
+def test_unreachable_daemon(tmp_path):
+    async def scenario():
+        client = vb.DockerClient(str(tmp_path / "missing.sock"))
+        try:
+            with pytest.raises(vb.DockerError) as raised:
+                await client.list_containers()
+        finally:
+            await client.close()
+        return raised.value
+
+    assert run(scenario()).status == 0
+
+
+def test_hung_daemon_times_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(vb, 'DOCKER_TIMEOUT', 0.2)
+
+    async def hang(request):
+        await request.app[RELEASE].wait()
+        return web.json_response([])
+
+    async def scenario():
+        async with daemon(tmp_path, ("GET", "/containers/json", hang)) as client:
+            with pytest.raises(vb.DockerError) as raised:
+                await asyncio.wait_for(client.list_containers(), 5)
+            return raised.value
+
+    assert run(scenario()).status == 504
+
+
+def test_hung_exec_times_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(vb, 'DOCKER_TIMEOUT', 0.2)
+
+    async def scenario():
+        async with daemon(tmp_path, *exec_routes(frame(1, b"partial"), hang=True)) as client:
+            with pytest.raises(vb.DockerError) as raised:
+                await asyncio.wait_for(client.exec_run("c1", ["pkill", "tmate"]), 5)
+            return raised.value
+
+    assert run(scenario()).status == 504
+
+
+def test_operation_labels():
+    assert vb.docker_operation("POST", "/containers/abc123/start") == "POST /containers/{id}/start"
+    assert vb.docker_operation("POST", "/containers/create") == "POST /containers/create"
+    assert vb.docker_operation("GET", "/images/registry:5000/team/app:1.0/json") == "GET /images/{id}/json"
+    assert vb.docker_operation("POST", "/images/prune") == "POST /images/prune"
+    assert vb.docker_operation("GET", "/exec/e1/json") == "GET /exec/{id}/json"
+
+
+def issue_certificates(directory):
+    """A CA plus a server certificate for 127.0.0.1 and a client certificate, signed by it"""
+    openssl = shutil.which("openssl")
+    if not openssl:
+        pytest.skip("openssl is not installed")
+
+    def sh(*args):
+        subprocess.run([openssl, *args], cwd=directory, check=True, capture_output=True)
+
+    key = ["-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1", "-nodes"]
+    sh("req", "-x509", *key, "-keyout", "ca.key", "-out", "ca.pem", "-subj", "/CN=test-ca", "-days", "1")
+    (directory / "server.ext").write_text("subjectAltName=IP:127.0.0.1\n")
+    for name, extra in (("server", ["-extfile", "server.ext"]), ("client", [])):
+        sh("req", *key, "-keyout", f"{name}.key", "-out", f"{name}.csr", "-subj", f"/CN={name}")
+        sh("x509", "-req", "-in", f"{name}.csr", "-CA", "ca.pem", "-CAkey", "ca.key", "-CAcreateserial",
+           "-out", f"{name}.pem", "-days", "1", *extra)
+
+
+def test_tls_node_authenticates_with_its_client_certificate(tmp_path):
+    issue_certificates(tmp_path)
+
+    async def info(request):
+        return web.json_response({'NCPU': 8})
+
+    async def scenario():
+        server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH, cafile=str(tmp_path / "ca.pem"))
+        server_context.load_cert_chain(str(tmp_path / "server.pem"), str(tmp_path / "server.key"))
+        server_context.verify_mode = ssl.CERT_REQUIRED
+        app = web.Application()
+        app.router.add_get(f"/{vb.DOCKER_API_VERSION}/info", info)
+        runner = web.AppRunner(app, handle_signals=False)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0, ssl_context=server_context).start()
+        url = f"https://127.0.0.1:{runner.addresses[0][1]}"
+        files = {name: str(tmp_path / f"client.{ext}") for name, ext in (("cert", "pem"), ("key", "key"))}
+        trusted = vb.Node("remote", {"url": url, "ca": str(tmp_path / "ca.pem"), **files})
+        anonymous = vb.Node("anonymous", {"url": url, "ca": str(tmp_path / "ca.pem")})
+        try:
+            answer = await trusted.docker.info()
+            with pytest.raises(vb.DockerError) as refused:
+                await anonymous.docker.info()
+            return answer, refused.value
+        finally:
+            await trusted.docker.close()
+            await anonymous.docker.close()
+            await runner.cleanup()
+
+    answer, refused = run(scenario())
+    assert answer == {'NCPU': 8}
+    assert refused.status == 0
+
+
+def test_plain_http_node_is_flagged(capsys):
+    vb.Node("remote", {"url": "http://10.0.0.2:2375"})
+    assert "unauthenticated Docker API" in capsys.readouterr().out
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from conftest import run, vb
+
+
+@pytest.fixture
+def logs(monkeypatch):
+    lines = []
+    monkeypatch.setattr(vb, 'send_to_logs', lines.append)
+    return lines
+
+
+def manager(daemon, registry):
+    nodes = vb.NodePool({"node0": {"socket": daemon.path, "memory": "16g", "cpus": 4}}, registry)
+    return vb.ImageManager(nodes), nodes.get("node0")
+
+
+def test_sync_reports_added_current_and_updated(fake_docker, registry):
+    daemon = fake_docker()
+
+    async def scenario():
+        images, node = manager(daemon, registry)
+        try:
+            results = [await images.sync(node, "ubuntu-vps"), await images.sync(node, "ubuntu-vps")]
+            first = images.images[("node0", "ubuntu-vps")]['id']
+            daemon.registry["ubuntu-vps"] = {'Size': 300 * 1024 ** 2, 'Digest': "sha256:" + "f" * 64}
+            results.append(await images.sync(node, "ubuntu-vps"))
+            return results, first, images.images[("node0", "ubuntu-vps")]
+        finally:
+            await node.docker.close()
+
+    results, first, entry = run(scenario())
+    assert results == ['added', 'current', 'updated']
+    assert entry['id'] != first
+    assert entry['digest'] == "ubuntu-vps@sha256:" + "f" * 64
+    assert entry['size'] == 300 * 1024 ** 2
+    assert entry['error'] is None
+
+
+def test_sync_reports_missing_images_and_keeps_local_builds(fake_docker, registry):
+    daemon = fake_docker()
+    daemon.registry.pop("debian-vps")
+    daemon.registry.pop("alpine-vps")
+    daemon.images["alpine-vps"] = {'Id': "sha256:" + "a" * 64, 'RepoDigests': [], 'Size': 5 * 1024 ** 2}
+
+    async def scenario():
+        images, node = manager(daemon, registry)
+        try:
+            return await images.sync(node, "debian-vps"), await images.sync(node, "alpine-vps"), images, node
+        finally:
+            await node.docker.close()
+
+    missing, local, images, node = run(scenario())
+    assert missing == 'missing'
+    assert not images.present(node, "debian-vps")
+    assert "pull access denied" in images.images[("node0", "debian-vps")]['error']
+    # Built on the node, so the failed pull doesn't matter
+    assert local == 'added'
+    assert images.present(node, "alpine-vps")
+
+
+def test_refresh_prunes_the_replaced_version(fake_docker, registry, logs):
+    daemon = fake_docker()
+
+    async def scenario():
+        images, node = manager(daemon, registry)
+        try:
+            await images.refresh()
+            daemon.registry["ubuntu-vps"] = {'Size': 300 * 1024 ** 2, 'Digest': "sha256:" + "f" * 64}
+            await images.refresh()
+        finally:
+            await node.docker.close()
+
+    run(scenario())
+    assert "📦 New version of `ubuntu-vps` on node `node0`" in logs
+    assert [line for line in logs if line.startswith("🧹 Pruned 1 dangling images on `node0`")]
+    assert not [name for name in daemon.images if name.startswith("<none>")]
+
+
+def test_stalled_pull_fails_instead_of_hanging(fake_docker, registry, monkeypatch):
+    monkeypatch.setattr(vb, 'DOCKER_PULL_STALL_TIMEOUT', 0.2)
+    daemon = fake_docker(pull_latency=30)
+
+    async def scenario():
+        images, node = manager(daemon, registry)
+        try:
+            return await asyncio.wait_for(images.sync(node, "ubuntu-vps"), 5), images
+        finally:
+            await node.docker.close()
+
+    result, images = run(scenario())
+    assert result == 'missing'
+    assert "made no progress" in images.images[("node0", "ubuntu-vps")]['error']
@@ -0,0 +1,89 @@
+import asyncio
+
+from conftest import run, vb
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_queued_users_are_served_round_robin():
+    async def scenario():
+        scheduler = vb.LifecycleScheduler(1)
+        release = asyncio.Event()
+        order = []
+        positions = {}
+
+        async def operation(user, name):
+            async def on_queued(position):
+                positions.setdefault(name, position)
+
+            async with scheduler.slot(user, on_queued=on_queued):
+                order.append(name)
+                if name == "holder":
+                    await release.wait()
+
+        tasks = []
+        for user, name in [("admin", "holder"), ("alice", "a1"), ("alice", "a2"), ("alice", "a3"), ("bob", "b1"), ("carol", "c1")]:
+            tasks.append(asyncio.create_task(operation(user, name)))
+            await settle()
+        assert scheduler.waiting() == 5
+        release.set()
+        await asyncio.gather(*tasks)
+        return order, positions, scheduler
+
+    order, positions, scheduler = run(scenario())
+    assert order == ["holder", "a1", "b1", "c1", "a2", "a3"]
+    # Reported when each was queued, before later users joined
+    assert positions == {"a1": 1, "a2": 2, "a3": 3, "b1": 2, "c1": 3}
+    assert scheduler.active == 0 and not scheduler.queues
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        scheduler = vb.LifecycleScheduler(1)
+        release = asyncio.Event()
+        order = []
+
+        async def operation(user, name):
+            async with scheduler.slot(user):
+                order.append(name)
+                await release.wait()
+
+        holder = asyncio.create_task(operation("alice", "holder"))
+        await settle()
+        cancelled = asyncio.create_task(operation("bob", "cancelled"))
+        waiting = asyncio.create_task(operation("carol", "waiting"))
+        await settle()
+        cancelled.cancel()
+        await settle()
+        assert list(scheduler.queues) == ["carol"]
+        release.set()
+        await asyncio.gather(holder, waiting)
+        return order, scheduler
+
+    order, scheduler = run(scenario())
+    assert order == ["holder", "waiting"]
+    assert scheduler.active == 0
+
+
+def test_operations_on_one_container_run_one_at_a_time():
+    async def scenario():
+        scheduler = vb.LifecycleScheduler(4)
+        running = peak = 0
+
+        async def operation(user):
+            nonlocal running, peak
+            async with scheduler.slot(user, "c1"):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(operation(user) for user in ("alice", "bob", "carol")))
+        return peak, scheduler
+
+    peak, scheduler = run(scenario())
+    assert peak == 1
+    assert not scheduler.locks
@@ -0,0 +1,77 @@
+import time
+
+from conftest import vb
+
+GIB = 1024 ** 3
+DAY = 86400
+
+
+def sample(metrics, container_id, timestamp, net_rx, mem=3 * GIB + 7, cpu=12.5):
+    metrics.observe(container_id, {
+        'updated': timestamp, 'cpu_percent': cpu, 'mem_bytes': mem,
+        'net_rx': net_rx, 'net_tx': 0, 'blk_read': 0, 'blk_write': 0
+    })
+
+
+def totals(series, column):
+    return {start: row[column] for start, row in series.buckets()}
+
+
+def test_byte_counts_survive_a_reload_exactly(tmp_path):
+    path = str(tmp_path / "metrics.bin")
+    metrics = vb.ContainerMetrics(path)
+    container_id = "ab" * 32
+    now = time.time()
+    sample(metrics, container_id, now - 30, 10 * GIB)
+    sample(metrics, container_id, now - 20, 15 * GIB + 1)
+    metrics._append(bytes(metrics.pending))
+
+    reloaded = vb.ContainerMetrics(path)
+    (row,) = [row for _, row in reloaded.series[container_id][60].buckets() if row['net_rx']]
+    assert row['net_rx'] == 5 * GIB + 1
+    assert sum(row['mem'] for _, row in reloaded.series[container_id][60].buckets()) == 2 * (3 * GIB + 7)
+
+
+def test_compaction_keeps_each_period_at_its_finest_resolution(tmp_path):
+    path = str(tmp_path / "metrics.bin")
+    metrics = vb.ContainerMetrics(path)
+    kept, expired = "ab" * 32, "cd" * 32
+    now = time.time()
+    counter = 0
+    for age in (10 * DAY, 10 * DAY - 60, 2 * DAY, 2 * DAY - 60, 120, 60):
+        counter += GIB + 1
+        sample(metrics, kept, now - age, counter)
+    sample(metrics, expired, now - 40 * DAY, 0)
+    sample(metrics, expired, now - 40 * DAY + 60, GIB)
+    metrics.compact()
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data.startswith(vb.ContainerMetrics.MAGIC)
+    # 1h buckets for the first sample pair, 10 minute ones for the second and 1 minute ones for the last
+    records = (len(data) - len(vb.ContainerMetrics.MAGIC)) // vb.ContainerMetrics.RECORD.size
+    assert 3 <= records <= 6
+
+    reloaded = vb.ContainerMetrics(path)
+    assert expired not in reloaded.series
+    # Every bucket still within its resolution's retention comes back with the same totals
+    for resolution, retention in vb.METRICS_RESOLUTIONS.items():
+        assert totals(reloaded.series[kept][resolution], 'net_rx') == {
+            start: value for start, value in totals(metrics.series[kept][resolution], 'net_rx').items()
+            if start >= now - retention - resolution
+        }
+    assert sum(totals(reloaded.series[kept][3600], 'net_rx').values()) == 5 * (GIB + 1)
+
+
+def test_legacy_file_is_read_and_rewritten(tmp_path):
+    path = str(tmp_path / "metrics.bin")
+    container_id = "ef" * 32
+    now = time.time()
+    with open(path, 'wb') as f:
+        f.write(vb.ContainerMetrics.LEGACY_RECORD.pack(now - 30, bytes.fromhex(container_id), 1, 50.0, 2048.0, 1024.0, 0, 0, 0))
+
+    metrics = vb.ContainerMetrics(path)
+    ((_, row),) = metrics.series[container_id][60].buckets()
+    assert (row['count'], row['cpu'], row['mem'], row['net_rx']) == (1, 50.0, 2048, 1024)
+    with open(path, 'rb') as f:
+        assert f.read().startswith(vb.ContainerMetrics.MAGIC)
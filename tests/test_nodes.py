@@ -0,0 +1,49 @@
+import pytest
+
+from conftest import vb
+
+
+def pool(registry, sizes, strategy="least-loaded"):
+    nodes = vb.NodePool({
+        name: {"socket": f"/nonexistent-{name}.sock", "memory": memory, "cpus": 4}
+        for name, memory in sizes.items()
+    }, registry)
+    nodes.strategy = strategy
+    return nodes
+
+
+def test_least_loaded_spreads_over_nodes(registry):
+    nodes = pool(registry, {"a": "4g", "b": "4g", "c": "4g"})
+    placed = [nodes.place('small').name for _ in range(3)]
+    assert sorted(placed) == ["a", "b", "c"]
+
+
+def test_bin_pack_fills_the_fullest_node_first(registry):
+    nodes = pool(registry, {"big": "4g", "little": "2g"}, "bin-pack")
+    assert [nodes.place('small').name for _ in range(4)] == ["little", "little", "big", "big"]
+
+
+def test_placement_counts_registered_instances(registry):
+    registry.add("alice", "c" * 64, "ssh a@tmate", "ubuntu", "a", "large")
+    nodes = pool(registry, {"a": "4g", "b": "4g"})
+    assert nodes.place('small').name == "b"
+    assert not nodes.fits(nodes.get("a"), 'small')
+
+
+def test_placement_skips_unreachable_and_full_nodes(registry):
+    nodes = pool(registry, {"a": "1g", "b": "4g"})
+    nodes.mark_unreachable(nodes.get("b"))
+    assert nodes.place('small').name == "a"
+    with pytest.raises(vb.DockerError) as raised:
+        nodes.place('small')
+    assert raised.value.status == 507
+    nodes.settle(nodes.get("a"), 'small')
+    assert nodes.place('small', prefer={"b"}).name == "a"
+
+
+def test_unknown_node_is_an_error_not_the_default(registry):
+    registry.add("alice", "d" * 64, "ssh a@tmate", "ubuntu", "retired", "small")
+    nodes = pool(registry, {"a": "4g", "b": "4g"})
+    assert nodes.node_for("e" * 64) is nodes.default
+    with pytest.raises(vb.DockerError, match="retired"):
+        nodes.node_for("d" * 64)
@@ -0,0 +1,73 @@
+import sqlite3
+
+from conftest import run, vb
+
+
+def container(prefix):
+    return prefix + "0" * (64 - len(prefix))
+
+
+def test_prefix_lookup(registry):
+    registry.add("alice", container("ab12"), "ssh a@tmate", "ubuntu")
+    registry.add("bob", container("ab34"), "ssh b@tmate", "debian")
+    registry.add("alice", container("cd56"), "ssh c@tmate", "alpine")
+
+    assert registry.find("ab12")['owner'] == "alice"
+    assert registry.find("ab3")['container_id'] == container("ab34")
+    assert registry.find("ab")['container_id'] == container("ab12")
+    assert registry.find("ab", owner="bob")['container_id'] == container("ab34")
+    assert registry.find("cd56", owner="bob") is None
+    assert registry.find("ef") is None
+    assert registry.find("") is None
+
+    registry.remove(container("ab12"))
+    assert registry.find("ab")['container_id'] == container("ab34")
+    assert registry.count("alice") == 1
+    assert registry.count_owners() == 2
+
+
+def test_flush_persists_changes(registry):
+    registry.add("alice", container("ab12"), "ssh a@tmate", "ubuntu", "local", "standard")
+    registry.add("alice", container("cd56"), "ssh c@tmate", "alpine")
+    run(registry.flush())
+    registry.update_ssh(container("ab12"), "ssh new@tmate")
+    registry.remove_by_ssh("ssh c@tmate")
+    assert registry.dirty == {container("ab12")}
+    assert registry.deleted == {container("cd56")}
+    run(registry.flush())
+    assert not registry.dirty and not registry.deleted
+
+    reloaded = vb.InstanceRegistry(registry.store)
+    assert [r['container_id'] for r in reloaded.all()] == [container("ab12")]
+    record = reloaded.find("ab12")
+    assert record['ssh_command'] == "ssh new@tmate"
+    assert (record['node'], record['plan']) == ("local", "standard")
+    assert reloaded.ssh_index == {"ssh new@tmate": container("ab12")}
+
+
+def test_records_without_node_or_plan_get_defaults(registry):
+    registry.add("alice", container("ab12"), "ssh a@tmate", "alpine")
+    run(registry.flush())
+    reloaded = vb.InstanceRegistry(registry.store)
+    record = reloaded.find("ab12")
+    assert record['node'] == vb.DEFAULT_NODE
+    assert record['plan'] == vb.OS_PLANS["alpine"]
+    assert reloaded.node_plans == {vb.DEFAULT_NODE: {"small": 1}}
+
+
+def test_old_database_is_migrated(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE instances (container_id TEXT PRIMARY KEY, owner TEXT NOT NULL, ssh_command TEXT NOT NULL,
+                                os_type TEXT, created_at REAL NOT NULL);
+        CREATE INDEX idx_instances_owner ON instances(owner);
+        CREATE INDEX idx_instances_ssh ON instances(ssh_command);
+        INSERT INTO instances VALUES ('abcd', 'alice', 'ssh a@tmate', 'ubuntu', 0);
+    """)
+    conn.close()
+
+    store = vb.InstanceStore(path)
+    indexes = [row[0] for row in store.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'instances'")]
+    assert not [name for name in indexes if not name.startswith("sqlite_autoindex")]
+    assert store.all()[0]['node'] is None
@@ -0,0 +1,64 @@
+from conftest import run, vb
+
+
+def test_prune_during_snapshot_keeps_the_commit(fake_docker, registry):
+    daemon = fake_docker()
+
+    async def scenario():
+        nodes = vb.NodePool({"node0": {"socket": daemon.path, "memory": "16g", "cpus": 4}}, registry)
+        node = nodes.get("node0")
+        try:
+            await vb.ImageManager(nodes).sync(node, "ubuntu-vps")
+            container_id = await node.docker.run_container("ubuntu-vps")
+            registry.add("alice", container_id, "ssh alice@tmate", "ubuntu", "node0", "standard")
+            snapshots = vb.SnapshotManager(nodes, registry.store)
+
+            commit = node.docker.commit_container
+
+            async def commit_then_prune(*args, **kwargs):
+                image_id = await commit(*args, **kwargs)
+                # The image refresh prunes dangling images on its own schedule
+                await node.docker.prune_images()
+                return image_id
+
+            node.docker.commit_container = commit_then_prune
+            snapshot, evicted = await snapshots.create(registry.instances[container_id], "base")
+            details = await node.docker.inspect_image(snapshot['image'])
+            return snapshot, evicted, details
+        finally:
+            await nodes.close()
+
+    snapshot, evicted, details = run(scenario())
+    assert details['Id'] == snapshot['image_id']
+    assert evicted == []
+    assert not [name for name in daemon.images if ':pending-' in name]
+    assert [(row['name'], row['image_id']) for row in registry.store.snapshots()] == [("base", snapshot['image_id'])]
+
+
+def test_oversized_snapshot_is_removed_and_keeps_the_old_one(fake_docker, registry, monkeypatch):
+    daemon = fake_docker()
+
+    async def scenario():
+        nodes = vb.NodePool({"node0": {"socket": daemon.path, "memory": "16g", "cpus": 4}}, registry)
+        node = nodes.get("node0")
+        try:
+            await vb.ImageManager(nodes).sync(node, "ubuntu-vps")
+            container_id = await node.docker.run_container("ubuntu-vps")
+            registry.add("alice", container_id, "ssh alice@tmate", "ubuntu", "node0", "standard")
+            snapshots = vb.SnapshotManager(nodes, registry.store)
+            kept, _ = await snapshots.create(registry.instances[container_id], "base")
+            monkeypatch.setattr(vb, 'SNAPSHOT_QUOTA', "1m")
+            try:
+                await snapshots.create(registry.instances[container_id], "base")
+            except vb.SnapshotError:
+                pass
+            else:
+                raise AssertionError("an oversized snapshot was kept")
+            return kept, snapshots.get("alice", "base")
+        finally:
+            await nodes.close()
+
+    kept, current = run(scenario())
+    assert current is kept
+    assert daemon.images[kept['image']]['Id'] == kept['image_id']
+    assert not [name for name in daemon.images if ':pending-' in name or name.startswith("<none>")]
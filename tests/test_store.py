@@ -0,0 +1,31 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+from conftest import run
+
+
+def test_plan_write_is_not_rolled_back_with_a_failed_flush(registry, monkeypatch):
+    store = registry.store
+    started = threading.Event()
+
+    def failing_apply(upserts, deletes):
+        with store.conn:
+            store.conn.execute("BEGIN")
+            started.set()
+            time.sleep(0.1)
+            raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(store, 'apply', failing_apply)
+
+    async def scenario():
+        registry.add("alice", "a" * 64, "ssh alice@tmate", "ubuntu", "local", "standard")
+        flush = asyncio.create_task(registry.flush())
+        await asyncio.to_thread(started.wait)
+        await store.write(store.set_user_plan, "alice", "large")
+        await flush
+
+    run(scenario())
+    assert store.user_plans() == {"alice": "large"}
+    assert registry.dirty == {"a" * 64}
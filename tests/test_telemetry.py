@@ -0,0 +1,58 @@
+import pytest
+
+from conftest import run, vb
+
+parser = pytest.importorskip("prometheus_client.parser")
+
+
+def test_render_parses_as_prometheus_text():
+    telemetry = vb.Telemetry()
+    telemetry.docker_errors.inc("GET /containers/{id}/json", 404)
+    telemetry.docker_errors.inc("GET /containers/{id}/json", 404)
+    telemetry.instances.set("ubuntu", value=3)
+    telemetry.docker_duration.observe("POST /containers/create", value=0.02)
+    telemetry.docker_duration.observe("POST /containers/create", value=100)
+    telemetry.container_cpu.set('quote " and \\ backslash', "ubuntu", value=1.5)
+
+    families = {family.name: family for family in parser.text_string_to_metric_families(telemetry.render())}
+
+    errors = families["vantanodes_docker_errors"]
+    assert errors.type == "counter"
+    assert [(s.name, s.labels, s.value) for s in errors.samples] == [
+        ("vantanodes_docker_errors_total", {'operation': "GET /containers/{id}/json", 'status': "404"}, 2.0)
+    ]
+    assert families["vantanodes_instances"].samples[0].value == 3.0
+
+    duration = families["vantanodes_docker_request_duration_seconds"]
+    assert duration.type == "histogram"
+    samples = {(s.name, s.labels.get('le')): s.value for s in duration.samples}
+    assert samples[("vantanodes_docker_request_duration_seconds_bucket", "0.025")] == 1.0
+    assert samples[("vantanodes_docker_request_duration_seconds_bucket", "+Inf")] == 2.0
+    assert samples[("vantanodes_docker_request_duration_seconds_count", None)] == 2.0
+
+    cpu = families["vantanodes_container_cpu_percent"].samples[0]
+    assert cpu.labels['container'] == 'quote " and \\ backslash'
+
+
+def test_samples_belong_to_their_declared_family():
+    telemetry = vb.Telemetry()
+    telemetry.docker_errors.inc("GET /info", 500)
+    telemetry.instances.set("ubuntu", value=1)
+    telemetry.loop_lag.observe(value=0.01)
+    lines = telemetry.render().splitlines()
+
+    declared = dict(line.split()[2:4] for line in lines if line.startswith("# TYPE"))
+    assert len(declared) == len([line for line in lines if line.startswith("# TYPE")])
+    assert declared["vantanodes_docker_errors_total"] == "counter"
+    for line in lines:
+        if line.startswith("#"):
+            continue
+        name = line.split("{")[0].split()[0]
+        if name not in declared:
+            family, suffix = name.rsplit("_", 1)
+            assert declared[family] == "histogram" and suffix in ("bucket", "sum", "count")
+
+
+def test_exporter_content_type():
+    response = run(vb.MetricsExporter("127.0.0.1", 0).handle(None))
+    assert response.headers['Content-Type'] == "text/plain; version=0.0.4; charset=utf-8"
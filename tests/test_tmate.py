@@ -0,0 +1,61 @@
+import asyncio
+
+import bench
+from conftest import run, vb
+
+
+def test_cancelled_negotiation_kills_only_its_own_session(fake_docker):
+    daemon = fake_docker(tmate_latency=30)
+
+    async def scenario():
+        by_owner = bench.reset_bot([daemon], 1, 1, 4)
+        container_id = by_owner["user0"][0]
+        try:
+            negotiation = asyncio.create_task(vb.start_tmate_session(container_id))
+            while not daemon.execs:
+                await asyncio.sleep(0.01)
+            negotiation.cancel()
+            try:
+                await negotiation
+            except asyncio.CancelledError:
+                pass
+            assert len(vb.bot.cleanups) == 1
+            await asyncio.gather(*vb.bot.cleanups)
+            assert not vb.bot.cleanups
+        finally:
+            await vb.bot.nodes.close()
+
+    run(scenario())
+    started, killed = daemon.execs.values()
+    assert started[:2] == ["tmate", "-S"] and started[2].startswith(vb.TMATE_SOCKET_PREFIX)
+    assert killed == ["tmate", "-S", started[2], "kill-server"]
+
+
+def test_idle_probe_counts_clients_of_every_session(fake_docker, monkeypatch):
+    async def exec_run(self, container_id, cmd):
+        assert cmd == vb.TMATE_CLIENTS_CMD
+        return 0, "0\n2\n"
+
+    monkeypatch.setattr(vb.DockerClient, 'exec_run', exec_run)
+    daemon = fake_docker()
+
+    async def scenario():
+        by_owner = bench.reset_bot([daemon], 1, 1, 4)
+        try:
+            return await vb.bot.reaper.has_tmate_clients(by_owner["user0"][0])
+        finally:
+            await vb.bot.nodes.close()
+
+    assert run(scenario())
+
+
+def test_session_line_survives_undecodable_output():
+    class Lines:
+        def __init__(self, *lines):
+            self.lines = list(lines)
+
+        async def readline(self):
+            return self.lines.pop(0) if self.lines else b""
+
+    stream = Lines(b"\xe2\x94 cut mid-character \xff\n", b"ssh session: ssh abc@nyc1.tmate.io\n")
+    assert run(vb.capture_ssh_session_line(stream)) == "ssh abc@nyc1.tmate.io"
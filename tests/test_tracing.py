@@ -0,0 +1,128 @@
+import asyncio
+from types import SimpleNamespace
+
+import aiohttp
+from aiohttp import web
+from yarl import URL
+
+import bench
+from conftest import run, vb
+
+
+def interaction(command):
+    return SimpleNamespace(
+        type=vb.discord.InteractionType.application_command, data={'name': command.name}, user="alice",
+        extras={}, command=command
+    )
+
+
+def test_rest_span_names_hide_ids_and_tokens():
+    token = "aW50ZXJhY3Rpb246MTIzNDU2Nzg5MDEyMzQ1Njc4OnNlY3JldA-abc_def"
+    assert vb.rest_span_name("POST", URL(f"https://discord.com/api/v10/interactions/123456789012345678/{token}/callback")) == \
+        "discord POST /interactions/{id}/{token}/callback"
+    assert vb.rest_span_name("GET", URL("https://discord.com/api/v10/channels/123456789012345678/messages")) == \
+        "discord GET /channels/{id}/messages"
+
+
+def test_command_hooks_time_and_trace_the_invocation(monkeypatch):
+    monkeypatch.setattr(vb, 'TRACE_SAMPLE_RATE', 1.0)
+    tree = vb.bot.tree
+    ping = tree.get_command("ping")
+    completed = vb.telemetry.command_duration.values.get(("ping", "ok"), [0, 0, 0])[2]
+    failed = vb.telemetry.command_duration.values.get(("ping", "error"), [0, 0, 0])[2]
+
+    async def command(fail):
+        invoked = interaction(ping)
+        assert await tree.interaction_check(invoked)
+        with vb.span("work"):
+            pass
+        if fail:
+            await tree.on_error(invoked, vb.app_commands.AppCommandError("boom"))
+        else:
+            # Dispatched as an event, so it runs in a task of its own
+            await asyncio.create_task(tree.on_command_completion(invoked, invoked.command))
+
+    run(command(False))
+    run(command(True))
+
+    durations = vb.telemetry.command_duration.values
+    assert durations[("ping", "ok")][2] == completed + 1
+    assert durations[("ping", "error")][2] == failed + 1
+    trace = vb.tracer.last("ping")
+    assert trace.duration is not None
+    assert [s[0] for s in trace.spans] == ["work"]
+
+
+def test_session_requests_become_spans(monkeypatch):
+    monkeypatch.setattr(vb, 'TRACE_SAMPLE_RATE', 1.0)
+
+    async def messages(request):
+        return web.json_response([])
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get('/api/v10/channels/{id}/messages', messages)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            async with aiohttp.ClientSession(trace_configs=[vb.rest_trace_config()]) as session:
+                # Untraced requests record nothing
+                await (await session.get(f"http://127.0.0.1:{port}/api/v10/channels/123456789012345678/messages")).read()
+                trace = vb.tracer.begin("tracing-rest", "alice")
+                await (await session.get(f"http://127.0.0.1:{port}/api/v10/channels/123456789012345678/messages")).read()
+                return trace
+        finally:
+            await runner.cleanup()
+
+    trace = run(scenario())
+    assert [(s[0], s[2] is not None, s[4]) for s in trace.spans] == [("discord GET /channels/{id}/messages", True, False)]
+
+
+async def drain_background():
+    while vb.bot.warm_pool.tasks or vb.bot.cleanups:
+        await asyncio.gather(*vb.bot.warm_pool.tasks, *vb.bot.cleanups)
+
+
+def test_deploy_trace_holds_no_background_spans(fake_docker, monkeypatch):
+    monkeypatch.setattr(vb, 'TRACE_SAMPLE_RATE', 1.0)
+    daemon = fake_docker(tmate_latency=0.05)
+    discord_api = bench.FakeDiscord(0, 1)
+
+    async def scenario():
+        bench.reset_bot([daemon], 0, 1, 4)
+        vb.bot.warm_pool.sizes = {"ubuntu": 1}
+        try:
+            await vb.bot.images.refresh()
+            vb.bot.warm_pool.schedule_refill()
+            await drain_background()
+            assert vb.bot.warm_pool.available("ubuntu") == 1
+
+            admin = bench.FakeUser(discord_api, vb.MAIN_ADMIN_ID, "admin")
+            trace = vb.tracer.begin("deploy", "admin")
+            await vb.deploy.callback(bench.FakeInteraction(discord_api, admin), bench.FakeUser(discord_api, 3, "bob"), "ubuntu")
+            vb.tracer.end(trace)
+            deployed = [list(s) for s in trace.spans]
+
+            # The refill started by the deploy, and a negotiation cancelled in the same trace
+            negotiation = asyncio.create_task(vb.start_tmate_session(next(iter(vb.bot.registry.instances))))
+            await asyncio.sleep(0.01)
+            negotiation.cancel()
+            await asyncio.gather(negotiation, return_exceptions=True)
+            cancelled = len(trace.spans)
+            await drain_background()
+            return trace, deployed, cancelled
+        finally:
+            for exec_stream in list(vb.bot.tmate_streams.values()):
+                exec_stream.close()
+            await vb.bot.nodes.close()
+
+    trace, deployed, cancelled = run(scenario())
+    assert any(name == "warm pool acquire" for name, *_ in deployed)
+    assert not any(name == "tmate negotiate" for name, *_ in deployed)
+    assert all(offset + duration <= trace.duration for _, offset, duration, _, _ in deployed)
+    # Nothing was added once the deploy and the cancelled negotiation had returned
+    assert len(trace.spans) == cancelled
+    assert [list(s) for s in trace.spans[:len(deployed)]] == deployed
@@ -0,0 +1,37 @@
+import asyncio
+
+import bench
+from conftest import run, vb
+
+
+def test_acquire_skips_containers_without_a_live_session(fake_docker):
+    daemon = fake_docker()
+
+    async def scenario():
+        bench.reset_bot([daemon], 0, 1, 4)
+        pool = vb.bot.warm_pool
+        pool.sizes = {"ubuntu": 3}
+        try:
+            await vb.bot.images.refresh()
+            await pool.refill()
+            while pool.tasks:
+                await asyncio.gather(*pool.tasks)
+            dropped, exited, healthy = [entry['container_id'] for entry in pool.ready["ubuntu"]]
+
+            vb.bot.tmate_streams[dropped].close()
+            await asyncio.sleep(0.05)
+            # The state cache isn't running, so only Docker knows this one stopped
+            daemon.containers[exited]['State']['Status'] = 'exited'
+
+            pool.sizes = {}
+            entry = await pool.acquire("ubuntu")
+            return entry, dropped, exited, healthy
+        finally:
+            for exec_stream in list(vb.bot.tmate_streams.values()):
+                exec_stream.close()
+            await vb.bot.nodes.close()
+
+    entry, dropped, exited, healthy = run(scenario())
+    assert entry['container_id'] == healthy
+    assert dropped not in daemon.containers and exited not in daemon.containers
+    assert not vb.bot.warm_pool.ready["ubuntu"]